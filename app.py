@@ -1,89 +1,472 @@
-from flask import Flask, render_template, request, jsonify, send_file
-from inheritance_logic import calculate_inheritance
-from pdf_report import generate_pdf
+from flask import (
+    Flask, Response, g, jsonify, render_template, request, send_file, stream_with_context,
+)
+from flask.json.provider import DefaultJSONProvider
+from inheritance_logic import (
+    calculate_inheritance, calculate_inheritance_many, calculate_minor_units, calculate_trace,
+    case_digest, case_places, explain_trace, normalize_case,
+)
+from explanation_text import DEFAULT_LOCALE, get_locale
+from charts import MIMETYPES, chart_bytes
+from madhab import get_madhab
+from metrics import (
+    REQUESTS, RESPONSES, collect_request_spans, exposition, record_error, server_timing, span,
+    stop_request_spans,
+)
+from offload import Busy, executor_stats
+from result_token import decode as decode_token, encode as encode_token
+from schema import normalize_rows
+from share_cache import cache_stats
+from store import RESULTS
+from io import BytesIO
+from time import perf_counter
+import base64
+import json
 import logging
+import os
+import tempfile
+
+try:
+    import orjson
+except ImportError:  # optional faster encoder
+    orjson = None
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider that serializes with orjson. orjson rejects integers
+    beyond 64 bits (minor units of a very large estate), so those payloads
+    go through the stdlib encoder, which writes them exactly.
+    """
+
+    def dumps(self, obj, **kwargs):
+        try:
+            return orjson.dumps(obj, default=self.default, option=orjson.OPT_SORT_KEYS).decode("utf-8")
+        except TypeError:
+            kwargs.setdefault("ensure_ascii", False)
+            return super().dumps(obj, **kwargs)
+
 
 app = Flask(__name__)
+if orjson is not None:
+    app.json = OrjsonProvider(app)
 logging.basicConfig(level=logging.INFO)
 
+# pdf_report (reportlab) is imported in the /pdf route and charts only loads
+# matplotlib in its render workers; serving preloads shaping and reportlab up
+# front and the workers warm themselves (prefork.py).
+# Both render in bounded process pools (offload.py); a full pool answers 503.
+
+@app.before_request
+def start_timing():
+    g.request_start = perf_counter()
+    # opt-in Server-Timing header with this request's spans: ?timing=1
+    if _flag("timing"):
+        g.timing_token = collect_request_spans()
+
+@app.after_request
+def finish_timing(response):
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    REQUESTS.observe(route, perf_counter() - g.get("request_start", perf_counter()))
+    RESPONSES.inc(route, response.status_code)
+    token = g.pop("timing_token", None)
+    if token is not None:
+        response.headers["Server-Timing"] = server_timing(stop_request_spans(token))
+    return response
+
+@app.teardown_request
+def drop_timing(_):
+    token = g.pop("timing_token", None)
+    if token is not None:
+        stop_request_spans(token)
+
 @app.route("/")
 def index():
     return render_template("index.html")
 
+def _busy(error):
+    """503 telling the client to retry once the render queue drains"""
+    record_error(error)
+    response = jsonify({"error": "الخادم مشغول حاليًا، يرجى المحاولة بعد قليل"})
+    response.headers["Retry-After"] = str(error.retry_after)
+    return response, 503
+
+def _server_error(error, where):
+    """500 for an unexpected error: logged with its traceback, never echoed to the client"""
+    record_error(error)
+    logging.exception("Error in %s", where)
+    return jsonify({"error": "خطأ في الخادم"}), 500
+
+def _locale(body=None):
+    """Explanation locale from ?locale= or the JSON body; ValueError if unsupported"""
+    name = request.args.get("locale")
+    if name is None and isinstance(body, dict):
+        name = body.get("locale")
+    # an empty ?locale= means the default; a list or dict is rejected by get_locale
+    return get_locale(None if name == "" else name).name
+
+def _flag(name, body=None, default=False):
+    """Boolean option from the query string, falling back to the JSON body"""
+    value = request.args.get(name)
+    if value is None and isinstance(body, dict):
+        value = body.get(name)
+    if value is None:
+        return default
+    if isinstance(value, str):
+        return value.lower() in ("1", "true", "yes")
+    return bool(value)
+
 @app.route("/calculate", methods=["POST"])
 def calculate():
     try:
-        received = request.json
-        logging.info(f"Received payload: {received}")
+        received = request.get_json(silent=True)
+        logging.debug("Received payload: %s", received)
 
         # Normalize and validate inputs
-        if not received or "estate" not in received:
-            return jsonify({"error": "قيمة التركة مطلوبة"}), 400
-
-        data = {}
-        # numeric coercions with safe defaults
         try:
-            data["estate"] = float(received.get("estate", 0))
-        except Exception:
-            return jsonify({"error": "قيمة التركة غير صحيحة"}), 400
+            data = normalize_case(received)
+            locale = _locale(received)
+            # optional inline chart, e.g. {"chart": "svg"}
+            chart_format = received.get("chart")
+            if chart_format is not None and (
+                not isinstance(chart_format, str) or chart_format not in MIMETYPES
+            ):
+                raise ValueError("صيغة الرسم غير مدعومة")
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
 
-        if data["estate"] <= 0:
-            return jsonify({"error": "قيمة التركة يجب أن تكون أكبر من صفر"}), 400
+        logging.debug("Normalized payload: %s", data)
 
-        data["deceased_gender"] = received.get("deceased_gender", "ذكر")
-        # spouse fields
-        data["husband"] = bool(received.get("husband", False))
-        try:
-            data["wives"] = int(received.get("wives", 0))
-        except Exception:
-            data["wives"] = 0
-
-        # relatives counts / flags
-        data["father"] = bool(received.get("father", False))
-        data["mother"] = bool(received.get("mother", False))
-        data["sons"] = int(received.get("sons", 0) or 0)
-        data["daughters"] = int(received.get("daughters", 0) or 0)
-        data["brothers"] = int(received.get("brothers", 0) or 0)
-        data["sisters"] = int(received.get("sisters", 0) or 0)
-        data["grandfather"] = bool(received.get("grandfather", False))
-        data["grandmother"] = bool(received.get("grandmother", False))
-        data["halfbrothers_father"] = int(received.get("halfbrothers_father", 0) or 0)
-        data["halfsisters_father"] = int(received.get("halfsisters_father", 0) or 0)
-
-        # Enforce consistency: only one spouse type based on deceased gender
-        if data["deceased_gender"] == "ذكر":
-            # deceased male -> there is no husband
-            data["husband"] = False
-        else:
-            # deceased female -> no wives
-            data["wives"] = 0
+        # compact mode: heir -> integer minor units only
+        if _flag("compact", received):
+            return jsonify({"shares": calculate_minor_units(data)})
 
-        logging.info(f"Normalized payload: {data}")
+        explain = _flag("explain", received)
+        trace = calculate_trace(data, exact=_flag("exact", received))
+        shares = {step.heir: step.amount for step in trace.steps}
+        explanation = explain_trace(trace, locale) if explain else []
 
-        shares, explanation = calculate_inheritance(data)
+        case_id = case_digest(data)
+        if RESULTS is not None:
+            # the store keeps the default-locale explanation
+            stored = explanation if explain and locale == DEFAULT_LOCALE else None
+            RESULTS.save(case_id, data, shares, stored)
 
-        return jsonify({
+        places = case_places(data)
+        response = {
+            "case_id": case_id,
             "labels": list(shares.keys()),
-            "values": [round(v, 2) for v in shares.values()],
-            "explanation": explanation,
-            "raw_received": received,
-            "raw_normalized": data
-        })
+            "values": [float(round(v, places)) for v in shares.values()],
+            "madhab": data["madhab"],
+            # handed back to /pdf and /chart, which render from it without recomputing
+            "token": encode_token(case_id, trace, locale),
+        }
+        if data["estate_minor"] is not None:
+            # exact integers that add up to estate_minor
+            response["currency"] = data["currency"]
+            response["minor_units"] = [int(v.scaleb(places)) for v in shares.values()]
+        if explain:
+            response["explanation"] = explanation
+        if _flag("trace", received):
+            response["trace"] = [
+                {
+                    "rule": step.rule,
+                    "fraction": str(step.fraction),
+                    "heir": step.heir,
+                    "amount": float(round(step.amount, places)),
+                }
+                for step in trace.steps
+            ]
+            response["adjustments"] = [
+                {
+                    "rule": adjustment.rule,
+                    "fraction": str(adjustment.fraction),
+                    "amount": float(round(adjustment.amount, places)),
+                }
+                for adjustment in trace.adjustments
+            ]
+        if _flag("debug", received):
+            response["raw_received"] = received
+            response["raw_normalized"] = dict(data)
+        if chart_format is not None and shares:
+            response["chart"] = base64.b64encode(chart_bytes(shares, chart_format)).decode("ascii")
+            response["chart_mimetype"] = MIMETYPES[chart_format]
+
+        return jsonify(response)
+    except Busy as e:
+        return _busy(e)
     except Exception as e:
-        logging.error(f"Error in calculate: {str(e)}")
-        return jsonify({"error": str(e)}), 500
+        return _server_error(e, "calculate")
+
+def _ndjson_cases(stream):
+    """Parse an NDJSON request body lazily, one case per non-empty line"""
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            # reported as a per-case error by calculate_inheritance_many
+            yield None
+
+def _batch_cases():
+    """Cases of a batch request (JSON array or NDJSON body), or None if malformed"""
+    if request.mimetype in ("application/x-ndjson", "application/jsonl"):
+        return _ndjson_cases(request.stream)
+    cases = request.get_json(silent=True)
+    return cases if isinstance(cases, list) else None
+
+@app.route("/calculate/batch", methods=["POST"])
+def calculate_batch():
+    explain = _flag("explain")
+    exact = _flag("exact")
+    try:
+        locale = _locale()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    cases = _batch_cases()
+    if cases is None:
+        return jsonify({"error": "يجب إرسال مصفوفة من الحالات"}), 400
+
+    def generate():
+        for result in calculate_inheritance_many(
+            cases, explain=explain, exact=exact, locale=locale
+        ):
+            yield app.json.dumps(result) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+def _token(received):
+    """(case_id, Trace, locale) of the result token in a request, or None"""
+    token = request.args.get("token")
+    if token is None and isinstance(received, dict):
+        token = received.get("token")
+    return decode_token(token) if token is not None else None
 
 @app.route("/pdf", methods=["POST"])
 def pdf():
     try:
-        data = request.json
-        shares, explanation = calculate_inheritance(data)
-        filename = "inheritance_report.pdf"
-        generate_pdf(filename, data["estate"], explanation)
-        return send_file(filename, as_attachment=True, download_name="تقرير_المواريث.pdf")
+        received = request.get_json(silent=True)
+        try:
+            signed = _token(received)
+            if signed is None:
+                data = normalize_case(received)
+                locale = _locale(received)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        if signed is not None:
+            # the result shown by /calculate: only the explanation text is rendered
+            case_id, trace, locale = signed
+            return _send_report(
+                case_id, trace.estate, lambda: explain_trace(trace, locale), locale, trace.exact
+            )
+        case_id = case_digest(data)
+        return _send_report(case_id, data["estate"], _case_lines(case_id, data, locale=locale), locale)
+    except Busy as e:
+        return _busy(e)
+    except Exception as e:
+        return _server_error(e, "pdf")
+
+def _case_lines(case_id, data, explanation=None, locale=DEFAULT_LOCALE):
+    """Explanation callable for the report of a case, saving default-locale results to the store"""
+    if locale != DEFAULT_LOCALE:
+        return lambda: explain_trace(calculate_trace(data), locale)
+
+    def lines():
+        if explanation is not None:
+            return explanation
+        shares, computed = calculate_inheritance(data)
+        if RESULTS is not None:
+            RESULTS.save(case_id, data, shares, computed)
+        return computed
+    return lines
+
+def _send_report(case_id, estate, lines, locale=DEFAULT_LOCALE, exact=False):
+    """
+    The case's PDF from the memory cache, the result store or a fresh
+    render of lines() (only called on a miss). The store holds the
+    default-locale, non-exact reports only.
+    """
+    from pdf_report import cached_pdf
+
+    if locale == DEFAULT_LOCALE and not exact:
+        report = cached_pdf(case_id, estate, lines, store=RESULTS)
+    else:
+        key = f"{case_id}:{locale}:exact" if exact else f"{case_id}:{locale}"
+        report = cached_pdf(key, estate, lines)
+    return send_file(
+        BytesIO(report), mimetype="application/pdf",
+        as_attachment=True, download_name="تقرير_المواريث.pdf",
+    )
+
+def _report_cases(cases):
+    """(title, estate, rows or error message) per case for a consolidated report"""
+    valid, errors = normalize_rows(list(cases))
+    for index, data in enumerate(valid):
+        title = f"الحالة {index + 1}"
+        if data is None:
+            yield title, None, errors[index]
+            continue
+        shares, _ = calculate_inheritance(data, explain=False)
+        yield title, data["estate"], list(shares.items())
+
+@app.route("/pdf/batch", methods=["POST"])
+def pdf_batch():
+    from pdf_report import PDF_EXECUTOR, write_cases_pdf
+
+    cases = _batch_cases()
+    if cases is None:
+        return jsonify({"error": "يجب إرسال مصفوفة من الحالات"}), 400
+    # the shares are small; the report is laid out case by case in a worker
+    # process and written to a temporary file rather than held in memory
+    entries = list(_report_cases(cases))
+    if not entries:
+        return jsonify({"error": "لا توجد حالات في الطلب"}), 400
+
+    fd, path = tempfile.mkstemp(suffix=".pdf")
+    os.close(fd)
+    try:
+        with span("pdf_build"):
+            PDF_EXECUTOR.run(write_cases_pdf, path, entries, timeout=600)
+        report = open(path, "rb")
+    except Busy as e:
+        return _busy(e)
+    except Exception as e:
+        return _server_error(e, "pdf batch")
+    finally:
+        os.unlink(path)  # the open handle keeps the data until it is sent
+    return send_file(
+        report, mimetype="application/pdf",
+        as_attachment=True, download_name="تقرير_المواريث_المجمع.pdf",
+    )
+
+@app.route("/munasakha", methods=["POST"])
+def munasakha_route():
+    from munasakha import solve
+
+    try:
+        received = request.get_json(silent=True)
+        if not isinstance(received, dict):
+            return jsonify({"error": "صيغة الطلب غير صحيحة"}), 400
+        try:
+            try:
+                estate = float(received.get("estate", 0))
+            except (TypeError, ValueError):
+                raise ValueError("قيمة التركة غير صحيحة")
+            if estate <= 0:
+                raise ValueError("قيمة التركة يجب أن تكون أكبر من صفر")
+            madhab = get_madhab(received.get("madhab") or None)
+            result = solve(estate, received.get("deaths"), madhab, received.get("currency"))
+        except (ValueError, TypeError) as e:
+            return jsonify({"error": str(e)}), 400
+        return jsonify(result)
+    except Exception as e:
+        return _server_error(e, "munasakha")
+
+@app.route("/inverse", methods=["POST"])
+def inverse_route():
+    """Heir compositions meeting a query (see inverse.py), streamed as NDJSON
+    with a closing summary line"""
+    from inverse import solve
+
+    try:
+        try:
+            matches, summary = solve(request.get_json(silent=True))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        def generate():
+            with span("inverse"):
+                for match in matches:
+                    yield app.json.dumps(match) + "\n"
+            yield app.json.dumps(summary()) + "\n"
+
+        return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+    except Exception as e:
+        return _server_error(e, "inverse")
+
+@app.route("/chart", methods=["GET", "POST"])
+def chart():
+    """Chart of a case, or of a result token (?token= on GET, e.g. for an <img>)"""
+    try:
+        chart_format = request.args.get("format", "png")
+        if chart_format not in MIMETYPES:
+            return jsonify({"error": "صيغة الرسم غير مدعومة"}), 400
+        received = request.get_json(silent=True) if request.method == "POST" else None
+        try:
+            signed = _token(received)
+            if signed is None:
+                if request.method == "GET":
+                    raise ValueError("رمز النتيجة مطلوب")
+                data = normalize_case(received)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        if signed is not None:
+            shares = {step.heir: float(step.amount) for step in signed[1].steps}
+        else:
+            shares, _ = calculate_inheritance(data, explain=False)
+        if not shares:
+            return jsonify({"error": "لا توجد نتائج للعرض"}), 400
+        return Response(chart_bytes(shares, chart_format), mimetype=MIMETYPES[chart_format])
+    except Busy as e:
+        return _busy(e)
     except Exception as e:
-        logging.error(f"Error in pdf: {str(e)}")
-        return jsonify({"error": str(e)}), 500
+        return _server_error(e, "chart")
+
+def _stored_case(case_id):
+    return RESULTS.get(case_id) if RESULTS is not None else None
+
+@app.route("/cases/<case_id>", methods=["GET"])
+def stored_case(case_id):
+    try:
+        locale = _locale()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    case = _stored_case(case_id)
+    if case is None:
+        return jsonify({"error": "الحالة غير موجودة"}), 404
+    if locale != DEFAULT_LOCALE or (case["explanation"] is None and _flag("explain")):
+        # re-rendered from the stored input; the shares are cached per composition
+        case["explanation"] = explain_trace(calculate_trace(case["input"]), locale)
+    return jsonify(case)
+
+@app.route("/cases/<case_id>/pdf", methods=["GET"])
+def stored_case_pdf(case_id):
+    try:
+        try:
+            locale = _locale()
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        case = _stored_case(case_id)
+        if case is None:
+            return jsonify({"error": "الحالة غير موجودة"}), 404
+        data = case["input"]
+        return _send_report(
+            case_id, data["estate"], _case_lines(case_id, data, case["explanation"], locale), locale
+        )
+    except Busy as e:
+        return _busy(e)
+    except Exception as e:
+        return _server_error(e, "stored pdf")
+
+@app.route("/cache/stats", methods=["GET"])
+def share_cache_stats():
+    return jsonify(cache_stats())
+
+@app.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    return Response(
+        exposition(cache_stats(), executor_stats()),
+        mimetype="text/plain; version=0.0.4",
+    )
+
+@app.route("/executors/stats", methods=["GET"])
+def render_executor_stats():
+    return jsonify(executor_stats())
 
 @app.errorhandler(404)
 def not_found(error):
@@ -94,4 +477,7 @@ def internal_error(error):
     return jsonify({"error": "خطأ في الخادم"}), 500
 
 if __name__ == "__main__":
-    app.run(debug=True, host="127.0.0.1", port=5000, use_reloader=False)
+    import prefork
+    if prefork.ENABLED:
+        prefork.preload(charts=False)
+    app.run(debug=True, host="127.0.0.1", port=5000, use_reloader=False, threaded=True)
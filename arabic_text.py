@@ -0,0 +1,68 @@
+"""
+Shared Arabic shaping (reshaping + bidirectional reordering) for the PDF,
+chart and explanation paths.
+
+Shaped strings are memoized in a bounded ShareCache. Lines that differ only
+in their numbers (amounts, counts, fractions) share one cached template:
+each number is swapped for a single-digit placeholder, which has the same
+bidi class as the number, and the numbers are put back after shaping.
+
+arabic_reshaper and python-bidi are imported when the first string is
+shaped, not at import time.
+"""
+import os
+import re
+
+from metrics import timed
+from share_cache import ShareCache
+
+_cache = ShareCache("arabic_text", maxsize=int(os.environ.get("ARABIC_TEXT_CACHE_SIZE", 4096)))
+
+_NUMBER = re.compile(r"[0-9]+(?:[.,/][0-9]+)*")
+_PLACEHOLDERS = "0123456789"
+
+
+@timed("shaping")
+def _shape(text):
+    # imported on first use so calculations that never shape text skip it
+    from arabic_reshaper import reshape
+    from bidi.algorithm import get_display
+    return get_display(reshape(text))
+
+
+def shape(text):
+    """Shape a whole string through the cache, without templating"""
+    return _cache.get(text, _shape)
+
+
+def ar(text):
+    """Display Arabic text correctly with reshaping and bidirectional support"""
+    try:
+        numbers = _NUMBER.findall(text)
+        if not numbers:
+            return shape(text)
+        if len(numbers) > len(_PLACEHOLDERS):
+            return _shape(text)
+
+        placeholders = iter(_PLACEHOLDERS)
+        template = _NUMBER.sub(lambda _: next(placeholders), text)
+        return shape(template).translate(
+            {ord(p): number for p, number in zip(_PLACEHOLDERS, numbers)}
+        )
+    except Exception:
+        return text
+
+
+def warm_up(texts=None):
+    """
+    Pre-shape the static verses, heir labels and titles so the first
+    requests hit the cache. Returns the number of strings shaped.
+    """
+    if texts is None:
+        from inheritance_logic import static_texts
+        texts = static_texts()
+    count = 0
+    for text in texts:
+        ar(text)
+        count += 1
+    return count
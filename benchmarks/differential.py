@@ -0,0 +1,180 @@
+"""
+Differential check and per-pass timing for the rule engine.
+
+Runs randomized heir compositions through the frozen pre-unification
+calculators (benchmarks/legacy.py) and through the rule_engine profiles now
+behind inheritance_logic, engine and calculator, compares the exact
+fractions heir by heir, and reports how long each pass of every profile
+takes so the hot passes can be tuned with evidence.
+
+    python benchmarks/differential.py [--cases N] [--seed S] [--show K]
+"""
+import argparse
+import os
+import random
+import sys
+from time import perf_counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import calculator  # noqa: E402
+import engine  # noqa: E402
+import inheritance_logic  # noqa: E402
+import legacy  # noqa: E402
+from rule_engine import SPOUSES, run  # noqa: E402
+
+
+def random_case(rng):
+    """A payload carrying every field any of the three calculators reads"""
+    def count(p_zero=0.5, high=4):
+        return 0 if rng.random() < p_zero else rng.randint(1, high)
+
+    flag = lambda p=0.5: rng.random() < p  # noqa: E731
+    husband = flag(0.3)
+    return {
+        "estate": round(rng.uniform(1, 10_000_000), 2),
+        "husband": husband,
+        "wives": 0 if husband else count(0.4, 4),
+        "father": flag(),
+        "mother": flag(),
+        "grandfather": flag(0.3),
+        "grandmother": flag(0.3),
+        "sons": count(0.5, 5),
+        "daughters": count(0.5, 5),
+        "son_sons": count(0.8, 3),
+        "son_daughters": count(0.8, 3),
+        "brothers": count(0.6, 4),
+        "sisters": count(0.6, 4),
+        "brothers_mother": count(0.8, 2),
+        "sisters_mother": count(0.8, 2),
+        "halfbrothers_father": 0,
+        "halfsisters_father": 0,
+    }
+
+
+def _pairs(entries):
+    return [(entry[0], entry[-1]) for entry in entries]
+
+
+def _same(old, new):
+    """Same heirs in the same order with equal shares (legacy paths can mix
+    floats into their fractions, so allow for float rounding)"""
+    return len(old) == len(new) and all(
+        a_heir == b_heir and abs(float(a) - float(b)) < 1e-12
+        for (a_heir, a), (b_heir, b) in zip(old, new)
+    )
+
+
+def _unchanged_inheritance_logic(case):
+    # the legacy calculator let the siblings take everything; the grandfather
+    # now meets the siblings as the madhab rules (see madhab.py)
+    if case["grandfather"] and (case["brothers"] or case["sisters"]):
+        return False
+    # it also added the grandmother's sixth after the residue and had no
+    # awl or radd, so its shares could miss the whole estate either way;
+    # she now takes her sixth with the fixed shares and awl/radd apply
+    shares = legacy.inheritance_logic_fractions(legacy.inheritance_logic_key(case))
+    return (sum(fraction for *_, fraction in shares) == 1
+            and not any(rule == "grandmother_sixth" for _, rule, _ in shares))
+
+
+def _without_spouse_radd(key, profile):
+    """
+    Cases compared against a legacy path that returned the radd surplus to
+    the spouse too; radd now leaves a spouse beside blood heirs at the fixed
+    share, so those cases are expected to differ.
+    """
+    def compared(case):
+        # the profile's passes before radd, which is the last one
+        state = run(profile.pipeline[:-1], key(case))
+        spouse = any(heir in state.shares for heir in SPOUSES)
+        others = any(heir not in SPOUSES for heir in state.shares)
+        return not (spouse and others and 0 < state.total < 1)
+    return compared
+
+
+# (name, legacy key, legacy fractions, new key, new fractions, cases compared)
+PATHS = [
+    ("inheritance_logic",
+     legacy.inheritance_logic_key, legacy.inheritance_logic_fractions,
+     inheritance_logic.composition_key, inheritance_logic.PROFILE.distribute,
+     _unchanged_inheritance_logic),
+    ("engine",
+     legacy.engine_key, legacy.engine_fractions,
+     engine.composition_key, engine.PROFILE.distribute,
+     _without_spouse_radd(engine.composition_key, engine.PROFILE)),
+    ("engine (uncompiled)",
+     legacy.engine_key, legacy.engine_fractions,
+     engine.composition_key, engine.UNCOMPILED_PROFILE.distribute,
+     _without_spouse_radd(engine.composition_key, engine.PROFILE)),
+    ("calculator",
+     legacy.calculator_key, legacy.calculator_fractions,
+     calculator.composition_key, calculator.PROFILE.distribute,
+     _without_spouse_radd(calculator.composition_key, calculator.PROFILE)),
+]
+
+
+def compare(all_cases, show):
+    failures = 0
+    print(f"{'path':<22}{'mismatches':>12}{'old us/call':>14}{'new us/call':>14}")
+    for name, old_key, old_fn, new_key, new_fn, compared in PATHS:
+        cases = [case for case in all_cases if compared(case)]
+        old_keys = [old_key(case) for case in cases]
+        new_keys = [new_key(case) for case in cases]
+
+        start = perf_counter()
+        old = [_pairs(old_fn(key)) for key in old_keys]
+        old_time = perf_counter() - start
+
+        start = perf_counter()
+        new = [_pairs(new_fn(key)) for key in new_keys]
+        new_time = perf_counter() - start
+
+        mismatches = [i for i, (a, b) in enumerate(zip(old, new)) if not _same(a, b)]
+        failures += len(mismatches)
+        print(f"{name:<22}{len(mismatches):>12}"
+              f"{old_time / len(cases) * 1e6:>14.1f}{new_time / len(cases) * 1e6:>14.1f}")
+        for i in mismatches[:show]:
+            print(f"    case {new_keys[i]}")
+            print(f"      old {old[i]}")
+            print(f"      new {new[i]}")
+    return failures
+
+
+def pass_timings(cases):
+    profiles = [
+        *((profile, inheritance_logic.composition_key)
+          for profile in inheritance_logic.PROFILES.values()),
+        (engine.PROFILE, engine.composition_key),
+        (engine.UNCOMPILED_PROFILE, engine.composition_key),
+        (calculator.PROFILE, calculator.composition_key),
+    ]
+    for profile, key in profiles:
+        timings = {}
+        for case in cases:
+            profile.distribute(key(case), timings)
+        label = profile.name + (" (uncompiled)" if profile is engine.UNCOMPILED_PROFILE else "")
+        print(f"\n{label}")
+        for name, _ in profile.pipeline:
+            print(f"    {name:<22}{timings.get(name, 0.0) / len(cases) * 1e6:>10.2f} us/call")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--cases", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--show", type=int, default=3, help="mismatches printed per path")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    cases = [random_case(rng) for _ in range(args.cases)]
+
+    failures = compare(cases, args.show)
+    pass_timings(cases)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
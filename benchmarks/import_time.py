@@ -0,0 +1,70 @@
+"""
+Report the import-time cost of the application modules.
+
+Runs each module import in a fresh interpreter with ``-X importtime`` and
+prints the cumulative time of the module, its heaviest top-level
+dependencies and which of the heavy renderer packages it pulled in.
+
+    python benchmarks/import_time.py [module ...] [--top N]
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+RENDERERS = ("reportlab", "matplotlib", "arabic_reshaper", "bidi", "numpy")
+
+MODULES = [
+    "app", "inheritance_logic", "engine", "calculator", "vectorized",
+    "arabic_text", "pdf_report", "charts", "prefork",
+]
+
+
+def import_times(module):
+    """{imported module: cumulative microseconds} for importing module"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line.split("|")
+        times[name.strip()] = int(cumulative_us)
+    return times
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("modules", nargs="*", default=MODULES)
+    parser.add_argument("--top", type=int, default=5, help="dependencies listed per module")
+    args = parser.parse_args(argv)
+
+    for module in args.modules:
+        try:
+            times = import_times(module)
+        except RuntimeError as e:
+            print(f"{module:<20} failed: {e}")
+            continue
+        packages = {}
+        for name, t in times.items():
+            top = name.split(".")[0]
+            if top != module:
+                packages[top] = max(packages.get(top, 0), t)
+        loaded = [name for name in RENDERERS if name in packages]
+
+        print(f"{module:<20} {times.get(module, 0) / 1000:8.1f} ms"
+              f"   renderers: {', '.join(loaded) or '-'}")
+        heaviest = sorted(((t, name) for name, t in packages.items()), reverse=True)
+        for t, name in heaviest[:args.top]:
+            print(f"    {name:<24} {t / 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,323 @@
+"""
+Frozen copies of the three calculators as they were before they moved onto
+rule_engine, kept as the reference side of benchmarks/differential.py.
+
+Each *_fractions function takes the legacy composition tuple built by the
+matching *_key function and returns ((heir label, Fraction), ...) in
+distribution order; inheritance_logic_fractions also includes the rule id,
+as (heir label, rule id, Fraction). Do not change these to follow new
+rules; they document the behaviour being compared against.
+"""
+from fractions import Fraction
+
+
+def inheritance_logic_key(data):
+    return (
+        bool(data["husband"]), int(data["wives"]), bool(data["father"]), bool(data["mother"]),
+        int(data["sons"]), int(data["daughters"]), int(data["brothers"]), int(data["sisters"]),
+        bool(data["grandfather"]), bool(data["grandmother"]),
+    )
+
+
+def engine_key(data):
+    return (
+        bool(data["husband"]), data["wives"] > 0, bool(data["mother"]), bool(data["grandmother"]),
+        bool(data["father"]), data["sons"], data["daughters"], data["son_sons"],
+        data["son_daughters"], data["brothers"], data["sisters"],
+        data["brothers_mother"] + data["sisters_mother"],
+    )
+
+
+def calculator_key(data):
+    return (
+        bool(data["husband"]), data["wives"] > 0, bool(data["mother"]), bool(data["father"]),
+        data["brothers"] + data["sisters"] >= 2, data["sons"], data["daughters"],
+    )
+
+
+def fixed_fractions(data):
+    shares = {}
+
+    # Husband
+    if data["husband"]:
+        shares["الزوج"] = Fraction(1, 4) if (data["sons"] or data["daughters"]) else Fraction(1, 2)
+
+    # Wives
+    if data["wives"] > 0:
+        shares["الزوجات"] = Fraction(1, 8) if (data["sons"] or data["daughters"]) else Fraction(1, 4)
+
+    # Mother
+    if data["mother"]:
+        # mother takes 1/6 as a fixed share when there are children or 2+ siblings
+        if data["sons"] or data["daughters"] or (data["brothers"] + data["sisters"] >= 2):
+            shares["الأم"] = Fraction(1, 6)
+        # otherwise mother's one-third is handled later (one-third of remaining after fixed shares)
+
+    # Father: fixed 1/6 only if there are children (otherwise residuary)
+    if data["father"] and (data["sons"] or data["daughters"]):
+        shares["الأب"] = Fraction(1, 6)
+
+    return shares
+
+
+def inheritance_logic_fractions(key):
+    """
+    Compute the exact share of each heir as a fraction of the estate.
+
+    Args:
+        key: heir composition as returned by composition_key
+
+    Returns:
+        Tuple of (heir_name, rule, Fraction) in distribution order, where
+        rule identifies the Sharia rule applied (used for the explanation).
+    """
+    (husband, wives, father, mother, sons, daughters,
+     brothers, sisters, grandfather, grandmother) = key
+
+    shares = {}
+    rules = {}
+
+    has_children = sons > 0 or daughters > 0
+    has_siblings = brothers + sisters > 0
+
+    def assign(heir, rule, fraction):
+        shares[heir] = fraction
+        rules[heir] = rule
+
+    # ==================== SPOUSE ====================
+    if husband:
+        if has_children:
+            assign("الزوج", "husband_quarter", Fraction(1, 4))
+        else:
+            assign("الزوج", "husband_half", Fraction(1, 2))
+    elif wives > 0:
+        if has_children:
+            assign(f"الزوجات ({wives})", "wives_eighth", Fraction(1, 8))
+        else:
+            assign(f"الزوجات ({wives})", "wives_quarter", Fraction(1, 4))
+
+    # ==================== MOTHER ====================
+    # Mother gets 1/6 when children or siblings exist; otherwise her third of
+    # the remaining is calculated after the fixed shares
+    if mother and has_children:
+        assign("الأم", "mother_sixth_children", Fraction(1, 6))
+    elif mother and has_siblings:
+        assign("الأم", "mother_sixth_siblings", Fraction(1, 6))
+
+    # ==================== FATHER ====================
+    # Father becomes residuary when no children (handled below)
+    if father and has_children:
+        assign("الأب", "father_sixth", Fraction(1, 6))
+
+    # ==================== MOTHER (remaining case) ====================
+    if mother and not has_children and not has_siblings:
+        # Mother gets 1/3 of remaining (after spouse's fixed share)
+        remaining = 1 - sum(shares.values())
+        assign("الأم", "mother_third_remainder", remaining / 3)
+
+    # ==================== CHILDREN (Asaba - تعصيب) ====================
+    if has_children:
+        # Distribute what remains after fixed shares using 2:1 ratio for males
+        remaining = 1 - sum(shares.values())
+        total_units = sons * 2 + daughters
+        unit_value = remaining / total_units
+        if sons > 0:
+            assign(f"الأبناء الذكور ({sons})", "sons_asaba", unit_value * 2 * sons)
+        if daughters > 0:
+            assign(f"البنات ({daughters})", "daughters_asaba", unit_value * daughters)
+
+    # ==================== FATHER (Asaba - تعصيب when no children) ====================
+    if father and not has_children:
+        remaining = 1 - sum(shares.values())
+        if remaining > 0:
+            assign("الأب", "father_asaba", remaining)
+
+    # ==================== SIBLINGS (Kalala - كلالة) ====================
+    if not father and not has_children and has_siblings:
+        remaining = 1 - sum(shares.values())
+        if remaining > 0:
+            # Brothers get 2x sisters (same 2:1 ratio)
+            unit_value = remaining / (brothers * 2 + sisters)
+            if brothers > 0:
+                assign(f"الإخوة ({brothers})", "brothers_kalala", unit_value * 2 * brothers)
+            if sisters > 0:
+                assign(f"الأخوات ({sisters})", "sisters_kalala", unit_value * sisters)
+
+    # ==================== GRANDPARENTS & HALF-SIBLINGS ====================
+    # (These would follow if mother/father not present, but simplified here)
+    # Grandfather inherits as residuary if no father
+    # Grandmother gets 1/6 if no mother and certain conditions
+    # Half-siblings from father side only inherit if no full siblings and no father
+    if grandfather and not father and not has_children:
+        remaining = 1 - sum(shares.values())
+        if remaining > 0:
+            assign("الجد", "grandfather_asaba", remaining)
+
+    if grandmother and not mother and not has_children:
+        assign("الجدة", "grandmother_sixth", Fraction(1, 6))
+
+    return tuple((heir, rules[heir], fraction) for heir, fraction in shares.items())
+
+
+def engine_fractions(key):
+    """Exact fraction of the estate per heir for a composition_key"""
+    (husband, wives, mother, grandmother, father, sons, daughters,
+     son_sons, son_daughters, brothers, sisters, maternal_siblings) = key
+    descendants = sons or daughters or son_sons or son_daughters
+    shares = {}
+    fixed = Fraction(0)
+
+    # ===== الزوج =====
+    if husband:
+        s = Fraction(1, 4) if descendants else Fraction(1, 2)
+        shares["الزوج"] = s
+        fixed += s
+
+    # ===== الزوجات =====
+    if wives:
+        s = Fraction(1, 8) if descendants else Fraction(1, 4)
+        shares["الزوجات"] = s
+        fixed += s
+
+    # ===== الأم =====
+    if mother:
+        if descendants or brothers + sisters >= 2:
+            s = Fraction(1, 6)
+        else:
+            s = Fraction(1, 3)
+        shares["الأم"] = s
+        fixed += s
+
+    # ===== الجدة =====
+    if grandmother and not mother:
+        shares["الجدة"] = Fraction(1, 6)
+        fixed += Fraction(1, 6)
+
+    # ===== الأب =====
+    father_asaba = False
+    if father:
+        if descendants:
+            shares["الأب"] = Fraction(1, 6)
+            fixed += Fraction(1, 6)
+        else:
+            father_asaba = True
+
+    # ===== الإخوة لأم =====
+    if not descendants and not father:
+        if maternal_siblings == 1:
+            shares["إخوة لأم"] = Fraction(1, 6)
+            fixed += Fraction(1, 6)
+        elif maternal_siblings > 1:
+            shares["إخوة لأم"] = Fraction(1, 3)
+            fixed += Fraction(1, 3)
+
+    # ===== العَول =====
+    if fixed > 1:
+        for k in shares:
+            shares[k] = shares[k] / fixed
+        fixed = Fraction(1)
+
+    remainder = 1 - fixed
+
+    # ===== الأب عصبة =====
+    if father_asaba:
+        shares["الأب"] = remainder
+        remainder = Fraction(0)
+
+    # ===== الفروع عصبة =====
+    units = sons * 2 + daughters + son_sons * 2 + son_daughters
+
+    if units > 0:
+        unit = remainder / units
+        if sons:
+            shares["الابن"] = unit * 2 * sons
+        if daughters:
+            shares["البنت"] = unit * daughters
+        if son_sons:
+            shares["ابن الابن"] = unit * 2 * son_sons
+        if son_daughters:
+            shares["بنت الابن"] = unit * son_daughters
+        remainder = Fraction(0)
+
+    # ===== الإخوة عصبة (إن لم يوجد أب ولا فروع) =====
+    if remainder > 0 and not descendants and not father:
+        units = brothers * 2 + sisters
+        if units:
+            unit = remainder / units
+            if brothers:
+                shares["الأخ"] = unit * 2 * brothers
+            if sisters:
+                shares["الأخت"] = unit * sisters
+            remainder = Fraction(0)
+
+    # ===== الرد =====
+    if remainder > 0:
+        total = sum(shares.values())
+        for k in shares:
+            shares[k] += shares[k] / total * remainder
+
+    return tuple(shares.items())
+
+
+def calculator_fractions(key):
+    """Exact fraction of the estate per heir for a composition_key"""
+    husband, wives, mother, father, siblings, sons, daughters = key
+    ratios = fixed_fractions({
+        "husband": husband,
+        "wives": int(wives),
+        "mother": mother,
+        "father": father,
+        "sons": sons,
+        "daughters": daughters,
+        # only the 2+ siblings threshold matters for the fixed shares
+        "brothers": 2 if siblings else 0,
+        "sisters": 0,
+    })
+
+    used = sum(ratios.values())
+    results = {}
+
+    # Awl
+    if used > 1:
+        for k in ratios:
+            ratios[k] /= used
+
+    remaining = Fraction(1)
+
+    # Fixed shares
+    for k, v in ratios.items():
+        results[k] = v
+        remaining -= v
+
+    # If mother exists but was not allocated a fixed share (i.e., rules didn't give 1/6),
+    # and there are no children, she takes one-third of the remaining after fixed shares.
+    if mother and "الأم" not in results:
+        # allocate one-third of the remaining
+        mother_amount = remaining / 3
+        results["الأم"] = mother_amount
+        remaining -= mother_amount
+
+    # Asaba (sons & daughters)
+    units = sons * 2 + daughters
+    if units > 0:
+        unit_value = remaining / units
+        if sons:
+            results["الأبناء"] = sons * unit_value * 2
+        if daughters:
+            results["البنات"] = daughters * unit_value
+        remaining = Fraction(0)
+
+    # If there are no children and father exists, father takes the remaining (residuary)
+    if remaining > 0 and units == 0:
+        if father:
+            results["الأب"] = results.get("الأب", 0) + remaining
+            remaining = Fraction(0)
+        else:
+            # Radd: distribute remaining proportionally among existing heirs
+            total = sum(results.values())
+            if total > 0:
+                for k in list(results.keys()):
+                    results[k] += (results[k] / total) * remaining
+                remaining = Fraction(0)
+
+    return tuple(results.items())
@@ -0,0 +1,145 @@
+"""
+Mixed-traffic load test: p50/p99 latency per route.
+
+Fires concurrent /calculate, /pdf and /chart requests (80/10/10 by default)
+with varied estates and heir compositions, so PDFs miss the report cache,
+after a short warm-up that starts the render workers.
+Without --url it starts the app twice on a local port, first with
+OFFLOAD=0 (renders on the request thread, the old behaviour) and then
+with the bounded render pools. That shows how far slow renders delay the
+cheap calculations, and how many requests the pools shed with 503.
+
+    python benchmarks/load_test.py [--requests N] [--concurrency C] [--mix 80,10,10]
+    python benchmarks/load_test.py --url http://127.0.0.1:5000   # existing server
+"""
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ROUTES = ("/calculate", "/pdf", "/chart")
+
+
+def random_case(rng):
+    return {
+        "estate": round(rng.uniform(1000, 1_000_000), 2),
+        "deceased_gender": "ذكر",
+        "wives": rng.randint(0, 2),
+        "father": rng.random() < 0.5,
+        "mother": rng.random() < 0.5,
+        "sons": rng.randint(0, 3),
+        "daughters": rng.randint(0, 3),
+        "brothers": rng.randint(0, 2),
+        "sisters": rng.randint(0, 2),
+    }
+
+
+def request(url, route, case):
+    body = json.dumps(case).encode("utf-8")
+    req = urllib.request.Request(
+        url + route, data=body, headers={"Content-Type": "application/json"}
+    )
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=120) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    return route, status, time.perf_counter() - start
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def warm_up(url, rng, per_route=4):
+    """Start the render workers (imports, fonts) before anything is timed"""
+    jobs = [(route, random_case(rng)) for route in ROUTES[1:] for _ in range(per_route)]
+    with ThreadPoolExecutor(len(jobs)) as pool:
+        list(pool.map(lambda job: request(url, *job), jobs))
+
+
+def run_load(url, requests, concurrency, mix, seed):
+    rng = random.Random(seed)
+    warm_up(url, rng)
+    jobs = [(rng.choices(ROUTES, mix)[0], random_case(rng)) for _ in range(requests)]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        results = list(pool.map(lambda job: request(url, *job), jobs))
+    elapsed = time.perf_counter() - start
+
+    print(f"{'route':<12}{'ok':>6}{'503':>6}{'other':>7}{'p50 ms':>10}{'p99 ms':>10}")
+    for route in ROUTES:
+        timings = [t for r, status, t in results if r == route and status == 200]
+        busy = sum(1 for r, status, _ in results if r == route and status == 503)
+        other = sum(1 for r, status, _ in results if r == route and status not in (200, 503))
+        if timings:
+            p50, p99 = percentile(timings, 0.50) * 1e3, percentile(timings, 0.99) * 1e3
+        else:
+            p50 = p99 = float("nan")
+        print(f"{route:<12}{len(timings):>6}{busy:>6}{other:>7}{p50:>10.1f}{p99:>10.1f}")
+    print(f"{len(results) / elapsed:.1f} requests/s over {elapsed:.1f}s")
+
+
+def start_server(port, offload):
+    env = dict(os.environ, OFFLOAD="1" if offload else "0")
+    code = f"from app import app; app.run(host='127.0.0.1', port={port}, threaded=True)"
+    server = subprocess.Popen(
+        [sys.executable, "-c", code], cwd=ROOT, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        start_new_session=True,  # so stop_server also reaches the render workers
+    )
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            urllib.request.urlopen(url + "/cache/stats", timeout=1).read()
+            return server, url
+        except OSError:
+            time.sleep(0.1)
+    stop_server(server)
+    raise RuntimeError("server did not start")
+
+
+def stop_server(server):
+    os.killpg(server.pid, signal.SIGTERM)
+    server.wait()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", help="target a running server instead of starting one")
+    parser.add_argument("--port", type=int, default=5077)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--mix", default="80,10,10", help="calculate,pdf,chart weights")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    mix = [float(w) for w in args.mix.split(",")]
+
+    if args.url:
+        run_load(args.url, args.requests, args.concurrency, mix, args.seed)
+        return
+
+    for offload, title in ((False, "inline rendering (OFFLOAD=0)"), (True, "bounded render pools")):
+        print(f"\n== {title}")
+        server, url = start_server(args.port, offload)
+        try:
+            run_load(url, args.requests, args.concurrency, mix, args.seed)
+        finally:
+            stop_server(server)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Peak memory of consolidated PDF reports as the number of cases grows.
+
+Compares one SimpleDocTemplate story holding every case's explanation
+(generate_pdf, the only way to build a multi-case report before) with the
+case-by-case generate_cases_pdf, measuring the peak with tracemalloc.
+
+    python benchmarks/pdf_memory.py [--cases 50 200 800]
+"""
+import argparse
+from io import BytesIO
+import os
+import random
+import sys
+from time import perf_counter
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from inheritance_logic import calculate_inheritance, normalize_case  # noqa: E402
+import pdf_report  # noqa: E402
+
+
+def random_case(rng):
+    return normalize_case({
+        "estate": round(rng.uniform(1000, 1_000_000), 2),
+        "wives": rng.randint(0, 2),
+        "father": rng.random() < 0.5,
+        "mother": rng.random() < 0.5,
+        "sons": rng.randint(0, 3),
+        "daughters": rng.randint(0, 3),
+    })
+
+
+def single_story(cases):
+    explanation = []
+    for data in cases:
+        explanation.extend(calculate_inheritance(data)[1])
+    pdf_report.generate_pdf(BytesIO(), sum(data["estate"] for data in cases), explanation)
+
+
+def streamed(cases):
+    def entries():
+        for index, data in enumerate(cases):
+            shares, _ = calculate_inheritance(data, explain=False)
+            yield f"الحالة {index + 1}", data["estate"], list(shares.items())
+    pdf_report.generate_cases_pdf(BytesIO(), entries())
+
+
+def measure(build, cases):
+    tracemalloc.start()
+    start = perf_counter()
+    build(cases)
+    elapsed = perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1e6, elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--cases", type=int, nargs="+", default=[50, 200, 800])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    # load fonts, styles and the shaping cache outside the measurements
+    streamed([random_case(rng)])
+    single_story([random_case(rng)])
+
+    print(f"{'cases':>6}{'story MB':>10}{'story s':>9}{'streamed MB':>13}{'streamed s':>12}")
+    for count in args.cases:
+        cases = [random_case(rng) for _ in range(count)]
+        story_mb, story_s = measure(single_story, cases)
+        streamed_mb, streamed_s = measure(streamed, cases)
+        print(f"{count:>6}{story_mb:>10.1f}{story_s:>9.2f}{streamed_mb:>13.1f}{streamed_s:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
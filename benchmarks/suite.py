@@ -0,0 +1,430 @@
+"""
+Invariant checks and timing regression gate for the calculation engines.
+
+Generates realistic and adversarial heir compositions (random families,
+'awl, radd, the gharrawain, large numbers of children and extreme
+estates) and checks on every case, for inheritance_logic (each madhab),
+engine and calculator:
+
+- negative: no share fraction or amount is below zero
+- whole:    the fractions add up to the whole estate whenever there is an heir
+- exact:    exact=True amounts add up to the estate to the minor unit
+- float:    float amounts add up to the estate within rounding
+- double:   a son takes twice what a daughter takes
+- gharrawain: the mother takes a third of what the spouse leaves
+  (inheritance_logic, in every madhab)
+
+Any violation fails the run (exit 1); there is no allowance for known
+ones.
+
+It then times calculate_inheritance, engine.calculate, calculator.calculate,
+generate_pdf and generate_pie_chart per call (median over the cases of each
+call's best of --repeat passes), over a batch (calculate_inheritance_many for inheritance_logic, a loop for the
+others) and from --threads threads at once. Each timing is divided by a
+fixed reference workload (Fraction arithmetic) timed in the same run, so the
+baseline holds ratios rather than times of the machine that recorded it; the
+run fails when a ratio is higher than its baseline by more than --threshold.
+Ratios still move by up to about 20% between runs (the threaded renders
+most) and more on a busy machine, hence the default of 50%.
+
+    python benchmarks/suite.py [--cases N] [--seed S] [--threshold 0.5]
+    python benchmarks/suite.py --update-baseline       # record the baseline
+    python benchmarks/suite.py --skip-timings          # invariants only
+"""
+import argparse
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from fractions import Fraction
+from io import BytesIO
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+from time import perf_counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import calculator  # noqa: E402
+import engine  # noqa: E402
+import inheritance_logic  # noqa: E402
+from madhab import MADHABS  # noqa: E402
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+MALE, FEMALE = "ذكر", "أنثى"
+
+
+# ==================== Cases ====================
+
+def _spouse(rng, case, p=0.6):
+    if rng.random() >= p:
+        return
+    if case["deceased_gender"] == FEMALE:
+        case["husband"] = True
+    else:
+        case["wives"] = rng.randint(1, 4)
+
+
+def _estate(rng):
+    return round(rng.uniform(1, 10_000_000), 2)
+
+
+def realistic(rng):
+    """A family as it is usually entered: a few children, parents, maybe siblings"""
+    case = {"estate": _estate(rng), "deceased_gender": rng.choice((MALE, FEMALE))}
+    _spouse(rng, case, 0.7)
+    for heir, p in (("father", 0.4), ("mother", 0.5), ("grandfather", 0.1),
+                    ("grandmother", 0.1)):
+        case[heir] = rng.random() < p
+    for heir, p, high in (("sons", 0.5, 4), ("daughters", 0.5, 4), ("son_sons", 0.1, 3),
+                          ("son_daughters", 0.1, 3), ("brothers", 0.3, 4),
+                          ("sisters", 0.3, 4), ("brothers_mother", 0.1, 2),
+                          ("sisters_mother", 0.1, 2)):
+        case[heir] = rng.randint(1, high) if rng.random() < p else 0
+    return case
+
+
+def awl(rng):
+    """Fixed shares that add up to more than the estate"""
+    case = {"estate": _estate(rng), "deceased_gender": rng.choice((MALE, FEMALE))}
+    _spouse(rng, case, 0.9)
+    if rng.random() < 0.5:
+        # daughters' two thirds with the parents' sixths
+        case.update(daughters=rng.randint(2, 6), father=True, mother=rng.random() < 0.8)
+    else:
+        # sisters' two thirds (or a half) with the mother and maternal siblings
+        case.update(sisters=rng.randint(1, 4), mother=rng.random() < 0.7,
+                    brothers_mother=rng.randint(0, 2), sisters_mother=rng.randint(0, 2))
+    return case
+
+
+def radd(rng):
+    """Fixed shares that leave a surplus and no residuary heir to take it"""
+    case = {"estate": _estate(rng), "deceased_gender": rng.choice((MALE, FEMALE))}
+    _spouse(rng, case, 0.5)
+    case["mother" if rng.random() < 0.7 else "grandmother"] = True
+    group = rng.choice(("daughters", "son_daughters", "sisters", "sisters_mother"))
+    case[group] = rng.randint(1, 3)
+    return case
+
+
+def gharrawain(rng):
+    """Spouse, father and mother only (the 'umariyyatan)"""
+    gender = rng.choice((MALE, FEMALE))
+    case = {"estate": _estate(rng), "deceased_gender": gender, "father": True, "mother": True}
+    if gender == FEMALE:
+        case["husband"] = True
+    else:
+        case["wives"] = rng.randint(1, 4)
+    return case
+
+
+def large(rng):
+    """Hundreds or thousands of children, with or without other heirs"""
+    case = realistic(rng)
+    case["sons"] = rng.choice((0, rng.randint(1, 50), rng.randint(100, 5000)))
+    case["daughters"] = rng.choice((rng.randint(1, 50), rng.randint(100, 5000)))
+    return case
+
+
+def extreme(rng):
+    """A realistic family with a one-unit or a very large estate"""
+    case = realistic(rng)
+    case["estate"] = rng.choice((0.01, 1.0, 0.07, 1e12 + 0.01, 999_999_999_999.99))
+    return case
+
+
+KINDS = {
+    "realistic": realistic, "awl": awl, "radd": radd,
+    "gharrawain": gharrawain, "large": large, "extreme": extreme,
+}
+
+
+def generate(count, seed):
+    """count cases of every kind as (kind, raw payload)"""
+    rng = random.Random(seed)
+    return [(kind, make(rng)) for kind, make in KINDS.items() for _ in range(count)]
+
+
+# ==================== Invariants ====================
+
+def _exact(calculate, data, **options):
+    """exact=True amounts, or None when the engine refuses the fractions"""
+    try:
+        return calculate(data, exact=True, **options)
+    except ValueError:
+        return None
+
+
+def _inheritance_logic(name):
+    def shares(data):
+        data = inheritance_logic.normalize_case({**data, "madhab": name})
+        fractions = inheritance_logic.PROFILES[name].distribute(
+            inheritance_logic.composition_key(data)
+        )
+        return (
+            data, fractions,
+            inheritance_logic.calculate_inheritance(data, explain=False)[0],
+            (_exact(inheritance_logic.calculate_inheritance, data, explain=False) or [None])[0],
+        )
+    return shares
+
+
+def _module(module):
+    def shares(data):
+        data = inheritance_logic.normalize_case(data)
+        fractions = module.PROFILE.distribute(module.composition_key(data))
+        return data, fractions, module.calculate(data), _exact(module.calculate, data)
+    return shares
+
+
+ENGINES = {
+    **{f"inheritance_logic/{name}": _inheritance_logic(name) for name in MADHABS},
+    "engine": _module(engine),
+    "calculator": _module(calculator),
+}
+
+
+def violations(name, kind, data, fractions, amounts, exact):
+    """Names of the invariants one calculation breaks"""
+    broken = []
+    estate = data["estate"]
+    if (any(fraction < 0 for _, _, fraction in fractions)
+            or any(amount < 0 for amount in (*amounts.values(), *(exact or {}).values()))):
+        broken.append("negative")
+    if fractions and sum(fraction for _, _, fraction in fractions) != 1:
+        broken.append("whole")
+    if fractions:
+        places = inheritance_logic.case_places(data)
+        whole_estate = Decimal(str(estate)).quantize(Decimal(1).scaleb(-places))
+        if exact is None or sum(exact.values()) != whole_estate:
+            broken.append("exact")
+        # engine rounds every amount to the cent, the others keep the float
+        if abs(sum(amounts.values()) - estate) > 0.005 * len(amounts) + 1e-9 * estate:
+            broken.append("float")
+
+    by_rule = {rule: fraction for _, rule, fraction in fractions}
+    if "sons_asaba" in by_rule and "daughters_asaba" in by_rule:
+        if by_rule["sons_asaba"] / data["sons"] != 2 * by_rule["daughters_asaba"] / data["daughters"]:
+            broken.append("double")
+
+    if kind == "gharrawain" and name.startswith("inheritance_logic/"):
+        spouse = by_rule.get("husband_half", 0) + by_rule.get("wives_quarter", 0)
+        if by_rule.get("mother_third_remainder") != (1 - spouse) / 3:
+            broken.append("gharrawain")
+    return broken
+
+
+def check(cases, show):
+    """Violation counts per "engine/invariant" (examples of the first few printed)"""
+    counts = Counter()
+    shown = Counter()
+    for name, shares in ENGINES.items():
+        for kind, case in cases:
+            data, fractions, amounts, exact = shares(case)
+            for invariant in violations(name, kind, data, fractions, amounts, exact):
+                key = f"{name}/{invariant}"
+                counts[key] += 1
+                if shown[key] < show:
+                    shown[key] += 1
+                    given = {k: v for k, v in case.items() if v}
+                    print(f"  {key} ({kind}): {given}")
+                    print(f"      {[(heir, str(fraction)) for heir, _, fraction in fractions]}")
+    return counts
+
+
+# ==================== Timings ====================
+
+def _per_call(fn, args, repeat):
+    """
+    Median over args of the best of repeat single calls, in microseconds
+    (a call of a few microseconds timed once is mostly timer and cache noise)
+    """
+    best = [float("inf")] * len(args)
+    for _ in range(repeat):
+        for i, arg in enumerate(args):
+            start = perf_counter()
+            fn(*arg)
+            best[i] = min(best[i], perf_counter() - start)
+    return statistics.median(best) * 1e6
+
+
+def _batch(run, count, repeat):
+    """Best microseconds per case over repeat runs of the whole batch"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = perf_counter()
+        run()
+        best = min(best, perf_counter() - start)
+    return best / count * 1e6
+
+
+def _concurrent(fn, args, threads, repeat):
+    """Microseconds per case (wall time) with the calls spread over threads"""
+    with ThreadPoolExecutor(threads) as pool:
+        def run():
+            for _ in pool.map(lambda arg: fn(*arg), args):
+                pass
+        run()  # start the threads outside the measurement
+        return _batch(run, len(args), repeat)
+
+
+def _reference_work():
+    total = Fraction(0)
+    for n in range(1, 400):
+        total += Fraction(n % 7, n)
+    return total
+
+
+def reference():
+    """Best microseconds of a fixed workload, the unit the timings are compared in"""
+    return _batch(_reference_work, 1, 30)
+
+
+def timings(cases, render, threads, repeat):
+    """{"function/mode": microseconds per call}"""
+    import charts
+    import pdf_report
+
+    raw = [case for _, case in cases]
+    data = [inheritance_logic.normalize_case(case) for case in raw]
+    results = {}
+
+    calculations = {
+        "calculate_inheritance": inheritance_logic.calculate_inheritance,
+        "engine.calculate": engine.calculate,
+        "calculator.calculate": calculator.calculate,
+    }
+    for name, fn in calculations.items():
+        args = [(d,) for d in data]
+        fn(*args[0])
+        results[f"{name}/call"] = _per_call(fn, args, repeat)
+        if fn is inheritance_logic.calculate_inheritance:
+            batch = lambda: list(inheritance_logic.calculate_inheritance_many(raw, explain=True))  # noqa: E731
+        else:
+            batch = lambda: [fn(*arg) for arg in args]  # noqa: E731
+        results[f"{name}/batch"] = _batch(batch, len(args), repeat)
+        results[f"{name}/threads"] = _concurrent(fn, args, threads, repeat)
+
+    # reports and charts of the first render cases (a few are slow enough)
+    sample = data[:render]
+    calculated = [inheritance_logic.calculate_inheritance(d) for d in sample]
+    with tempfile.TemporaryDirectory() as tmp:
+        renders = {
+            "generate_pdf": (
+                lambda estate, explanation: pdf_report.generate_pdf(BytesIO(), estate, explanation),
+                [(d["estate"], explanation)
+                 for d, (_, explanation) in zip(sample, calculated)],
+            ),
+            "generate_pie_chart": (
+                charts.generate_pie_chart,
+                [({heir: float(amount) for heir, amount in shares.items()},
+                  os.path.join(tmp, f"chart_{i}.png"))
+                 for i, (shares, _) in enumerate(calculated) if shares],
+            ),
+        }
+        for name, (fn, args) in renders.items():
+            fn(*args[0])  # fonts, styles and matplotlib imports
+            results[f"{name}/call"] = _per_call(fn, args, 1)
+            results[f"{name}/batch"] = _batch(lambda: [fn(*arg) for arg in args], len(args), 1)
+            results[f"{name}/threads"] = _concurrent(fn, args, threads, 1)
+    return results
+
+
+# ==================== Baseline ====================
+
+def ratios(measured, unit):
+    """Timings as multiples of the reference workload"""
+    return {key: float(f"{value / unit:.4g}") for key, value in measured.items()}
+
+
+def compare(counts, measured, unit, baseline, threshold):
+    """Lines describing each violation and each timing regression"""
+    regressions = [f"{key}: {count} violations" for key, count in sorted(counts.items())]
+
+    if measured:
+        print(f"\nreference workload: {unit:.1f} us")
+        print(f"\n{'timing':<34}{'us/call':>12}{'ratio':>10}{'baseline':>10}{'change':>9}")
+    for key, ratio in ratios(measured, unit).items():
+        base = baseline.get("timings", {}).get(key)
+        change = f"{(ratio / base - 1) * 100:+.0f}%" if base else ""
+        print(f"{key:<34}{measured[key]:>12.1f}{ratio:>10}{base if base is not None else '':>10}"
+              f"{change:>9}")
+        if base and ratio > base * (1 + threshold):
+            regressions.append(f"{key}: {ratio} x reference, baseline {base} "
+                               f"(+{threshold:.0%} allowed)")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--cases", type=int, default=1000, help="cases of each kind")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--render", type=int, default=10, help="cases rendered as PDF and chart")
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="passes over the cases per timing (the best is kept)")
+    parser.add_argument("--threshold", type=float, default=0.5,
+                        help="allowed rise of a timing ratio over the baseline (0.5 = 50%%)")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="write the results as the new baseline instead of comparing")
+    parser.add_argument("--skip-timings", action="store_true")
+    parser.add_argument("--show", type=int, default=2, help="violations printed per invariant")
+    args = parser.parse_args(argv)
+
+    settings = {"cases": args.cases, "seed": args.seed, "render": args.render,
+                "threads": args.threads}
+    baseline = {}
+    if not args.update_baseline and os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("settings") != settings:
+            raise SystemExit(
+                f"{args.baseline} was recorded with other settings: {baseline.get('settings')}"
+            )
+
+    cases = generate(args.cases, args.seed)
+    print(f"{len(cases)} cases, {len(ENGINES)} engines")
+    counts = check(cases, args.show)
+    print(f"\n{'invariant':<44}{'violations':>11}")
+    for key in sorted(counts):
+        print(f"{key:<44}{counts[key]:>11}")
+    if not counts:
+        print("none")
+
+    measured, unit = {}, None
+    if not args.skip_timings:
+        unit = reference()
+        measured = timings(cases, args.render, args.threads, args.repeat)
+        # the lower of the two runs, in case the machine was busy for one of them
+        unit = min(unit, reference())
+
+    if args.update_baseline:
+        if counts:
+            print("\nthe invariants must hold before a baseline is recorded")
+            return 1
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({
+                "settings": settings,
+                "violations": {},
+                "timings": ratios(measured, unit),
+            }, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+        print(f"\nbaseline written to {args.baseline}")
+        return 0
+
+    if not baseline:
+        print(f"\nno baseline at {args.baseline}: record one with --update-baseline")
+    regressions = compare(counts, measured, unit, baseline, args.threshold)
+    for line in regressions:
+        print(f"FAIL {line}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,315 @@
+"""
+Bulk processing of case files without the HTTP server.
+
+    python bulk.py cases.csv results.csv
+    python bulk.py cases.ndjson results.ndjson --explain --pdf-dir reports/
+    python bulk.py cases.csv results.csv --resume      # after an interruption
+
+Input is CSV with a header row of schema field names (missing columns take
+their defaults), or NDJSON with one /calculate payload per line. It is read
+in chunks of --chunk cases. Each chunk is validated and calculated in a
+worker process and formatted there too. At most two chunks per worker are
+in flight, so memory stays flat whatever the input size. Results are
+written in input order:
+
+- CSV: one row per heir (index, heir, amount, error), the long format
+  of store.py exports; a rejected case is one row with its error.
+- NDJSON: the /calculate/batch results ({"index", "labels", "values"
+  [, "explanation"]} or {"index", "error"}).
+
+--pdf-dir also writes each case's report as case_<index>.pdf.
+
+After every chunk is written, a checkpoint (<output>.checkpoint) records
+how many cases and output bytes are done. --resume truncates the output
+to that point and skips the cases already done. The checkpoint is
+removed when the run completes.
+"""
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import csv
+import io
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+from explanation_text import DEFAULT_LOCALE, LOCALES
+from inheritance_logic import calculate_validated
+from schema import FIELD_NAMES, normalize_rows, validate_columns
+
+CHUNK = 1000
+
+OUTPUT_COLUMNS = ("index", "heir", "amount", "error")
+
+# seconds between progress lines
+PROGRESS_INTERVAL = 1.0
+
+
+def _format(path, given):
+    if given:
+        return given
+    return "ndjson" if path.endswith((".ndjson", ".jsonl", ".json")) else "csv"
+
+
+# ==================== Reading ====================
+
+def _csv_chunks(f, size):
+    """(header, list of up to size rows) from a CSV file"""
+    reader = csv.reader(f)
+    header = [name.strip() for name in next(reader, [])]
+    chunk = []
+    for row in reader:
+        if not row:
+            continue
+        chunk.append(row)
+        if len(chunk) == size:
+            yield header, chunk
+            chunk = []
+    if chunk:
+        yield header, chunk
+
+
+def _ndjson_chunks(f, size):
+    """(None, list of up to size non-empty lines) from an NDJSON file"""
+    chunk = []
+    for line in f:
+        if not line.strip():
+            continue
+        chunk.append(line)
+        if len(chunk) == size:
+            yield None, chunk
+            chunk = []
+    if chunk:
+        yield None, chunk
+
+
+def _skip(chunks, count):
+    """Drop the first count cases (already processed by a resumed run)"""
+    for header, rows in chunks:
+        if count >= len(rows):
+            count -= len(rows)
+            continue
+        yield header, rows[count:]
+        count = 0
+
+
+# ==================== Worker ====================
+
+def _validate(header, rows):
+    if header is None:
+        cases = []
+        for line in rows:
+            try:
+                cases.append(json.loads(line))
+            except ValueError:
+                cases.append(None)  # reported as an invalid case
+        return normalize_rows(cases)
+    columns = {
+        name: [row[i] if i < len(row) else "" for row in rows]
+        for i, name in enumerate(header) if name in FIELD_NAMES
+    }
+    return validate_columns(columns, len(rows))
+
+
+def process_chunk(offset, header, rows, options):
+    """
+    Validate, calculate and format one chunk (runs in a worker process).
+
+    Returns:
+        (cases, errors, text): the formatted output of the chunk
+    """
+    output_format, explain, exact, locale, pdf_dir = options
+    valid, errors = _validate(header, rows)
+    results = calculate_validated(
+        valid, errors, offset, explain=explain or bool(pdf_dir), exact=exact, locale=locale
+    )
+
+    out = io.StringIO()
+    writer = csv.writer(out) if output_format == "csv" else None
+    for data, result in zip(valid, results):
+        if pdf_dir and data is not None:
+            from pdf_report import generate_pdf
+            generate_pdf(
+                os.path.join(pdf_dir, f"case_{result['index']}.pdf"),
+                data["estate"], result["explanation"],
+            )
+        if not explain:
+            result.pop("explanation", None)
+        if writer is None:
+            out.write(json.dumps(result, ensure_ascii=False))
+            out.write("\n")
+        elif "error" in result:
+            writer.writerow((result["index"], "", "", result["error"]))
+        else:
+            for heir, amount in zip(result["labels"], result["values"]):
+                writer.writerow((result["index"], heir, amount, ""))
+    return len(rows), len(errors), out.getvalue()
+
+
+# ==================== Checkpoints ====================
+
+def _checkpoint_path(output):
+    return f"{output}.checkpoint"
+
+
+def _read_checkpoint(output, settings):
+    """(cases done, errors, output bytes) of a compatible checkpoint, else None"""
+    try:
+        with open(_checkpoint_path(output), encoding="utf-8") as f:
+            checkpoint = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if checkpoint.get("settings") != settings:
+        raise SystemExit(
+            f"{_checkpoint_path(output)} was written with other settings: "
+            f"{checkpoint.get('settings')}"
+        )
+    return checkpoint["cases"], checkpoint["errors"], checkpoint["bytes"]
+
+
+def _write_checkpoint(output, settings, cases, errors, size):
+    path = _checkpoint_path(output)
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        json.dump({"settings": settings, "cases": cases, "errors": errors, "bytes": size}, f)
+    os.replace(f"{path}.tmp", path)
+
+
+# ==================== Driver ====================
+
+class Progress:
+    """Cases, errors and throughput on stderr, at most once per PROGRESS_INTERVAL"""
+
+    def __init__(self, done=0, errors=0, quiet=False):
+        self.start = time.perf_counter()
+        self.resumed = done
+        self.cases = done
+        self.errors = errors
+        self.quiet = quiet
+        self._shown = 0.0
+        self._shown_cases = None
+
+    def update(self, cases, errors, final=False):
+        self.cases += cases
+        self.errors += errors
+        now = time.perf_counter()
+        if self.quiet or not (final or now - self._shown >= PROGRESS_INTERVAL):
+            return
+        if final and self._shown_cases == self.cases:
+            return
+        self._shown = now
+        self._shown_cases = self.cases
+        elapsed = now - self.start
+        rate = (self.cases - self.resumed) / elapsed if elapsed else 0.0
+        end = "\n" if final or not sys.stderr.isatty() else "\r"
+        print(
+            f"{self.cases} cases, {self.errors} errors, {rate:,.0f} cases/s, {elapsed:.1f}s",
+            end=end, file=sys.stderr, flush=True,
+        )
+
+
+def run(input_path, output_path, input_format=None, output_format=None, workers=None,
+        chunk=CHUNK, explain=False, exact=False, locale=DEFAULT_LOCALE, pdf_dir=None,
+        resume=False, quiet=False):
+    """Process input_path into output_path; returns (cases, errors)"""
+    input_format = _format(input_path, input_format)
+    output_format = _format(output_path, output_format)
+    settings = {
+        "input": os.path.abspath(input_path), "input_format": input_format,
+        "output_format": output_format, "explain": explain, "exact": exact, "locale": locale,
+    }
+    done, errors, size = (_read_checkpoint(output_path, settings) if resume else None) or (0, 0, 0)
+    if pdf_dir:
+        os.makedirs(pdf_dir, exist_ok=True)
+    options = (output_format, explain, exact, locale, pdf_dir)
+    workers = workers if workers is not None else os.cpu_count() or 1
+
+    # a resumed run drops whatever was written after the last checkpoint
+    out = open(output_path, "r+b" if done else "wb")
+    out.truncate(size)
+    out.seek(size)
+    if not done and output_format == "csv":
+        header = io.StringIO()
+        csv.writer(header).writerow(OUTPUT_COLUMNS)
+        out.write(header.getvalue().encode("utf-8"))
+
+    source = open(input_path, newline="" if input_format == "csv" else None, encoding="utf-8-sig")
+    chunks = (_csv_chunks if input_format == "csv" else _ndjson_chunks)(source, chunk)
+    progress = Progress(done, errors, quiet)
+
+    def write(cases, errors, text):
+        out.write(text.encode("utf-8"))
+        out.flush()
+        progress.update(cases, errors)
+        _write_checkpoint(output_path, settings, progress.cases, progress.errors, out.tell())
+
+    try:
+        offset = done
+        if workers <= 0:
+            for header, rows in _skip(chunks, done):
+                write(*process_chunk(offset, header, rows, options))
+                offset += len(rows)
+        else:
+            # spawn, as offload.py: workers start from a clean interpreter
+            pool = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+            )
+            try:
+                pending = deque()
+                for header, rows in _skip(chunks, done):
+                    pending.append(pool.submit(process_chunk, offset, header, rows, options))
+                    offset += len(rows)
+                    if len(pending) >= 2 * workers:
+                        write(*pending.popleft().result())
+                while pending:
+                    write(*pending.popleft().result())
+            except BaseException:
+                # interrupted or failed: the checkpoint already covers what was written
+                pool.shutdown(wait=False, cancel_futures=True)
+                raise
+            pool.shutdown()
+    finally:
+        source.close()
+        out.close()
+    progress.update(0, 0, final=True)
+    os.remove(_checkpoint_path(output_path))
+    return progress.cases, progress.errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Calculate a CSV or NDJSON file of cases")
+    parser.add_argument("input", help="cases, CSV with a header row or NDJSON")
+    parser.add_argument("output", help="results, CSV (one row per heir) or NDJSON")
+    parser.add_argument("--input-format", choices=("csv", "ndjson"),
+                        help="default: from the file extension")
+    parser.add_argument("--output-format", choices=("csv", "ndjson"),
+                        help="default: from the file extension")
+    parser.add_argument("--workers", type=int,
+                        help="worker processes (default: CPU count, 0 runs inline)")
+    parser.add_argument("--chunk", type=int, default=CHUNK, help="cases per chunk")
+    parser.add_argument("--explain", action="store_true",
+                        help="include the explanation (NDJSON output)")
+    parser.add_argument("--exact", action="store_true", help="exact minor-unit amounts")
+    parser.add_argument("--locale", choices=tuple(LOCALES), default=DEFAULT_LOCALE)
+    parser.add_argument("--pdf-dir", help="also write one PDF report per case here")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue from the output's checkpoint")
+    parser.add_argument("--quiet", action="store_true", help="no progress output")
+    args = parser.parse_args(argv)
+    if args.chunk <= 0:
+        parser.error("--chunk must be positive")
+
+    try:
+        run(
+            args.input, args.output, args.input_format, args.output_format, args.workers,
+            args.chunk, args.explain, args.exact, args.locale, args.pdf_dir,
+            args.resume, args.quiet,
+        )
+    except KeyboardInterrupt:
+        print("\ninterrupted; rerun with --resume to continue", file=sys.stderr)
+        sys.exit(130)
+
+
+if __name__ == "__main__":
+    main()
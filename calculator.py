@@ -1,53 +1,49 @@
-from rules import fixed_shares
-
-def calculate(data):
+from exact import exact_amounts
+from rule_engine import Profile, asaba, awl, composition, mother_third_of_remainder, radd
+from rules import FIXED, LABELS, MOTHER_SIXTH_SIBLINGS
+from share_cache import composition_cache
+
+# Fixed shares -> awl -> mother's third of the remaining -> children (2:1)
+# -> father takes what is left -> radd
+PROFILE = Profile("calculator", (
+    FIXED,
+    awl,
+    mother_third_of_remainder,
+    asaba(
+        ("asaba", (("sons", 2), ("daughters", 1)), False),
+        ("asaba", (("father", 1),), True),
+    ),
+    radd,
+), LABELS)
+
+
+def composition_key(data):
+    """Heir composition that determines the share fractions (estate excluded)"""
+    return composition(
+        husband=data["husband"],
+        wives=data["wives"] > 0,
+        mother=data.get("mother", False),
+        father=data.get("father", False),
+        sons=data["sons"],
+        daughters=data["daughters"],
+        # the siblings only matter through the mother's sixth: counts are
+        # capped at its threshold, so larger families share a key
+        brothers=min(data["brothers"], MOTHER_SIXTH_SIBLINGS),
+        sisters=min(data["sisters"], MOTHER_SIXTH_SIBLINGS),
+    )
+
+@composition_cache("calculator")
+def share_fractions(key):
+    """Exact fraction of the estate per heir for a composition_key"""
+    return tuple((heir, fraction) for heir, _, fraction in PROFILE.distribute(key))
+
+def calculate(data, exact=False):
+    """
+    Share amounts per heir. With exact=True the amounts are Decimals in
+    minor units that always sum to the estate (see exact.exact_amounts).
+    """
     estate = data["estate"]
-    ratios = fixed_shares(data)
-
-    used = sum(ratios.values())
-    results = {}
-
-    # Awl
-    if used > 1:
-        for k in ratios:
-            ratios[k] /= used
-
-    remaining = estate
-
-    # Fixed shares
-    for k, v in ratios.items():
-        results[k] = estate * v
-        remaining -= results[k]
-
-    # If mother exists but was not allocated a fixed share (i.e., rules didn't give 1/6),
-    # and there are no children, she takes one-third of the remaining after fixed shares.
-    if data.get("mother") and "الأم" not in results:
-        # allocate one-third of the remaining
-        mother_amount = remaining * (1/3)
-        results["الأم"] = mother_amount
-        remaining -= mother_amount
-
-    # Asaba (sons & daughters)
-    units = data["sons"] * 2 + data["daughters"]
-    if units > 0:
-        unit_value = remaining / units
-        if data["sons"]:
-            results["الأبناء"] = data["sons"] * unit_value * 2
-        if data["daughters"]:
-            results["البنات"] = data["daughters"] * unit_value
-        remaining = 0
-
-    # If there are no children and father exists, father takes the remaining (residuary)
-    if remaining > 0 and units == 0:
-        if data.get("father"):
-            results["الأب"] = results.get("الأب", 0) + remaining
-            remaining = 0
-        else:
-            # Radd: distribute remaining proportionally among existing heirs
-            total = sum(results.values())
-            if total > 0:
-                for k in list(results.keys()):
-                    results[k] += (results[k] / total) * remaining
-                remaining = 0
-
-    return results
+    fractions = share_fractions(composition_key(data))
+    if exact:
+        return exact_amounts(estate, fractions)
+    return {k: estate * float(v) for k, v in fractions}
@@ -1,28 +1,85 @@
 # charts.py
-import matplotlib.pyplot as plt
-import arabic_reshaper
-from bidi.algorithm import get_display
-from matplotlib import rcParams
+from functools import partial
+from io import BytesIO
+import os
 
-rcParams["font.family"] = "DejaVu Sans"
+from arabic_text import ar
+from metrics import span
+from offload import BoundedExecutor
+from prefork import init_worker
+from share_cache import ShareCache
+
+# matplotlib is only imported where charts are rendered (the pool workers)
+CHART_RC = {"font.family": "DejaVu Sans"}
+
+MIMETYPES = {"png": "image/png", "svg": "image/svg+xml"}
+
+# Rendered charts keyed on (format, labels, rounded percentages), bounded by bytes
+CHART_CACHE = ShareCache(
+    "chart", maxsize=int(os.environ.get("CHART_CACHE_BYTES", 16 * 1024 * 1024)), weigh=len
+)
+
+# Rendering runs in processes so matplotlib stays off the request threads;
+# CHART_WORKERS / CHART_QUEUE size the pool and its admission limit; each
+# worker starts with matplotlib loaded and the shaping cache warm
+CHART_EXECUTOR = BoundedExecutor(
+    "chart", "process", workers=2, queue_depth=8,
+    initializer=partial(init_worker, "shaping", "charts"),
+)
+
+
+def render_pie_chart(results, fmt="png", dpi=150):
+    """
+    Render the pie chart with an object-oriented Figure (no pyplot global
+    state) and return the image bytes. fmt is "png" or "svg".
+    """
+    from matplotlib import rc_context
+    from matplotlib.figure import Figure
+
+    if fmt not in MIMETYPES:
+        raise ValueError(f"unsupported chart format: {fmt}")
+
+    with rc_context(CHART_RC):
+        fig = Figure(figsize=(6, 6))
+        ax = fig.subplots()
+        ax.pie(
+            list(results.values()),
+            labels=[ar(k) for k in results.keys()],
+            autopct='%1.1f%%',
+            startangle=90
+        )
+        ax.set_title(ar("توزيع التركة"))
+        ax.axis("equal")
+        fig.tight_layout()
+
+        buffer = BytesIO()
+        fig.savefig(buffer, format=fmt, dpi=dpi)
+    return buffer.getvalue()
 
-def ar(text):
-    """Fix Arabic shaping + RTL"""
-    return get_display(arabic_reshaper.reshape(text))
 
 def generate_pie_chart(results, filename="chart.png"):
-    labels = [ar(k) for k in results.keys()]
-    sizes = list(results.values())
-
-    plt.figure(figsize=(6, 6))
-    plt.pie(
-        sizes,
-        labels=labels,
-        autopct='%1.1f%%',
-        startangle=90
-    )
-    plt.title(ar("توزيع التركة"))
-    plt.axis("equal")
-    plt.tight_layout()
-    plt.savefig(filename, dpi=150)
-    plt.close()
+    with open(filename, "wb") as f:
+        f.write(render_pie_chart(results))
+
+
+def chart_key(results, fmt="png"):
+    """Cache key: the chart only depends on the labels and the percentages shown"""
+    total = sum(results.values())
+    percentages = tuple(round(v / total * 100, 1) if total else 0.0 for v in results.values())
+    return (fmt, tuple(results.keys()), percentages)
+
+
+def chart_bytes(results, fmt="png", timeout=30):
+    """
+    Return the rendered chart, rendering in the process pool on a cache miss.
+
+    Raises offload.Busy when the pool's queue is full.
+    """
+    def build(key):
+        _, labels, percentages = key
+        with span("chart_render"):
+            return CHART_EXECUTOR.run(
+                render_pie_chart, dict(zip(labels, percentages)), fmt, timeout=timeout
+            )
+
+    return CHART_CACHE.get(chart_key(results, fmt), build)
@@ -1,107 +1,91 @@
-def has_descendants(d):
-    return (
-        d["sons"] or d["daughters"] or
-        d["son_sons"] or d["son_daughters"]
-    )
-
-def calculate(data):
-    estate = data["estate"]
-    shares = {}
-    fixed = 0
+from exact import exact_amounts
+from rule_engine import (
+    Profile, asaba, awl, blocking, composition, father, fixed_shares,
+    grandmother, husband, maternal_siblings, mother, radd, wives,
+)
+from share_cache import composition_cache
+import rule_table
 
-    # ===== الزوج =====
-    if data["husband"]:
-        s = 1/4 if has_descendants(data) else 1/2
-        shares["الزوج"] = s
-        fixed += s
 
-    # ===== الزوجات =====
-    if data["wives"] > 0:
-        s = 1/8 if has_descendants(data) else 1/4
-        shares["الزوجات"] = s
-        fixed += s
+# ===== الفروض =====
+FIXED = fixed_shares(
+    ("husband", husband),
+    ("wives", wives),
+    ("mother", mother(min_siblings=2, third_of="estate")),
+    ("grandmother", grandmother),
+    ("father", father),
+    ("maternal_siblings", maternal_siblings),
+)
 
-    # ===== الأم =====
-    if data["mother"]:
-        if has_descendants(data) or data["brothers"] + data["sisters"] >= 2:
-            s = 1/6
-        else:
-            s = 1/3
-        shares["الأم"] = s
-        fixed += s
+# ===== الحجب =====
+BLOCKING = blocking({
+    "grandmother": ("mother",),
+    "maternal_siblings": ("descendants", "father"),
+    "brothers": ("descendants", "father"),
+    "sisters": ("descendants", "father"),
+})
 
-    # ===== الجدة =====
-    if data["grandmother"] and not data["mother"]:
-        shares["الجدة"] = 1/6
-        fixed += 1/6
+# fixed shares and blocking depend only on presence, see rule_table
+RULES = (FIXED, BLOCKING)
 
-    # ===== الأب =====
-    father_asaba = False
-    if data["father"]:
-        if has_descendants(data):
-            shares["الأب"] = 1/6
-            fixed += 1/6
-        else:
-            father_asaba = True
+# ===== العصبات: الأب، ثم الفروع، ثم الإخوة إن بقي شيء =====
+ASABA = asaba(
+    ("asaba", (("father", 1),), False),
+    ("asaba", (("sons", 2), ("daughters", 1), ("son_sons", 2), ("son_daughters", 1)), False),
+    ("asaba", (("brothers", 2), ("sisters", 1)), True),
+)
 
-    # ===== الإخوة لأم =====
-    if not has_descendants(data) and not data["father"]:
-        total = data["brothers_mother"] + data["sisters_mother"]
-        if total == 1:
-            shares["إخوة لأم"] = 1/6
-            fixed += 1/6
-        elif total > 1:
-            shares["إخوة لأم"] = 1/3
-            fixed += 1/3
+LABELS = {
+    "husband": "الزوج",
+    "wives": "الزوجات",
+    "mother": "الأم",
+    "grandmother": "الجدة",
+    "father": "الأب",
+    "maternal_siblings": "إخوة لأم",
+    "sons": "الابن",
+    "daughters": "البنت",
+    "son_sons": "ابن الابن",
+    "son_daughters": "بنت الابن",
+    "brothers": "الأخ",
+    "sisters": "الأخت",
+}
 
-    # ===== العَول =====
-    if fixed > 1:
-        for k in shares:
-            shares[k] = shares[k] / fixed
-        fixed = 1
+TABLE = rule_table.load(RULES) or rule_table.compile_table(RULES)
 
-    remainder = 1 - fixed
+PROFILE = Profile("engine", (TABLE.as_pass(), awl, ASABA, radd), LABELS)
 
-    # ===== الأب عصبة =====
-    if father_asaba:
-        shares["الأب"] = remainder
-        remainder = 0
+# Same rules evaluated pass by pass, for checking the compiled table
+UNCOMPILED_PROFILE = Profile("engine", (*RULES, awl, ASABA, radd), LABELS)
 
-    # ===== الفروع عصبة =====
-    units = (
-        data["sons"] * 2 +
-        data["daughters"] +
-        data["son_sons"] * 2 +
-        data["son_daughters"]
+def composition_key(data):
+    """Heir composition that determines the share fractions (estate excluded)"""
+    return composition(
+        husband=data["husband"],
+        wives=data["wives"] > 0,
+        mother=data["mother"],
+        grandmother=data["grandmother"],
+        father=data["father"],
+        sons=data["sons"],
+        daughters=data["daughters"],
+        son_sons=data["son_sons"],
+        son_daughters=data["son_daughters"],
+        brothers=data["brothers"],
+        sisters=data["sisters"],
+        maternal_siblings=data["brothers_mother"] + data["sisters_mother"],
     )
 
-    if units > 0:
-        unit = remainder / units
-        if data["sons"]:
-            shares["الابن"] = unit * 2 * data["sons"]
-        if data["daughters"]:
-            shares["البنت"] = unit * data["daughters"]
-        if data["son_sons"]:
-            shares["ابن الابن"] = unit * 2 * data["son_sons"]
-        if data["son_daughters"]:
-            shares["بنت الابن"] = unit * data["son_daughters"]
-        remainder = 0
+@composition_cache("engine")
+def share_fractions(key):
+    """Exact fraction of the estate per heir for a composition_key"""
+    return tuple((heir, fraction) for heir, _, fraction in PROFILE.distribute(key))
 
-    # ===== الإخوة عصبة (إن لم يوجد أب ولا فروع) =====
-    if remainder > 0 and not has_descendants(data) and not data["father"]:
-        units = data["brothers"] * 2 + data["sisters"]
-        if units:
-            unit = remainder / units
-            if data["brothers"]:
-                shares["الأخ"] = unit * 2 * data["brothers"]
-            if data["sisters"]:
-                shares["الأخت"] = unit * data["sisters"]
-            remainder = 0
-
-    # ===== الرد =====
-    if remainder > 0:
-        total = sum(shares.values())
-        for k in shares:
-            shares[k] += shares[k] / total * remainder
-
-    return {k: round(v * estate, 2) for k, v in shares.items()}
+def calculate(data, exact=False):
+    """
+    Share amounts per heir. With exact=True the amounts are Decimals in
+    minor units that always sum to the estate (see exact.exact_amounts).
+    """
+    estate = data["estate"]
+    fractions = share_fractions(composition_key(data))
+    if exact:
+        return exact_amounts(estate, fractions)
+    return {k: round(float(v) * estate, 2) for k, v in fractions}
@@ -0,0 +1,107 @@
+"""
+Exact share arithmetic.
+
+Share fractions (see share_cache) are exact, so the only rounding needed is
+the final conversion of each heir's quota to the currency's minor unit. The
+rounding remainder is handed out with a largest-remainder pass so the
+allocated amounts always add up to the estate; fractions that do not
+cover the whole estate are refused rather than over- or under-allocated.
+
+The arithmetic is integer-only: the fractions are brought over their base
+denominator, so an estate of any size (in minor units) is split without
+float rounding. CURRENCY_PLACES gives the minor unit per ISO 4217 code.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+from fractions import Fraction
+from math import lcm
+
+DEFAULT_PLACES = 2
+
+# decimal places of the minor unit per ISO 4217 currency code
+CURRENCY_PLACES = {
+    # three decimals (fils, baisa, millime, dirham)
+    "BHD": 3, "IQD": 3, "JOD": 3, "KWD": 3, "LYD": 3, "OMR": 3, "TND": 3,
+    # no minor unit in use
+    "IDR": 0, "IRR": 0, "JPY": 0, "KRW": 0, "UGX": 0, "VND": 0, "XAF": 0, "XOF": 0,
+    # two decimals
+    "AED": 2, "AFN": 2, "BDT": 2, "CAD": 2, "CHF": 2, "CNY": 2, "DZD": 2, "EGP": 2,
+    "EUR": 2, "GBP": 2, "INR": 2, "LBP": 2, "MAD": 2, "MRU": 2, "MYR": 2, "NGN": 2,
+    "PKR": 2, "QAR": 2, "SAR": 2, "SDG": 2, "SOS": 2, "SYP": 2, "TRY": 2, "USD": 2,
+    "YER": 2,
+}
+
+
+def currency_places(currency=None):
+    """Minor-unit decimal places of a currency code (DEFAULT_PLACES for None)"""
+    if currency is None:
+        return DEFAULT_PLACES
+    try:
+        return CURRENCY_PLACES[currency]
+    except (KeyError, TypeError):
+        raise ValueError("رمز العملة غير مدعوم") from None
+
+
+def to_minor_units(amount, places=2):
+    """Convert an amount (float, str, int or Decimal) to integer minor units"""
+    value = Decimal(str(amount)).scaleb(places)
+    return int(value.to_integral_value(rounding=ROUND_HALF_UP))
+
+
+def from_minor_units(units, places=2):
+    return Decimal(units).scaleb(-places)
+
+
+def base_units(fractions):
+    """
+    Express the fractions over their base denominator (أصل المسألة).
+
+    Returns:
+        Tuple of (base, [units per fraction]) with sum(units) / base equal to
+        the distributed part of the estate
+    """
+    fractions = [f if type(f) is Fraction else Fraction(f) for f in fractions]
+    base = lcm(*(f.denominator for f in fractions)) if fractions else 1
+    return base, [f.numerator * (base // f.denominator) for f in fractions]
+
+
+def allocate(total_units, fractions):
+    """
+    Split an integer total by exact fractions with a largest-remainder pass.
+
+    Each heir gets the floor of its quota; the minor units lost to flooring
+    go one at a time to the largest fractional remainders (earlier heirs win
+    ties), so the result sums to exactly total_units.
+
+    Raises:
+        ValueError: when the fractions do not add up to the whole estate
+    """
+    base, units = base_units(fractions)
+    if units and sum(units) != base:
+        # a profile that over- or under-distributes would silently mint or
+        # lose money here
+        raise ValueError("الحصص لا تستغرق التركة")
+    # quota i is units[i] * total_units / base: whole part and remainder
+    amounts = []
+    remainders = []
+    for unit in units:
+        amount, remainder = divmod(unit * total_units, base)
+        amounts.append(amount)
+        remainders.append(remainder)
+    # fewer than len(units) units were lost to flooring
+    leftover = total_units - sum(amounts)
+
+    if leftover:
+        order = sorted(range(len(units)), key=lambda i: -remainders[i])
+        for i in order[:leftover]:
+            amounts[i] += 1
+    return amounts
+
+
+def exact_amounts(estate, fractions, places=2):
+    """
+    Map (heir, fraction) pairs onto the estate as Decimal amounts in the
+    currency's minor unit. The fractions must add up to 1 (see allocate).
+    """
+    heirs = [heir for heir, _ in fractions]
+    units = allocate(to_minor_units(estate, places), [f for _, f in fractions])
+    return {heir: from_minor_units(u, places) for heir, u in zip(heirs, units)}
@@ -0,0 +1,378 @@
+"""
+Explanation templates per locale and their rendering from a calculation trace.
+
+The calculation (inheritance_logic.calculate_trace) only produces a Trace:
+the estate, madhab, heir composition, one step per heir and the awl or
+radd applied. The explanation lines are rendered from it on request, so
+callers that only need the shares never format a string, and the same
+trace can be rendered again in another locale without recomputing.
+
+A locale is a set of pre-built format strings: the header, awl/radd and
+summary lines, the lines per rule id ({heir}, {amount}, {each} and {base}
+are filled in from the step: the amount its rule gave, before awl or radd,
+and the remainder it was taken from), and the heir and madhab names. "ar" reuses the Arabic heir
+labels the shares are keyed by. Amounts are written with two decimals; a
+trace in a currency with another minor unit (exact.CURRENCY_PLACES) is
+rendered from a copy of the templates with that many, built on first use.
+"""
+from collections import namedtuple
+
+from exact import DEFAULT_PLACES, base_units, currency_places
+
+DEFAULT_LOCALE = "ar"
+
+Locale = namedtuple("Locale", ("name", "text", "rules", "labels", "madhabs"))
+
+_VERSE_SPOUSE_CHILDREN_HUSBAND = "﴿فَلَكُمُ الرُّبُعُ مِمَّا تَرَكْنَ إِن كَانَ لَهُنَّ وَلَدٌ﴾ (النساء 12)"
+_VERSE_PARENTS_SIXTH = "﴿وَلِأَبَوَيْهِ لِكُلِّ وَاحِدٍ مِّنْهُمَا السُّدُسُ مِمَّا تَرَكَ إِن كَانَ لَهُ وَلَدٌ﴾ (النساء 11)"
+_VERSE_TWO_FEMALES = "﴿لِلذَّكَرِ مِثْلُ حَظِّ الْأُنثَيَيْنِ﴾ (النساء 11)"
+_VERSE_KALALA = "﴿وَإِن كَانَ رَجُلٌ يُورَثُ كَلَالَةً﴾ (النساء 12)"
+
+_ARABIC = Locale(
+    "ar",
+    {
+        "header": "📖 تفاصيل الحساب والآيات القرآنية:",
+        "estate": "💰 قيمة التركة الكاملة: {estate:,.2f}",
+        "madhab": "🕌 المذهب: {madhab}",
+        "summary": "📊 ملخص التوزيع:",
+        "share": "{heir}: {amount:,.2f} ({percentage:.1f}%)",
+        "total": "إجمالي التوزيع: {total:,.2f}",
+        "base": "🔢 أصل المسألة: {base}",
+        "remaining": "⚠️ الباقي: {remaining:,.2f}",
+        "awl": "⚖️ العول: الفروض ({fraction}) أكثر من التركة، فعالت المسألة من {base} إلى {raised}"
+               " ونقص كل فرض بنسبته",
+        "radd": "↩️ الرد: بقي {amount:,.2f} ({fraction}) ولا عاصب، فرُدّ على أصحاب الفروض"
+                " غير الزوجين بقدر فروضهم",
+        "radd_spouse": "↩️ الرد: بقي {amount:,.2f} ({fraction}) ولا وارث غير {heir}، فرُدّ على {heir}",
+    },
+    {
+        "husband_quarter": (
+            "👨 الزوج: الربع (1/4) = {amount:,.2f}",
+            "قال الله تعالى: " + _VERSE_SPOUSE_CHILDREN_HUSBAND,
+        ),
+        "husband_half": (
+            "👨 الزوج: النصف (1/2) = {amount:,.2f}",
+            "قال الله تعالى: ﴿فَلَكُمْ نِصْفُ مَا تَرَكَ أَزْوَاجُكُمْ إِن لَّمْ يَكُن لَّهُنَّ وَلَدٌ﴾ (النساء 12)",
+        ),
+        "wives_eighth": (
+            "👩 {heir}: الثمن (1/8) = {amount:,.2f}",
+            "لكل زوجة: {each:,.2f}",
+            "قال الله تعالى: ﴿فَإِن كَانَ لَكُمْ وَلَدٌ فَلَهُنَّ الثُّمُنُ مِمَّا تَرَكْتُمْ﴾ (النساء 12)",
+        ),
+        "wives_quarter": (
+            "👩 {heir}: الربع (1/4) = {amount:,.2f}",
+            "لكل زوجة: {each:,.2f}",
+            "قال الله تعالى: ﴿وَلَهُنَّ الرُّبُعُ مِمَّا تَرَكْتُمْ إِن لَّمْ يَكُن لَكُمْ وَلَدٌ﴾ (النساء 12)",
+        ),
+        "mother_sixth_children": (
+            "👩 الأم: السدس (1/6) = {amount:,.2f}",
+            "قال الله تعالى: " + _VERSE_PARENTS_SIXTH,
+        ),
+        "mother_sixth_siblings": (
+            "👩 الأم: السدس (1/6) = {amount:,.2f}",
+            "قال الله تعالى: ﴿فَإِن كَانَ لَهُ إِخْوَةٌ فَلِأُمِّهِ السُّدُسُ﴾ (النساء 11)",
+        ),
+        "father_sixth": (
+            "👨 الأب: السدس (1/6) = {amount:,.2f}",
+            "قال الله تعالى: " + _VERSE_PARENTS_SIXTH,
+        ),
+        "mother_third": (
+            "👩 الأم: الثلث (1/3) = {amount:,.2f}",
+            "﴿فَإِن لَّمْ يَكُن لَّهُ وَلَدٌ وَوَرِثَهُ أَبَوَاهُ فَلِأُمِّهِ الثُّلُثُ﴾ (النساء 11)",
+        ),
+        "mother_third_remainder": (
+            "👩 الأم: الثلث من الباقي (1/3 من {base:,.2f}) = {amount:,.2f}",
+            "﴿فَإِن لَّمْ يَكُن لَّهُ وَلَدٌ وَوَرِثَهُ أَبَوَاهُ فَلِأُمِّهِ الثُّلُثُ﴾ (النساء 11)",
+        ),
+        "sons_asaba": (
+            "👦 {heir}: تعصيب = {amount:,.2f}",
+            "لكل ابن ذكر حظ يساوي حظ أنثيين",
+            _VERSE_TWO_FEMALES,
+        ),
+        "daughters_asaba": (
+            "👧 {heir}: تعصيب = {amount:,.2f}",
+            "لكل بنت: {each:,.2f}",
+            _VERSE_TWO_FEMALES,
+        ),
+        "father_asaba": (
+            "👨 الأب: تعصيب (الباقي) = {amount:,.2f}",
+            "الأب يأخذ الباقي من التركة (تعصيب)",
+            "﴿يُوصِيكُمُ اللَّهُ فِي أَوْلَادِكُمْ﴾ (النساء 11)",
+        ),
+        "brothers_kalala": (
+            "👨 {heir}: كلالة = {amount:,.2f}",
+            _VERSE_KALALA,
+        ),
+        "sisters_kalala": (
+            "👩 {heir}: كلالة = {amount:,.2f}",
+            _VERSE_KALALA,
+        ),
+        "grandfather_asaba": (
+            "👨 الجد: تعصيب (الباقي) = {amount:,.2f}",
+        ),
+        "grandfather_muqasama": (
+            "👨 الجد: مقاسمة الإخوة كأخ = {amount:,.2f}",
+        ),
+        "grandfather_third": (
+            "👨 الجد: ثلث التركة (1/3) لأنه خير له من المقاسمة = {amount:,.2f}",
+        ),
+        "grandfather_third_remainder": (
+            "👨 الجد: ثلث الباقي لأنه خير له من المقاسمة = {amount:,.2f}",
+        ),
+        "grandfather_sixth": (
+            "👨 الجد: السدس (1/6) لأنه خير له من المقاسمة = {amount:,.2f}",
+        ),
+        "brothers_with_grandfather": (
+            "👨 {heir}: الباقي بعد نصيب الجد = {amount:,.2f}",
+        ),
+        "sisters_with_grandfather": (
+            "👩 {heir}: الباقي بعد نصيب الجد = {amount:,.2f}",
+        ),
+        "grandmother_sixth": (
+            "👵 الجدة: السدس (1/6) = {amount:,.2f}",
+        ),
+    },
+    None,
+    {},
+)
+
+_ENGLISH = Locale(
+    "en",
+    {
+        "header": "📖 Calculation details and Quranic verses:",
+        "estate": "💰 Total estate: {estate:,.2f}",
+        "madhab": "🕌 Madhab: {madhab}",
+        "summary": "📊 Distribution summary:",
+        "share": "{heir}: {amount:,.2f} ({percentage:.1f}%)",
+        "total": "Total distributed: {total:,.2f}",
+        "base": "🔢 Base of the case (asl al-mas'ala): {base}",
+        "remaining": "⚠️ Undistributed: {remaining:,.2f}",
+        "awl": "⚖️ Awl: the fixed shares ({fraction}) exceed the estate, so the base rises"
+               " from {base} to {raised} and every share is reduced in proportion",
+        "radd": "↩️ Radd: {amount:,.2f} ({fraction}) is left with no residuary heir and returns"
+                " to the fixed-share heirs other than the spouse, in proportion to their shares",
+        "radd_spouse": "↩️ Radd: {amount:,.2f} ({fraction}) is left and there is no heir"
+                       " besides the spouse ({heir}), so it returns to the spouse",
+    },
+    {
+        "husband_quarter": (
+            "👨 Husband: a quarter (1/4) = {amount:,.2f}",
+            "\"For you is a quarter of what they leave if they have a child\" (An-Nisa 4:12)",
+        ),
+        "husband_half": (
+            "👨 Husband: a half (1/2) = {amount:,.2f}",
+            "\"For you is half of what your wives leave if they have no child\" (An-Nisa 4:12)",
+        ),
+        "wives_eighth": (
+            "👩 {heir}: an eighth (1/8) = {amount:,.2f}",
+            "Each wife: {each:,.2f}",
+            "\"If you leave a child, for them is an eighth of what you leave\" (An-Nisa 4:12)",
+        ),
+        "wives_quarter": (
+            "👩 {heir}: a quarter (1/4) = {amount:,.2f}",
+            "Each wife: {each:,.2f}",
+            "\"For them is a quarter of what you leave if you have no child\" (An-Nisa 4:12)",
+        ),
+        "mother_sixth_children": (
+            "👩 Mother: a sixth (1/6) = {amount:,.2f}",
+            "\"For each of the parents is a sixth of what he leaves if he has a child\" (An-Nisa 4:11)",
+        ),
+        "mother_sixth_siblings": (
+            "👩 Mother: a sixth (1/6) = {amount:,.2f}",
+            "\"If he has siblings, for his mother is a sixth\" (An-Nisa 4:11)",
+        ),
+        "father_sixth": (
+            "👨 Father: a sixth (1/6) = {amount:,.2f}",
+            "\"For each of the parents is a sixth of what he leaves if he has a child\" (An-Nisa 4:11)",
+        ),
+        "mother_third": (
+            "👩 Mother: a third (1/3) = {amount:,.2f}",
+            "\"If he has no child and his parents inherit from him, for his mother is a third\""
+            " (An-Nisa 4:11)",
+        ),
+        "mother_third_remainder": (
+            "👩 Mother: a third of the remainder (1/3 of {base:,.2f}) = {amount:,.2f}",
+            "\"If he has no child and his parents inherit from him, for his mother is a third\""
+            " (An-Nisa 4:11)",
+        ),
+        "sons_asaba": (
+            "👦 {heir}: residue (ta'sib) = {amount:,.2f}",
+            "Each son takes the share of two daughters",
+            "\"For the male, the like of the portion of two females\" (An-Nisa 4:11)",
+        ),
+        "daughters_asaba": (
+            "👧 {heir}: residue (ta'sib) = {amount:,.2f}",
+            "Each daughter: {each:,.2f}",
+            "\"For the male, the like of the portion of two females\" (An-Nisa 4:11)",
+        ),
+        "father_asaba": (
+            "👨 Father: residue (the remainder) = {amount:,.2f}",
+            "The father takes what remains of the estate (ta'sib)",
+            "\"Allah instructs you concerning your children\" (An-Nisa 4:11)",
+        ),
+        "brothers_kalala": (
+            "👨 {heir}: kalala = {amount:,.2f}",
+            "\"If a man or a woman leaves neither parent nor child\" (An-Nisa 4:12)",
+        ),
+        "sisters_kalala": (
+            "👩 {heir}: kalala = {amount:,.2f}",
+            "\"If a man or a woman leaves neither parent nor child\" (An-Nisa 4:12)",
+        ),
+        "grandfather_asaba": (
+            "👨 Grandfather: residue (the remainder) = {amount:,.2f}",
+        ),
+        "grandfather_muqasama": (
+            "👨 Grandfather: shares with the siblings as a brother (muqasama) = {amount:,.2f}",
+        ),
+        "grandfather_third": (
+            "👨 Grandfather: a third of the estate (1/3), better for him than muqasama"
+            " = {amount:,.2f}",
+        ),
+        "grandfather_third_remainder": (
+            "👨 Grandfather: a third of the remainder, better for him than muqasama = {amount:,.2f}",
+        ),
+        "grandfather_sixth": (
+            "👨 Grandfather: a sixth (1/6), better for him than muqasama = {amount:,.2f}",
+        ),
+        "brothers_with_grandfather": (
+            "👨 {heir}: the remainder after the grandfather's share = {amount:,.2f}",
+        ),
+        "sisters_with_grandfather": (
+            "👩 {heir}: the remainder after the grandfather's share = {amount:,.2f}",
+        ),
+        "grandmother_sixth": (
+            "👵 Grandmother: a sixth (1/6) = {amount:,.2f}",
+        ),
+    },
+    {
+        "husband": "Husband",
+        "wives": "Wives ({n})",
+        "mother": "Mother",
+        "father": "Father",
+        "sons": "Sons ({n})",
+        "daughters": "Daughters ({n})",
+        "brothers": "Brothers ({n})",
+        "sisters": "Sisters ({n})",
+        "grandfather": "Grandfather",
+        "grandmother": "Grandmother",
+    },
+    {"شافعي": "Shafi'i", "مالكي": "Maliki", "حنبلي": "Hanbali", "حنفي": "Hanafi"},
+)
+
+LOCALES = {locale.name: locale for locale in (_ARABIC, _ENGLISH)}
+
+
+def _compile(lines):
+    """Static lines as they are, templated ones as bound str.format methods"""
+    return tuple(line.format if "{" in line else line for line in lines)
+
+
+def _with_places(line, places):
+    return line.replace(",.2f}", f",.{places}f}}") if places != DEFAULT_PLACES else line
+
+
+def _prepare(locale, places):
+    """(text, rule lines) of a locale with amounts written to places decimals"""
+    return (
+        {name: _with_places(line, places) for name, line in locale.text.items()},
+        {
+            rule: _compile([_with_places(line, places) for line in lines])
+            for rule, lines in locale.rules.items()
+        },
+    )
+
+
+# (text, rule lines) per (locale, places), prepared once so rendering skips
+# parsing static lines
+_TEMPLATES = {
+    (name, DEFAULT_PLACES): _prepare(locale, DEFAULT_PLACES) for name, locale in LOCALES.items()
+}
+
+
+def _templates(locale, places):
+    templates = _TEMPLATES.get((locale.name, places))
+    if templates is None:
+        templates = _TEMPLATES[(locale.name, places)] = _prepare(locale, places)
+    return templates
+
+SEPARATOR = "=" * 50
+
+
+def get_locale(name=None):
+    """Locale by name (default DEFAULT_LOCALE); ValueError for anything else"""
+    if name is None:
+        name = DEFAULT_LOCALE
+    try:
+        return LOCALES[name]
+    except (KeyError, TypeError):
+        raise ValueError("اللغة غير مدعومة") from None
+
+
+def heir_class(rule):
+    """Heir class a rule id belongs to ("wives_eighth" -> "wives")"""
+    return rule.split("_")[0]
+
+
+def _each_count(key, rule):
+    """Number of individuals sharing a group amount (for per-person lines)"""
+    if rule in ("wives_eighth", "wives_quarter"):
+        return key.wives
+    if rule == "daughters_asaba":
+        return key.daughters
+    return 1
+
+
+def render(trace, locale=None):
+    """Explanation lines for an inheritance_logic.Trace in the given locale"""
+    locale = get_locale(locale)
+    text, templates = _templates(
+        locale, currency_places(trace.currency) if trace.currency else DEFAULT_PLACES
+    )
+    key = trace.key
+    if locale.labels is None:
+        labels = [step.heir for step in trace.steps]
+    else:
+        labels = [
+            locale.labels[heir].format(n=getattr(key, heir))
+            for heir in (heir_class(step.rule) for step in trace.steps)
+        ]
+
+    explanation = [
+        text["header"],
+        text["estate"].format(estate=trace.estate),
+        text["madhab"].format(madhab=locale.madhabs.get(trace.madhab, trace.madhab)),
+        SEPARATOR,
+    ]
+    for step, label in zip(trace.steps, labels):
+        # the rule's own share; awl and radd are explained on their own lines
+        amount = step.amount if step.assigned is None else step.assigned
+        fields = {
+            "heir": label,
+            "amount": amount,
+            "each": amount / _each_count(key, step.rule),
+            "base": step.base,
+        }
+        explanation.append("")
+        for line in templates[step.rule]:
+            explanation.append(line if type(line) is str else line(**fields))
+    for adjustment in trace.adjustments:
+        explanation += ["", text[adjustment.rule].format(
+            fraction=adjustment.fraction, amount=adjustment.amount, base=adjustment.base,
+            raised=adjustment.raised, heir=labels[0],
+        )]
+
+    explanation += ["", SEPARATOR, text["summary"], ""]
+    estate = trace.estate
+    total = sum(step.amount for step in trace.steps)
+    share = text["share"].format
+    for step, label in zip(trace.steps, labels):
+        percentage = (step.amount / estate * 100) if estate > 0 else 0
+        explanation.append(share(heir=label, amount=step.amount, percentage=percentage))
+
+    explanation += ["", text["total"].format(total=total)]
+    if trace.exact:
+        base, _ = base_units([step.fraction for step in trace.steps])
+        explanation.append(text["base"].format(base=base))
+    if abs(total - estate) > 0.01:
+        explanation.append(text["remaining"].format(remaining=estate - total))
+    return explanation
@@ -1,6 +1,10 @@
 # explanations.py
+from madhab import DEFAULT
 
-def get_explanation(heir, madhab):
+
+def get_explanation(heir, madhab=DEFAULT):
+    # madhab is a Madhab profile or, as callers passed it before, its name
+    name = madhab if isinstance(madhab, str) else madhab.name
     explanations = {
         "الزوج": "للزوج النصف أو الربع حسب وجود الفرع الوارث. قال تعالى: (ولكم نصف ما ترك أزواجكم...).",
         "الزوجات": "للزوجات الربع أو الثمن حسب وجود الفرع الوارث.",
@@ -12,5 +16,5 @@ def get_explanation(heir, madhab):
 
     return explanations.get(
         heir,
-        f"يرث حسب قواعد الفرائض المعتمدة في المذهب {madhab}."
+        f"يرث حسب قواعد الفرائض المعتمدة في المذهب {name}."
     )
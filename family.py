@@ -0,0 +1,333 @@
+"""
+Family-graph input.
+
+Instead of flat counts a case can describe the family as persons and
+edges:
+
+    {
+        "deceased": "p1",
+        "persons": [{"id": "p1", "gender": "ذكر"},
+                    {"id": "p2", "gender": "أنثى", "alive": false}, ...],
+        "parents": [["p1", "p2"], ...],   # [child, parent]
+        "spouses": [["p1", "p3"], ...]
+    }
+
+resolve() indexes every living relative of the deceased by line and
+degree (sons' sons at any depth, full / paternal / maternal siblings,
+nephews, uncles, cousins, the nearest true grandparents), applies hajb
+between those lines and reduces what is left to the count fields of
+/calculate. Deceased persons stay in the graph as links (a dead son's sons
+are still sons' sons). A graph where someone is their own ancestor is
+rejected. Building the indexes is linear in persons plus edges; every
+relation is then a few set operations.
+"""
+from collections import defaultdict, namedtuple
+
+MALE = "ذكر"
+FEMALE = "أنثى"
+
+# Relative lines in the order the resolver reports them
+LINES = {
+    "husband": "الزوج",
+    "wives": "الزوجات",
+    "father": "الأب",
+    "mother": "الأم",
+    "grandfather": "الجد",
+    "grandmother": "الجدة",
+    "sons": "الأبناء",
+    "daughters": "البنات",
+    "son_sons": "أبناء الابن",
+    "son_daughters": "بنات الابن",
+    "brothers": "الإخوة الأشقاء",
+    "sisters": "الأخوات الشقيقات",
+    "halfbrothers_father": "الإخوة لأب",
+    "halfsisters_father": "الأخوات لأب",
+    "brothers_mother": "الإخوة لأم",
+    "sisters_mother": "الأخوات لأم",
+    "nephews": "أبناء الإخوة الأشقاء",
+    "nephews_father": "أبناء الإخوة لأب",
+    "uncles": "الأعمام الأشقاء",
+    "uncles_father": "الأعمام لأب",
+    "cousins": "أبناء الأعمام الأشقاء",
+    "cousins_father": "أبناء الأعمام لأب",
+}
+
+# Residuary (asaba) lines by priority: a present line excludes every later one
+ASABA_ORDER = (
+    "sons", "son_sons", "father", "grandfather", "brothers", "halfbrothers_father",
+    "nephews", "nephews_father", "uncles", "uncles_father", "cousins", "cousins_father",
+)
+
+SIBLING_LINES = ("brothers", "halfbrothers_father")
+
+# Lines the calculator takes as counts (normalize_case fields); the engine
+# applies its own blocking to them
+SUPPORTED = (
+    "husband", "wives", "father", "mother", "grandfather", "grandmother",
+    "sons", "daughters", "brothers", "sisters",
+)
+
+# Fields of /calculate that are flags rather than counts
+FLAGS = ("husband", "father", "mother", "grandfather", "grandmother")
+
+Resolution = namedtuple(
+    "Resolution", ("deceased_gender", "relatives", "blocked", "counts", "unsupported")
+)
+
+
+def _list(family, field):
+    """A list field of the graph (missing means empty)"""
+    value = family.get(field)
+    if value is None:
+        return []
+    if not isinstance(value, list):
+        raise ValueError(f"الحقل {field} في شجرة العائلة يجب أن يكون قائمة")
+    return value
+
+
+class FamilyGraph:
+    """Persons and parent/spouse edges indexed for relative lookups"""
+
+    def __init__(self, family):
+        if not isinstance(family, dict):
+            raise ValueError("صيغة شجرة العائلة غير صحيحة")
+        self.gender = {}
+        self.alive = {}
+        for person in _list(family, "persons"):
+            if not isinstance(person, dict) or "id" not in person:
+                raise ValueError("كل شخص يحتاج إلى معرّف")
+            pid = str(person["id"])
+            if pid in self.gender:
+                raise ValueError(f"المعرّف {pid} مكرر")
+            gender = person.get("gender")
+            if gender not in (MALE, FEMALE):
+                raise ValueError(f"جنس الشخص {pid} غير صحيح")
+            self.gender[pid] = gender
+            self.alive[pid] = bool(person.get("alive", True))
+
+        self.father = {}
+        self.mother = {}
+        self.children = defaultdict(set)
+        for child, parent in self._edges(_list(family, "parents")):
+            parents = self.father if self.gender[parent] == MALE else self.mother
+            if parents.get(child, parent) != parent:
+                raise ValueError(f"للشخص {child} أكثر من أب أو أم")
+            parents[child] = parent
+            self.children[parent].add(child)
+        self._check_acyclic()
+
+        self.spouses = defaultdict(set)
+        for a, b in self._edges(_list(family, "spouses")):
+            self.spouses[a].add(b)
+            self.spouses[b].add(a)
+
+    def _check_acyclic(self):
+        """Reject a person who is their own ancestor (the walks up and down would not end)"""
+        done = set()
+        for start in self.gender:
+            on_path = set()
+            stack = [(start, False)]
+            while stack:
+                person, leaving = stack.pop()
+                if leaving:
+                    on_path.discard(person)
+                    done.add(person)
+                    continue
+                if person in done:
+                    continue
+                if person in on_path:
+                    raise ValueError(f"شجرة العائلة غير صحيحة: الشخص {person} من أصول نفسه")
+                on_path.add(person)
+                stack.append((person, True))
+                for parent in (self.father.get(person), self.mother.get(person)):
+                    if parent is not None and parent not in done:
+                        stack.append((parent, False))
+
+    def _edges(self, edges):
+        for edge in edges:
+            if not isinstance(edge, (list, tuple)) or len(edge) != 2:
+                raise ValueError("صيغة العلاقة غير صحيحة")
+            a, b = str(edge[0]), str(edge[1])
+            if a not in self.gender or b not in self.gender:
+                raise ValueError("العلاقة تشير إلى شخص غير موجود")
+            yield a, b
+
+    def males(self, people):
+        return {p for p in people if self.gender[p] == MALE}
+
+    def females(self, people):
+        return {p for p in people if self.gender[p] == FEMALE}
+
+    def sons_of(self, people):
+        return {
+            child for p in people for child in self.children.get(p, ())
+            if self.gender[child] == MALE
+        }
+
+    def siblings(self, person):
+        """(full, paternal half, maternal half) siblings of person"""
+        father, mother = self.father.get(person), self.mother.get(person)
+        paternal = set(self.children.get(father, ())) - {person} if father else set()
+        maternal = set(self.children.get(mother, ())) - {person} if mother else set()
+        full = paternal & maternal
+        return full, paternal - full, maternal - full
+
+    def nearest(self, start, step):
+        """Nearest living person on a chain of ancestors (step maps a person to the next)"""
+        person = step(start)
+        while person is not None and not self.alive[person]:
+            person = step(person)
+        return person
+
+
+def _index(graph, deceased):
+    """Every relative line of deceased -> set of person ids (living and dead)"""
+    lines = {}
+    spouses = graph.spouses.get(deceased, set())
+    lines["husband"] = graph.males(spouses)
+    lines["wives"] = graph.females(spouses)
+    father, mother = graph.father.get(deceased), graph.mother.get(deceased)
+    lines["father"] = {father} if father else set()
+    lines["mother"] = {mother} if mother else set()
+
+    # nearest true grandparents: the father's father line, and the mothers
+    # reached through mothers (from either parent) without a male in between
+    grandfather = graph.nearest(father, graph.father.get) if father else None
+    lines["grandfather"] = {grandfather} if grandfather else set()
+    grandmothers = set()
+    for parent in (father, mother):
+        if parent:
+            grandmother = graph.nearest(parent, graph.mother.get)
+            if grandmother:
+                grandmothers.add(grandmother)
+    lines["grandmother"] = grandmothers
+
+    children = graph.children.get(deceased, set())
+    lines["sons"] = graph.males(children)
+    lines["daughters"] = graph.females(children)
+
+    # descendants through sons at any depth: the nearest generation with a
+    # living member stands in for sons' children, deeper ones are excluded by it
+    lines["son_sons"] = lines["son_daughters"] = set()
+    generation = lines["sons"]
+    while generation:
+        grandchildren = {c for p in generation for c in graph.children.get(p, ())}
+        if any(graph.alive[c] for c in grandchildren):
+            lines["son_sons"] = graph.males(grandchildren)
+            lines["son_daughters"] = graph.females(grandchildren)
+            break
+        generation = graph.males(grandchildren)
+
+    full, paternal, maternal = graph.siblings(deceased)
+    lines["brothers"] = graph.males(full)
+    lines["sisters"] = graph.females(full)
+    lines["halfbrothers_father"] = graph.males(paternal)
+    lines["halfsisters_father"] = graph.females(paternal)
+    lines["brothers_mother"] = graph.males(maternal)
+    lines["sisters_mother"] = graph.females(maternal)
+    lines["nephews"] = graph.sons_of(lines["brothers"])
+    lines["nephews_father"] = graph.sons_of(lines["halfbrothers_father"])
+
+    if father:
+        full, paternal, _ = graph.siblings(father)
+        lines["uncles"] = graph.males(full)
+        lines["uncles_father"] = graph.males(paternal)
+    else:
+        lines["uncles"] = lines["uncles_father"] = set()
+    lines["cousins"] = graph.sons_of(lines["uncles"])
+    lines["cousins_father"] = graph.sons_of(lines["uncles_father"])
+    return lines
+
+
+def _hajb(present):
+    """line -> the line that excludes it, for lines the calculator does not model"""
+    blocked = {}
+    descendants = ("sons", "daughters", "son_sons", "son_daughters")
+
+    for line in ("son_sons", "son_daughters"):
+        if present["sons"]:
+            blocked[line] = "sons"
+    # two daughters complete the two thirds unless a son's son makes them asaba
+    if "son_daughters" not in blocked and present["daughters"] >= 2 and not present["son_sons"]:
+        blocked["son_daughters"] = "daughters"
+
+    for line in ("brothers_mother", "sisters_mother"):
+        for blocker in descendants + ("father", "grandfather"):
+            if present[blocker]:
+                blocked[line] = blocker
+                break
+
+    # residuary lines: any earlier present line excludes the later ones, except
+    # that whether the grandfather excludes siblings depends on the madhab
+    for i, line in enumerate(ASABA_ORDER):
+        for blocker in ASABA_ORDER[:i]:
+            if blocker == "grandfather" and line in SIBLING_LINES:
+                continue
+            if present[blocker]:
+                blocked.setdefault(line, blocker)
+                break
+
+    for blocker in ("sons", "son_sons", "father", "brothers"):
+        if present[blocker]:
+            blocked["halfsisters_father"] = blocker
+            break
+    else:
+        if present["sisters"] >= 2 and not present["halfbrothers_father"]:
+            blocked["halfsisters_father"] = "sisters"
+
+    # lines the engine blocks itself are left alone
+    return {line: blocker for line, blocker in blocked.items() if line not in SUPPORTED}
+
+
+def resolve(family):
+    """
+    Resolve a family graph into the count fields of /calculate.
+
+    Returns:
+        Resolution with the deceased's gender, the living relatives per line,
+        the lines excluded by hajb (line -> excluding line), the counts, and
+        the living, unexcluded lines the calculator cannot represent yet
+
+    Raises:
+        ValueError: with an Arabic message suitable for the API response
+    """
+    graph = FamilyGraph(family)
+    deceased = str(family.get("deceased", ""))
+    if deceased not in graph.gender:
+        raise ValueError("المتوفى غير موجود في شجرة العائلة")
+
+    relatives = {
+        line: sorted(p for p in people if graph.alive[p])
+        for line, people in _index(graph, deceased).items()
+    }
+    present = {line: len(people) for line, people in relatives.items()}
+    blocked = _hajb(present)
+
+    counts = {"deceased_gender": graph.gender[deceased]}
+    for line in SUPPORTED + ("halfbrothers_father", "halfsisters_father"):
+        count = 0 if line in blocked else present[line]
+        counts[line] = count > 0 if line in FLAGS else count
+    unsupported = [
+        line for line in LINES
+        if line not in SUPPORTED and present[line] and line not in blocked
+    ]
+    return Resolution(graph.gender[deceased], relatives, blocked, counts, unsupported)
+
+
+def case_from_family(received):
+    """
+    Merge the counts resolved from received["family"] into a raw payload.
+
+    Raises:
+        ValueError: when the graph is invalid or leaves heirs the calculator
+            cannot represent
+    """
+    resolution = resolve(received["family"])
+    if resolution.unsupported:
+        names = "، ".join(
+            f"{LINES[line]} ({len(resolution.relatives[line])})" for line in resolution.unsupported
+        )
+        raise ValueError(f"الحالة تتضمن ورثة غير مدعومين في الحساب بعد: {names}")
+    case = {key: value for key, value in received.items() if key != "family"}
+    case.update(resolution.counts)
+    return case
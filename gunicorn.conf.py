@@ -0,0 +1,33 @@
+# gunicorn -c gunicorn.conf.py app:app
+#
+# Environment:
+#   RESULT_TOKEN_SECRET  key signing the result tokens of /calculate (see
+#                        result_token.py). Set it to the same random value
+#                        on every host: without it each start draws a new
+#                        key and tokens issued before a restart, or by
+#                        another host, are rejected.
+#   RESULT_DB            SQLite file of the result store (store.py), e.g.
+#                        /var/lib/mawarith/results.db; unset, nothing is
+#                        stored and /cases/<id> answers 404
+#   BIND, WEB_CONCURRENCY, THREADS      listen address, workers, threads
+#   PRELOAD_RENDERERS=0  skip the renderer warm-up (prefork.py)
+import os
+
+bind = os.environ.get("BIND", "127.0.0.1:5000")
+workers = int(os.environ.get("WEB_CONCURRENCY", 2))
+# threads per worker: /calculate is answered while other threads wait on
+# PDF/chart renders running in the offload pools
+worker_class = "gthread"
+threads = int(os.environ.get("THREADS", 8))
+
+# import the app once in the master so workers fork with it loaded
+preload_app = True
+
+
+def on_starting(server):
+    # also load reportlab and warm the shaping cache before forking
+    # (PRELOAD_RENDERERS=0 skips it); matplotlib only runs in the chart pool
+    # workers, which load it themselves
+    import prefork
+    if prefork.ENABLED:
+        prefork.preload(charts=False)
@@ -1,13 +1,22 @@
+"""
+Fixed shares (فروض) per heir, as exact Fractions of the estate.
+
+rule_engine's fixed-share rules take their values from here.
+"""
+from fractions import Fraction
+
 FARAID = {
-    "husband": {"half": 1/2, "quarter": 1/4},
-    "wife": {"quarter": 1/4, "eighth": 1/8},
-    "mother": {"third": 1/3, "sixth": 1/6},
-    "father": {"sixth": 1/6},
-    "daughter": {"half": 1/2, "two_thirds": 2/3},
+    "husband": {"half": Fraction(1, 2), "quarter": Fraction(1, 4)},
+    "wife": {"quarter": Fraction(1, 4), "eighth": Fraction(1, 8)},
+    "mother": {"third": Fraction(1, 3), "sixth": Fraction(1, 6)},
+    "father": {"sixth": Fraction(1, 6)},
+    "grandfather": {"sixth": Fraction(1, 6), "third": Fraction(1, 3)},
+    "grandmother": {"sixth": Fraction(1, 6)},
+    "daughter": {"half": Fraction(1, 2), "two_thirds": Fraction(2, 3)},
     "son": {},
     "son_son": {},
-    "son_daughter": {"half": 1/2, "two_thirds": 2/3},
-    "brother_mother": {"sixth": 1/6, "third": 1/3},
-    "sister_mother": {"sixth": 1/6, "third": 1/3},
-    "sister": {"half": 1/2, "two_thirds": 2/3},
+    "son_daughter": {"half": Fraction(1, 2), "two_thirds": Fraction(2, 3)},
+    "brother_mother": {"sixth": Fraction(1, 6), "third": Fraction(1, 3)},
+    "sister_mother": {"sixth": Fraction(1, 6), "third": Fraction(1, 3)},
+    "sister": {"half": Fraction(1, 2), "two_thirds": Fraction(2, 3)},
 }
@@ -1,14 +1,368 @@
-from arabic_reshaper import reshape
-from bidi.algorithm import get_display
+from collections import namedtuple
+from decimal import ROUND_HALF_UP, Decimal
+import hashlib
+import json
 
+from arabic_text import ar
+from exact import (
+    allocate, base_units, currency_places, exact_amounts, from_minor_units, to_minor_units,
+)
+from explanation_text import DEFAULT_LOCALE, LOCALES, SEPARATOR, heir_class, render
+from madhab import DEFAULT, MADHABS, get_madhab
+from metrics import span, timed
+from schema import normalize, normalize_rows
+from rule_engine import (
+    Profile, asaba, awl, blocking, composition, father, fixed_shares,
+    grandfather_with_siblings, grandmother, husband, mother, mother_third_of_remainder,
+    radd, wives,
+)
+from share_cache import composition_cache
 
-def ar(text):
-    """Display Arabic text correctly with reshaping and bidirectional support"""
-    reshaped = reshape(text)
-    return get_display(reshaped)
 
+@timed("normalize")
+def normalize_case(received):
+    """
+    Normalize and validate a raw request payload into the Case expected by
+    calculate_inheritance (see schema.py).
+
+    Raises:
+        ValueError: with an Arabic message suitable for the API response
+    """
+    return normalize(received)
+
+
+def case_digest(data):
+    """Content address of a normalized case (stable across processes)"""
+    # unset optional fields (currency, estate_minor) are left out, so
+    # cases without them keep the digest they had before those fields
+    canonical = json.dumps(
+        {name: value for name, value in data.items() if value is not None},
+        sort_keys=True, ensure_ascii=False, separators=(",", ":"),
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def case_places(data):
+    """Decimal places of the case's currency minor unit (2 without a currency)"""
+    return currency_places(data.get('currency'))
+
+
+def _estate_units(data, places):
+    """The estate in minor units: estate_minor when given, else the rounded estate"""
+    units = data.get('estate_minor')
+    return units if units is not None else to_minor_units(data.get('estate', 0), places)
+
+
+def calculate_minor_units(data, places=None, madhab=None):
+    """
+    Shares as integer minor units per heir (largest-remainder allocation),
+    without building the explanation. places defaults to the case's currency.
+    """
+    with span("shares"):
+        madhab = madhab or get_madhab(data.get('madhab'))
+        entries = share_fractions(composition_key(data), madhab)
+        units = allocate(
+            _estate_units(data, case_places(data) if places is None else places),
+            [fraction for _, _, fraction in entries],
+        )
+        return {heir: amount for (heir, _, _), amount in zip(entries, units)}
+
+
+def calculate_inheritance_many(cases, explain=False, exact=False, locale=None):
+    """
+    Validate and calculate a batch of raw cases, yielding one result per case.
+
+    Rows are validated in chunks of BATCH_CHUNK (schema.normalize_rows);
+    errors are reported per case so one bad row does not abort the batch.
+
+    Args:
+        cases: iterable of raw payload dictionaries (as sent to /calculate)
+        explain: include the explanation list in each result
+        exact: use exact minor-unit allocation (see calculate_inheritance)
+        locale: explanation language (default "ar")
+
+    Yields:
+        {"index", "labels", "values"[, "explanation"]} or {"index", "error"}
+    """
+    for offset, chunk in _chunks(cases, BATCH_CHUNK):
+        valid, errors = normalize_rows(chunk)
+        yield from calculate_validated(valid, errors, offset, explain, exact, locale)
+
+
+def calculate_validated(valid, errors, offset=0, explain=False, exact=False, locale=None):
+    """
+    Results as calculate_inheritance_many for rows already validated by
+    schema.normalize_rows or schema.validate_columns; offset is the index
+    of the first row.
+    """
+    for index, data in enumerate(valid, offset):
+        if data is None:
+            yield {"index": index, "error": errors[index - offset]}
+            continue
+        shares, explanation = calculate_inheritance(
+            data, exact=exact, explain=explain, locale=locale
+        )
+        places = case_places(data)
+        result = {
+            "index": index,
+            "labels": list(shares.keys()),
+            "values": [float(round(v, places)) for v in shares.values()],
+        }
+        if explain:
+            result["explanation"] = explanation
+        yield result
+
+
+# rows validated together by calculate_inheritance_many; small enough that a
+# streamed batch still answers promptly
+BATCH_CHUNK = 256
+
+
+def _chunks(rows, size):
+    """(offset, list of up to size rows) over any iterable"""
+    chunk = []
+    offset = 0
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield offset, chunk
+            offset += size
+            chunk = []
+    if chunk:
+        yield offset, chunk
+
+
+# ==================== RULE PIPELINE ====================
+# Spouse, mother (1/6 with children or any sibling), father (1/6 with
+# children) and grandmother (1/6) take fixed shares; the mother otherwise
+# takes a third of the remaining (the Umariyyatan, as all four schools rule). Fixed shares above the estate are reduced by awl.
+# Children, then the father, then the siblings (kalala), then the
+# grandfather take the residue; how the grandfather meets the siblings
+# depends on the madhab. A surplus with no residuary heir is returned by
+# radd to the heirs other than the spouse (to the spouse only when nobody
+# else inherits), so the shares always cover the whole estate.
+# Half-siblings from the father's side are not yet considered.
+LABELS = {
+    "husband": "الزوج",
+    "wives": "الزوجات ({n})",
+    "mother": "الأم",
+    "father": "الأب",
+    "sons": "الأبناء الذكور ({n})",
+    "daughters": "البنات ({n})",
+    "brothers": "الإخوة ({n})",
+    "sisters": "الأخوات ({n})",
+    "grandfather": "الجد",
+    "grandmother": "الجدة",
+}
+
+
+def build_profile(madhab):
+    """Rule pipeline for one madhab profile"""
+    sibling_blockers = ("father", "descendants")
+    if madhab.grandfather_with_siblings == "blocks":
+        sibling_blockers += ("grandfather",)
+
+    passes = [
+        fixed_shares(
+            ("husband", husband),
+            ("wives", wives),
+            ("mother", mother(min_siblings=1)),
+            ("father", father),
+            ("grandmother", grandmother),
+        ),
+        blocking({
+            "wives": ("husband",),
+            "brothers": sibling_blockers,
+            "sisters": sibling_blockers,
+            "grandfather": ("father", "descendants"),
+            "grandmother": ("mother", "descendants"),
+        }),
+    ]
+    passes += [mother_third_of_remainder, awl]
+    if madhab.grandfather_with_siblings == "shares":
+        passes.append(grandfather_with_siblings)
+    passes += [
+        asaba(
+            ("asaba", (("sons", 2), ("daughters", 1)), False),
+            ("asaba", (("father", 1),), True),
+            ("kalala", (("brothers", 2), ("sisters", 1)), True),
+            ("asaba", (("grandfather", 1),), True),
+        ),
+        radd,
+    ]
+    return Profile(f"inheritance_logic:{madhab.name}", passes, LABELS)
+
+
+# One pipeline and one composition cache per madhab, built once at import
+PROFILES = {name: build_profile(madhab) for name, madhab in MADHABS.items()}
+PROFILE = PROFILES[DEFAULT.name]
+_DISTRIBUTIONS = {
+    name: composition_cache(profile.name)(profile.distribution)
+    for name, profile in PROFILES.items()
+}
+
+
+def composition_key(data):
+    """
+    Reduce a normalized payload to the hashable heir composition that
+    determines the share fractions (everything except the estate value).
+    """
+    return composition(
+        husband=data.get('husband', False),
+        wives=data.get('wives', 0),
+        father=data.get('father', False),
+        mother=data.get('mother', False),
+        sons=data.get('sons', 0),
+        daughters=data.get('daughters', 0),
+        brothers=data.get('brothers', 0),
+        sisters=data.get('sisters', 0),
+        grandfather=data.get('grandfather', False),
+        grandmother=data.get('grandmother', False),
+    )
+
+
+def share_fractions(key, madhab=DEFAULT):
+    """
+    Compute the exact share of each heir as a fraction of the estate.
+
+    Args:
+        key: heir composition as returned by composition_key
+        madhab: Madhab profile whose rules apply
+
+    Returns:
+        Tuple of (heir_name, rule, Fraction) in distribution order, where
+        rule identifies the Sharia rule applied (used for the explanation).
+    """
+    return _DISTRIBUTIONS[madhab.name](key).shares
 
-def calculate_inheritance(data):
+
+def share_distribution(key, madhab=DEFAULT):
+    """share_fractions with the remainders the shares were taken from and awl/radd
+    (rule_engine.Distribution), from the same cache"""
+    return _DISTRIBUTIONS[madhab.name](key)
+
+
+def static_texts():
+    """
+    Representative Arabic explanation lines and heir labels (numbers are
+    samples), used to warm up the Arabic shaping cache.
+    """
+    locale = LOCALES[DEFAULT_LOCALE]
+    samples = {"estate": 1.0, "madhab": "", "total": 1.0, "base": 1, "remaining": 1.0,
+               "fraction": "1/3", "amount": 1.0, "raised": 1, "heir": LABELS["husband"]}
+    texts = [
+        locale.text["header"],
+        locale.text["estate"].format(**samples),
+        SEPARATOR,
+        locale.text["summary"],
+        locale.text["total"].format(**samples),
+        locale.text["remaining"].format(**samples),
+        locale.text["base"].format(**samples),
+        *(locale.text[rule].format(**samples) for rule in ("awl", "radd", "radd_spouse")),
+        *(locale.text["madhab"].format(madhab=name) for name in MADHABS),
+        # report and chart titles
+        "قيمة التركة: 1.0",
+        "توزيع التركة",
+    ]
+    for rule, lines in locale.rules.items():
+        heir = LABELS[heir_class(rule)].format(n=1)
+        texts.extend(line.format(heir=heir, amount=1.0, each=1.0, base=1.0) for line in lines)
+    for label in LABELS.values():
+        heir = label.format(n=1)
+        texts.append(heir)
+        texts.append(locale.text["share"].format(heir=heir, amount=1.0, percentage=1.0))
+    return texts
+
+
+# One step per heir: the rule applied, its exact share of the estate, the
+# heir label the shares are keyed by and the amount. assigned is the amount
+# the rule gave before awl or radd changed it, base the remainder a share
+# was taken from (the mother's third of the remainder); both None otherwise.
+Step = namedtuple(
+    "Step", ("rule", "fraction", "heir", "amount", "assigned", "base"), defaults=(None, None)
+)
+# awl or radd as applied: the rule ("awl", "radd" or "radd_spouse"), the
+# fraction of the estate (the fixed shares' total for awl, the surplus for
+# radd) and its amount; awl also gives the base of the case (أصل المسألة)
+# and what it rises to
+Adjustment = namedtuple(
+    "Adjustment", ("rule", "fraction", "amount", "base", "raised"), defaults=(None, None)
+)
+Trace = namedtuple(
+    "Trace", ("estate", "madhab", "key", "exact", "steps", "currency", "adjustments"),
+    defaults=(None, ()),
+)
+
+
+def _amounts(data, exact, madhab):
+    """
+    (estate, composition, share entries, {heir: amount}) for a normalized
+    case. A case in minor units (estate_minor, set with every currency) is
+    allocated in integers whatever exact says.
+    """
+    with span("shares"):
+        key = composition_key(data)
+        entries = share_fractions(key, madhab)
+
+        if data.get('estate_minor') is not None:
+            places = case_places(data)
+            units = allocate(data['estate_minor'], [fraction for _, _, fraction in entries])
+            estate = from_minor_units(data['estate_minor'], places)
+            amounts = {
+                heir: from_minor_units(amount, places)
+                for (heir, _, _), amount in zip(entries, units)
+            }
+        elif exact:
+            estate = Decimal(str(data.get('estate', 0)))
+            amounts = exact_amounts(estate, [(heir, fraction) for heir, _, fraction in entries])
+        else:
+            estate = float(data.get('estate', 0))
+            amounts = {heir: estate * float(fraction) for heir, _, fraction in entries}
+    return estate, key, entries, amounts
+
+
+def calculate_trace(data, exact=False, madhab=None):
+    """
+    Structured result of a calculation: a Trace of the estate, madhab name,
+    heir composition and one Step per heir in distribution order. Amounts
+    are Decimal minor-unit allocations when exact (always for a case in
+    minor units, see _amounts), floats otherwise.
+    explanation_text.render turns a trace into explanation lines.
+    """
+    madhab = madhab or get_madhab(data.get('madhab'))
+    estate, key, entries, amounts = _amounts(data, exact, madhab)
+    distribution = share_distribution(key, madhab)
+    exact = exact or data.get('estate_minor') is not None
+    places = case_places(data)
+
+    def portion(fraction):
+        if fraction is None:
+            return None
+        if exact:
+            return (estate * fraction.numerator / fraction.denominator).quantize(
+                Decimal(1).scaleb(-places), rounding=ROUND_HALF_UP
+            )
+        return estate * float(fraction)
+
+    steps = tuple(
+        Step(rule, fraction, heir, amounts[heir],
+             portion(distribution.assigned.get(heir)), portion(distribution.bases.get(heir)))
+        for heir, rule, fraction in entries
+    )
+    adjustments = []
+    for rule, fraction in distribution.adjustments:
+        if rule == "awl":
+            # the fixed shares over their common base, before it was raised
+            base, units = base_units([distribution.assigned[heir] for heir, _, _ in entries])
+            adjustments.append(Adjustment(rule, fraction, portion(fraction), base, sum(units)))
+        else:
+            adjustments.append(Adjustment(rule, fraction, portion(fraction)))
+    return Trace(
+        estate, madhab.name, key, exact, steps, data.get('currency'), tuple(adjustments)
+    )
+
+
+def calculate_inheritance(data, exact=False, explain=True, madhab=None, locale=None):
     """
     Calculate Islamic inheritance distribution according to Sharia rules.
     
@@ -28,213 +382,27 @@ def calculate_inheritance(data):
             - grandmother: boolean
             - halfbrothers_father: number of half-brothers from father
             - halfsisters_father: number of half-sisters from father
+            - madhab: name of the madhab profile (default شافعي)
+        exact: allocate Decimal amounts in minor units that add up exactly
+            (largest-remainder rounding) instead of float amounts
+        explain: build the explanation list; when False it is returned empty
+        madhab: Madhab profile overriding data["madhab"]
+        locale: explanation language (see explanation_text.LOCALES, default "ar")
     
     Returns:
         Tuple of (shares_dict, explanation_list) where:
         - shares_dict: {heir_name: amount}
         - explanation_list: list of explanation strings with Quranic verses
     """
-    
-    shares = {}
-    explanation = []
-    estate = float(data.get('estate', 0))
-    
-    # Extract heir counts
-    wives = int(data.get('wives', 0))
-    husband = bool(data.get('husband', False))
-    father = bool(data.get('father', False))
-    mother = bool(data.get('mother', False))
-    sons = int(data.get('sons', 0))
-    daughters = int(data.get('daughters', 0))
-    brothers = int(data.get('brothers', 0))
-    sisters = int(data.get('sisters', 0))
-    grandfather = bool(data.get('grandfather', False))
-    grandmother = bool(data.get('grandmother', False))
-    halfbrothers_father = int(data.get('halfbrothers_father', 0))
-    halfsisters_father = int(data.get('halfsisters_father', 0))
-    
-    has_children = sons > 0 or daughters > 0
-    has_siblings = brothers + sisters > 0
-    
-    explanation.append("📖 تفاصيل الحساب والآيات القرآنية:")
-    explanation.append(f"💰 قيمة التركة الكاملة: {estate:,.2f}")
-    explanation.append("=" * 50)
-    
-    # ==================== SPOUSE ====================
-    if husband:
-        if has_children:
-            share = estate * (1 / 4)
-            verse = "﴿فَلَكُمُ الرُّبُعُ مِمَّا تَرَكْنَ إِن كَانَ لَهُنَّ وَلَدٌ﴾ (النساء 12)"
-            desc = "الربع (1/4)"
-        else:
-            share = estate * (1 / 2)
-            verse = "﴿فَلَكُمْ نِصْفُ مَا تَرَكَ أَزْوَاجُكُمْ إِن لَّمْ يَكُن لَّهُنَّ وَلَدٌ﴾ (النساء 12)"
-            desc = "النصف (1/2)"
-        
-        shares["الزوج"] = share
-        explanation.append("")
-        explanation.append(f"👨 الزوج: {desc} = {share:,.2f}")
-        explanation.append(f"قال الله تعالى: {verse}")
-    
-    elif wives > 0:
-        if has_children:
-            share_total = estate * (1 / 8)
-            verse = "﴿فَإِن كَانَ لَكُمْ وَلَدٌ فَلَهُنَّ الثُّمُنُ مِمَّا تَرَكْتُمْ﴾ (النساء 12)"
-            desc = "الثمن (1/8)"
-        else:
-            share_total = estate * (1 / 4)
-            verse = "﴿وَلَهُنَّ الرُّبُعُ مِمَّا تَرَكْتُمْ إِن لَّمْ يَكُن لَكُمْ وَلَدٌ﴾ (النساء 12)"
-            desc = "الربع (1/4)"
-        
-        share_each = share_total / wives
-        shares[f"الزوجات ({wives})"] = share_total
-        explanation.append("")
-        explanation.append(f"👩 الزوجات ({wives}): {desc} = {share_total:,.2f}")
-        explanation.append(f"لكل زوجة: {share_each:,.2f}")
-        explanation.append(f"قال الله تعالى: {verse}")
-    
-    # ==================== MOTHER ====================
-    if mother:
-        if has_children or has_siblings:
-            # Mother gets 1/6 when children exist or 2+ siblings
-            share = estate * (1 / 6)
-            if has_children:
-                verse = "﴿وَلِأَبَوَيْهِ لِكُلِّ وَاحِدٍ مِّنْهُمَا السُّدُسُ مِمَّا تَرَكَ إِن كَانَ لَهُ وَلَدٌ﴾ (النساء 11)"
-            else:
-                verse = "﴿فَإِن كَانَ لَهُ إِخْوَةٌ فَلِأُمِّهِ السُّدُسُ﴾ (النساء 11)"
-            desc = "السدس (1/6)"
-            shares["الأم"] = share
-        else:
-            # Mother gets 1/3 of remaining when no children and no siblings
-            # This is calculated after spouse shares
-            pass
-    
-    # ==================== FATHER ====================
-    if father:
-        if has_children:
-            share = estate * (1 / 6)
-            verse = "﴿وَلِأَبَوَيْهِ لِكُلِّ وَاحِدٍ مِّنْهُمَا السُّدُسُ مِمَّا تَرَكَ إِن كَانَ لَهُ وَلَدٌ﴾ (النساء 11)"
-            desc = "السدس (1/6)"
-            shares["الأب"] = share
-            explanation.append("")
-            explanation.append(f"👨 الأب: {desc} = {share:,.2f}")
-            explanation.append(f"قال الله تعالى: {verse}")
-        # Father becomes residuary when no children - will handle this after calculating other shares
-    
-    # Calculate amount already assigned to fixed share heirs
-    assigned_total = sum(shares.values())
-    remaining = estate - assigned_total
-    
-    # ==================== MOTHER (remaining case) ====================
-    if mother and not has_children and not has_siblings:
-        # Mother gets 1/3 of remaining (after spouse's fixed share)
-        mother_share = remaining * (1 / 3)
-        shares["الأم"] = mother_share
-        explanation.append("")
-        explanation.append(f"👩 الأم: الثلث من الباقي (1/3 من {remaining:,.2f}) = {mother_share:,.2f}")
-        explanation.append("﴿فَإِن لَّمْ يَكُن لَّهُ وَلَدٌ وَوَرِثَهُ أَبَوَاهُ فَلِأُمِّهِ الثُّلُثُ﴾ (النساء 11)")
-        remaining -= mother_share
-    
-    # ==================== CHILDREN (Asaba - تعصيب) ====================
-    if has_children:
-        # Children remain after fixed shares for parents/spouse
-        # Calculate remaining for asaba distribution
-        remaining_for_asaba = estate
-        for heir, amount in shares.items():
-            remaining_for_asaba -= amount
-        
-        # Distribute to children using 2:1 ratio for males
-        total_units = sons * 2 + daughters
-        if total_units > 0:
-            unit_value = remaining_for_asaba / total_units
-            
-            if sons > 0:
-                sons_share = unit_value * 2 * sons
-                shares[f"الأبناء الذكور ({sons})"] = sons_share
-                explanation.append("")
-                explanation.append(f"👦 الأبناء الذكور ({sons}): تعصيب = {sons_share:,.2f}")
-                explanation.append("لكل ابن ذكر حظ يساوي حظ أنثيين")
-                explanation.append("﴿لِلذَّكَرِ مِثْلُ حَظِّ الْأُنثَيَيْنِ﴾ (النساء 11)")
-            
-            if daughters > 0:
-                daughters_share = unit_value * daughters
-                shares[f"البنات ({daughters})"] = daughters_share
-                explanation.append("")
-                explanation.append(f"👧 البنات ({daughters}): تعصيب = {daughters_share:,.2f}")
-                explanation.append(f"لكل بنت: {unit_value:,.2f}")
-                explanation.append("﴿لِلذَّكَرِ مِثْلُ حَظِّ الْأُنثَيَيْنِ﴾ (النساء 11)")
-    
-    # ==================== FATHER (Asaba - تعصيب when no children) ====================
-    if father and not has_children:
-        # Recalculate remaining after all fixed shares
-        remaining_for_father = estate - sum(shares.values())
-        if remaining_for_father > 0:
-            shares["الأب"] = remaining_for_father
-            explanation.append("")
-            explanation.append(f"👨 الأب: تعصيب (الباقي) = {remaining_for_father:,.2f}")
-            explanation.append("الأب يأخذ الباقي من التركة (تعصيب)")
-            explanation.append("﴿يُوصِيكُمُ اللَّهُ فِي أَوْلَادِكُمْ﴾ (النساء 11)")
-    
-    # ==================== SIBLINGS (Kalala - كلالة) ====================
-    if not father and not has_children and has_siblings:
-        remaining_for_siblings = estate - sum(shares.values())
-        
-        if remaining_for_siblings > 0:
-            # Brothers get 2x sisters (same 2:1 ratio)
-            total_units = brothers * 2 + sisters
-            if total_units > 0:
-                unit_value = remaining_for_siblings / total_units
-                
-                if brothers > 0:
-                    brothers_share = unit_value * 2 * brothers
-                    shares[f"الإخوة ({brothers})"] = brothers_share
-                    explanation.append("")
-                    explanation.append(f"👨 الإخوة ({brothers}): كلالة = {brothers_share:,.2f}")
-                    explanation.append("﴿وَإِن كَانَ رَجُلٌ يُورَثُ كَلَالَةً﴾ (النساء 12)")
-                
-                if sisters > 0:
-                    sisters_share = unit_value * sisters
-                    shares[f"الأخوات ({sisters})"] = sisters_share
-                    explanation.append("")
-                    explanation.append(f"👩 الأخوات ({sisters}): كلالة = {sisters_share:,.2f}")
-                    explanation.append("﴿وَإِن كَانَ رَجُلٌ يُورَثُ كَلَالَةً﴾ (النساء 12)")
-    
-    # ==================== GRANDPARENTS & HALF-SIBLINGS ====================
-    # (These would follow if mother/father not present, but simplified here)
-    # Grandfather inherits as residuary if no father
-    # Grandmother gets 1/6 if no mother and certain conditions
-    # Half-siblings from father side only inherit if no full siblings and no father
-    
-    if grandfather and not father and not has_children:
-        remaining_for_grandfather = estate - sum(shares.values())
-        if remaining_for_grandfather > 0:
-            shares["الجد"] = remaining_for_grandfather
-            explanation.append("")
-            explanation.append(f"👨 الجد: تعصيب (الباقي) = {remaining_for_grandfather:,.2f}")
-    
-    if grandmother and not mother and not has_children:
-        # Grandmother gets 1/6 in certain conditions
-        grandmother_share = estate * (1 / 6)
-        shares["الجدة"] = grandmother_share
-        explanation.append("")
-        explanation.append(f"👵 الجدة: السدس (1/6) = {grandmother_share:,.2f}")
-    
-    # ==================== SUMMARY ====================
-    explanation.append("")
-    explanation.append("=" * 50)
-    explanation.append("📊 ملخص التوزيع:")
-    explanation.append("")
-    
-    total_distributed = sum(shares.values())
-    for heir, amount in shares.items():
-        percentage = (amount / estate * 100) if estate > 0 else 0
-        explanation.append(f"{heir}: {amount:,.2f} ({percentage:.1f}%)")
-    
-    explanation.append("")
-    explanation.append(f"إجمالي التوزيع: {total_distributed:,.2f}")
-    
-    if abs(total_distributed - estate) > 0.01:
-        remaining_amount = estate - total_distributed
-        explanation.append(f"⚠️ الباقي: {remaining_amount:,.2f}")
-    
-    return (shares, explanation)
+    if not explain:
+        # shares only: no trace to build
+        madhab = madhab or get_madhab(data.get('madhab'))
+        return (_amounts(data, exact, madhab)[3], [])
+    trace = calculate_trace(data, exact=exact, madhab=madhab)
+    return ({step.heir: step.amount for step in trace.steps}, explain_trace(trace, locale))
+
+
+@timed("explanation")
+def explain_trace(trace, locale=None):
+    """Explanation lines with the Quranic verses for a Trace"""
+    return render(trace, locale)
@@ -0,0 +1,528 @@
+"""
+Inverse solver: every heir composition whose shares meet a set of constraints.
+
+A query bounds the heir counts and constrains the share of heir classes,
+e.g. "the wives get at least 1/8" or "each son gets at most a third":
+
+    {
+        "deceased_gender": "ذكر",          # optional, both when omitted
+        "madhab": "حنفي",                   # optional
+        "counts": {"father": true, "sons": [0, 20], "wives": 1},
+        "max_count": 20,                    # bound of counts not listed (default 10)
+        "constraints": [
+            {"heir": "wives", "min": "1/8"},
+            {"heir": "sons", "each": true, "max": "1/3"},
+            {"heir": "father", "min_amount": 2000}     # needs "estate"
+        ],
+        "shift": {"daughters": 1},          # also report the shares with one more daughter
+                                            # (from the low end of any range)
+        "limit": 1000
+    }
+
+Matches are yielded as they are found. A match is one composition, or a
+group of them when a count cannot change any share: the counts of a group
+are [low, high] ranges, e.g. the siblings when children or the father
+exclude them, or the wives when no constraint looks at a single wife's
+share.
+
+The space is not walked case by case through calculate_inheritance:
+
+- Shares are memoized on a canonical composition. Only the presence of
+  wives matters, only the ratio of sons to daughters (and of brothers to
+  sisters, unless they share with the grandfather), and excluded siblings
+  only count as present or absent. So an unconstrained query evaluates a
+  few thousand distinct compositions for millions of cases.
+- Blocking: siblings excluded by children, the father (or the grandfather
+  in the Hanafi profile) are reported as ranges instead of enumerated.
+- A constraint with a positive minimum requires the heir class, which
+  raises the lower bound of its count.
+- Monotonicity: a son's or daughter's share only falls as sons or
+  daughters are added, and likewise for brothers and sisters. Once such a
+  per-person minimum fails, the rest of the loop is skipped.
+"""
+import argparse
+from collections import namedtuple
+from fractions import Fraction
+from itertools import product
+from math import gcd
+import json
+import sys
+from time import perf_counter
+
+from family import FEMALE, MALE
+from inheritance_logic import LABELS, PROFILES
+from madhab import MADHABS, get_madhab
+from rule_engine import composition
+
+HEIRS = (
+    "husband", "wives", "father", "mother", "grandfather", "grandmother",
+    "sons", "daughters", "brothers", "sisters",
+)
+FLAGS = ("husband", "father", "mother", "grandfather", "grandmother")
+MAX_WIVES = 4
+DEFAULT_MAX_COUNT = 10
+MAX_COUNT = 50
+DEFAULT_LIMIT = 10000
+
+# per-person shares that only fall as these counts grow (see the module docstring)
+_MONOTONE = {
+    "sons": ("sons", "daughters"),
+    "daughters": ("sons", "daughters"),
+    "brothers": ("brothers", "sisters"),
+    "sisters": ("brothers", "sisters"),
+}
+
+Constraint = namedtuple("Constraint", ("heir", "each", "min", "max"))
+Query = namedtuple(
+    "Query", ("genders", "madhab", "bounds", "constraints", "shift", "limit")
+)
+
+
+# ==================== Parsing ====================
+
+def _fraction(value, message):
+    """Fraction of a number or numeric string (a bool, list or dict is rejected)"""
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise ValueError(message)
+    try:
+        return Fraction(str(value).strip())
+    except (ValueError, ZeroDivisionError):
+        raise ValueError(message)
+
+
+def _bounds(heir, value, max_count):
+    """(low, high) of one heir class from a count, [low, high], or a flag"""
+    high_limit = 1 if heir in FLAGS else MAX_WIVES if heir == "wives" else max_count
+    if value is None:
+        return 0, high_limit
+    if isinstance(value, bool):
+        value = int(value)
+    if isinstance(value, int):
+        low = high = value
+    elif isinstance(value, list) and len(value) == 2 and all(
+        isinstance(v, int) and not isinstance(v, bool) for v in value
+    ):
+        low, high = value
+    else:
+        raise ValueError(f"حدود {_label(heir)} غير صحيحة")
+    if not 0 <= low <= high <= high_limit:
+        raise ValueError(f"حدود {_label(heir)} خارج النطاق (0-{high_limit})")
+    return low, high
+
+
+def parse_query(received):
+    """
+    Validate a raw query into a Query.
+
+    Raises:
+        ValueError: with an Arabic message suitable for the API response
+    """
+    if not isinstance(received, dict):
+        raise ValueError("صيغة الطلب غير صحيحة")
+
+    gender = received.get("deceased_gender")
+    if gender in (None, ""):
+        genders = (MALE, FEMALE)
+    elif gender in (MALE, FEMALE):
+        genders = (gender,)
+    else:
+        raise ValueError("جنس المتوفى غير مدعوم")
+    madhab = received.get("madhab")
+    madhab = get_madhab(None if madhab in (None, "") else madhab)
+
+    max_count = received.get("max_count", DEFAULT_MAX_COUNT)
+    if not isinstance(max_count, int) or isinstance(max_count, bool) or not 0 <= max_count <= MAX_COUNT:
+        raise ValueError(f"الحد الأقصى للعدد يجب أن يكون بين 0 و {MAX_COUNT}")
+    counts = received.get("counts")
+    if counts is None:
+        counts = {}
+    if not isinstance(counts, dict) or set(counts) - set(HEIRS):
+        raise ValueError("صيغة الأعداد غير صحيحة")
+    bounds = {heir: _bounds(heir, counts.get(heir), max_count) for heir in HEIRS}
+
+    estate = received.get("estate")
+    if estate is not None:
+        estate = _fraction(estate, "قيمة التركة غير صحيحة")
+        if estate <= 0:
+            raise ValueError("قيمة التركة يجب أن تكون أكبر من صفر")
+
+    raw_constraints = received.get("constraints")
+    if raw_constraints is None:
+        raw_constraints = []
+    elif not isinstance(raw_constraints, list):
+        raise ValueError("صيغة القيود غير صحيحة")
+    constraints = []
+    for raw in raw_constraints:
+        if not isinstance(raw, dict) or raw.get("heir") not in HEIRS:
+            raise ValueError("صيغة القيد غير صحيحة")
+        limits = {}
+        for side in ("min", "max"):
+            if raw.get(side) is not None:
+                limits[side] = _fraction(raw[side], "قيمة القيد غير صحيحة")
+            if raw.get(f"{side}_amount") is not None:
+                if estate is None:
+                    raise ValueError("قيمة التركة مطلوبة لقيود المبالغ")
+                limits[side] = _fraction(raw[f"{side}_amount"], "قيمة القيد غير صحيحة") / estate
+        if not limits:
+            raise ValueError("القيد يحتاج إلى حد أدنى أو أعلى")
+        constraints.append(
+            Constraint(raw["heir"], bool(raw.get("each")), limits.get("min"), limits.get("max"))
+        )
+
+    # a positive minimum needs the heir class present
+    for constraint in constraints:
+        if constraint.min is not None and constraint.min > 0:
+            low, high = bounds[constraint.heir]
+            bounds[constraint.heir] = (max(low, 1), high)
+
+    shift = received.get("shift")
+    if shift is None:
+        shift = {}
+    if not isinstance(shift, dict) or set(shift) - set(HEIRS) or not all(
+        isinstance(v, int) and not isinstance(v, bool) for v in shift.values()
+    ):
+        raise ValueError("صيغة التغيير غير صحيحة")
+
+    limit = received.get("limit", DEFAULT_LIMIT)
+    if not isinstance(limit, int) or isinstance(limit, bool) or limit <= 0:
+        raise ValueError("حد النتائج غير صحيح")
+    return Query(genders, madhab, bounds, tuple(constraints), shift, limit)
+
+
+# ==================== Search ====================
+
+def _label(heir, count=None):
+    label = LABELS[heir]
+    if "{n}" not in label:
+        return label
+    if count is None:
+        return label.replace(" ({n})", "")
+    if isinstance(count, tuple):
+        count = f"{count[0]}-{count[1]}" if count[0] != count[1] else count[0]
+    return label.format(n=count)
+
+
+def _span(low, high):
+    """A count, or a (low, high) group when the ends differ"""
+    return low if low == high else (low, high)
+
+
+def _ratio(a, b):
+    """Smallest counts with the same 2:1 split between two classes"""
+    if a and b:
+        g = gcd(a, b)
+        return a // g, b // g
+    return min(a, 1), min(b, 1)
+
+
+class Search:
+    """One query's enumeration, with its memo of shares per canonical composition"""
+
+    def __init__(self, query):
+        self.query = query
+        self.profile = PROFILES[query.madhab.name]
+        self.grandfather_blocks = query.madhab.grandfather_with_siblings == "blocks"
+        self.collapse_wives = not any(
+            c.heir == "wives" and c.each for c in query.constraints
+        ) and "wives" not in query.shift
+        self.memo = {}
+        self.nodes = 0
+        self.matches = 0
+        self.truncated = False
+
+    def siblings_blocked(self, father, grandfather, descendants):
+        return bool(father or descendants or (self.grandfather_blocks and grandfather))
+
+    def canonical(self, key):
+        """Smallest composition with the same share per heir class"""
+        descendants = key.sons or key.daughters
+        sons, daughters = _ratio(key.sons, key.daughters)
+        brothers, sisters = key.brothers, key.sisters
+        if self.siblings_blocked(key.father, key.grandfather, descendants):
+            brothers, sisters = (1, 0) if brothers + sisters else (0, 0)
+        elif not key.grandfather:
+            brothers, sisters = _ratio(brothers, sisters)
+        return key._replace(
+            wives=min(key.wives, 1), sons=sons, daughters=daughters,
+            brothers=brothers, sisters=sisters,
+        )
+
+    def shares(self, key):
+        """{heir class: (rule, Fraction of the estate)} for a composition"""
+        canonical = self.canonical(key)
+        shares = self.memo.get(canonical)
+        if shares is None:
+            shares = self.memo[canonical] = {
+                heir: (rule, fraction) for heir, rule, fraction in self.profile.shares(canonical)
+            }
+        return shares
+
+    def check(self, shares, counts):
+        """
+        (matches, monotone): whether every constraint holds, and whether a
+        failing per-person minimum keeps failing as children or siblings grow
+        """
+        for constraint in self.query.constraints:
+            value = shares[constraint.heir][1] if constraint.heir in shares else Fraction(0)
+            if constraint.each:
+                count = counts[constraint.heir]
+                if isinstance(count, tuple):
+                    count = count[0]
+                value = value / count if count else value
+            if constraint.min is not None and value < constraint.min:
+                return False, constraint.each and constraint.heir in _MONOTONE
+            if constraint.max is not None and value > constraint.max:
+                return False, False
+        return True, False
+
+    # ---------- enumeration ----------
+
+    def _values(self, heir):
+        low, high = self.query.bounds[heir]
+        return range(low, high + 1)
+
+    def _spouses(self, gender):
+        """(field, count or (low, high) group) of the spouse for one gender"""
+        if gender == MALE:
+            low, high = self.query.bounds["husband"]
+            if low > 0:
+                return []
+            low, high = self.query.bounds["wives"]
+            if not self.collapse_wives:
+                return [("wives", n) for n in range(low, high + 1)]
+            groups = [("wives", 0)] if low == 0 else []
+            if high > 0:
+                groups.append(("wives", _span(max(low, 1), high)))
+            return groups
+        if self.query.bounds["wives"][0] > 0:
+            return []
+        return [("husband", n) for n in self._values("husband")]
+
+    def _sibling_groups(self):
+        """Count groups of excluded siblings: none, any brothers, sisters only"""
+        (b_low, b_high), (s_low, s_high) = self.query.bounds["brothers"], self.query.bounds["sisters"]
+        groups = []
+        if b_low == 0 and s_low == 0:
+            groups.append((0, 0))
+        if b_high > 0:
+            groups.append((_span(max(b_low, 1), b_high), _span(s_low, s_high)))
+        if b_low == 0 and s_high > 0:
+            groups.append((0, _span(max(s_low, 1), s_high)))
+        return groups
+
+    def run(self):
+        """Yield every match (see the module docstring), up to the query limit"""
+        for gender in self.query.genders:
+            for spouse, spouse_count in self._spouses(gender):
+                for father, mother, grandfather, grandmother in product(
+                    *(self._values(heir) for heir in ("father", "mother", "grandfather", "grandmother"))
+                ):
+                    prefix = {
+                        "husband": 0, "wives": 0, spouse: spouse_count,
+                        "father": father, "mother": mother,
+                        "grandfather": grandfather, "grandmother": grandmother,
+                    }
+                    for match in self._children(gender, prefix):
+                        yield match
+                        self.matches += 1
+                        if self.matches >= self.query.limit:
+                            self.truncated = True
+                            return
+
+    def _children(self, gender, prefix):
+        for sons in self._values("sons"):
+            first = True
+            for daughters in self._values("daughters"):
+                counts = dict(prefix, sons=sons, daughters=daughters)
+                if sons or daughters or self.siblings_blocked(
+                    prefix["father"], prefix["grandfather"], False
+                ):
+                    stop = None
+                    for brothers, sisters in self._sibling_groups():
+                        _, monotone = yield from self._node(
+                            gender, dict(counts, brothers=brothers, sisters=sisters)
+                        )
+                        if monotone and (sons or daughters):
+                            stop = True
+                    if stop:
+                        if first:
+                            return
+                        break
+                else:
+                    yield from self._siblings(gender, counts)
+                first = False
+
+    def _siblings(self, gender, counts):
+        for brothers in self._values("brothers"):
+            first = True
+            for sisters in self._values("sisters"):
+                _, monotone = yield from self._node(
+                    gender, dict(counts, brothers=brothers, sisters=sisters)
+                )
+                if monotone and (brothers or sisters):
+                    if first:
+                        return
+                    break
+                first = False
+
+    def _node(self, gender, counts):
+        """Evaluate one composition or group; yields the match, returns (matched, monotone)"""
+        self.nodes += 1
+        key = _key(counts)
+        shares = self.shares(key)
+        matched, monotone = self.check(shares, counts)
+        if matched:
+            yield self._match(gender, counts, key, shares)
+        return matched, monotone
+
+    def _match(self, gender, counts, key, shares):
+        result = {
+            "deceased_gender": gender,
+            "madhab": self.query.madhab.name,
+            "counts": {
+                heir: (list(count) if isinstance(count, tuple) else
+                       bool(count) if heir in FLAGS else count)
+                for heir, count in counts.items()
+            },
+            "shares": [
+                {
+                    "heir": heir,
+                    "label": _label(heir, counts[heir]),
+                    "rule": rule,
+                    "fraction": str(fraction),
+                    "each": (
+                        None if isinstance(counts[heir], tuple)
+                        else str(fraction / counts[heir])
+                    ),
+                }
+                for heir, (rule, fraction) in shares.items()
+            ],
+        }
+        if self.query.shift:
+            result["shift"] = self._shift(key, shares)
+        return result
+
+    def _shift(self, key, shares):
+        changed = {
+            heir: getattr(key, heir) + delta for heir, delta in self.query.shift.items()
+        }
+        if any(count < 0 for count in changed.values()) or any(
+            changed[heir] > 1 for heir in FLAGS if heir in changed
+        ):
+            return None
+        shifted = self.shares(key._replace(**changed))
+        heirs = list(shares) + [heir for heir in shifted if heir not in shares]
+        zero = (None, Fraction(0))
+        return {
+            "counts": changed,
+            "shares": {heir: str(shifted.get(heir, zero)[1]) for heir in heirs},
+            "delta": {
+                heir: str(shifted.get(heir, zero)[1] - shares.get(heir, zero)[1])
+                for heir in heirs
+            },
+        }
+
+    def summary(self, seconds):
+        return {
+            "done": True,
+            "matches": self.matches,
+            "truncated": self.truncated,
+            "nodes": self.nodes,
+            "evaluated": len(self.memo),
+            "seconds": round(seconds, 3),
+        }
+
+
+def _key(counts):
+    """Composition of a node, taking the low end of every range"""
+    return composition(**{
+        heir: count[0] if isinstance(count, tuple) else count
+        for heir, count in counts.items()
+    })
+
+
+def solve(received):
+    """
+    Parse a raw query and return (matches generator, summary callable).
+
+    Raises:
+        ValueError: when the query is invalid (before anything is yielded)
+    """
+    search = Search(parse_query(received))
+    start = perf_counter()
+
+    def summary():
+        return search.summary(perf_counter() - start)
+
+    return search.run(), summary
+
+
+# ==================== Command line ====================
+
+def _constraint(text):
+    """heir[.each](>=|<=)value, e.g. wives>=1/8 or sons.each<=1/3"""
+    for operator, side in ((">=", "min"), ("<=", "max")):
+        if operator in text:
+            heir, value = text.split(operator, 1)
+            heir, _, each = heir.strip().partition(".")
+            return {"heir": heir, side: value.strip(), "each": each == "each"}
+    raise argparse.ArgumentTypeError(f"expected heir>=value or heir<=value, got {text!r}")
+
+
+def _count(text):
+    """heir=n or heir=low..high"""
+    heir, _, value = text.partition("=")
+    low, _, high = value.partition("..")
+    try:
+        bounds = [int(low), int(high or low)]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected heir=n or heir=low..high, got {text!r}")
+    return heir.strip(), bounds
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Find every heir composition whose shares meet the given constraints"
+    )
+    parser.add_argument("--query", help="JSON query file (see inverse.py), '-' for stdin")
+    parser.add_argument("--constraint", "-c", type=_constraint, action="append", default=[],
+                        help="e.g. wives>=1/8, sons.each<=1/3")
+    parser.add_argument("--count", type=_count, action="append", default=[],
+                        help="e.g. father=1, sons=0..20")
+    parser.add_argument("--gender", choices=(MALE, FEMALE))
+    parser.add_argument("--madhab", choices=tuple(MADHABS))
+    parser.add_argument("--max-count", type=int)
+    parser.add_argument("--shift", type=_count, action="append", default=[],
+                        help="e.g. daughters=1")
+    parser.add_argument("--limit", type=int)
+    parser.add_argument("--summary", action="store_true", help="print only the summary")
+    args = parser.parse_args(argv)
+
+    query = {}
+    if args.query:
+        with (sys.stdin if args.query == "-" else open(args.query, encoding="utf-8")) as f:
+            query = json.load(f)
+    query.setdefault("constraints", []).extend(args.constraint)
+    if args.count:
+        query.setdefault("counts", {}).update(
+            (heir, bounds if bounds[0] != bounds[1] else bounds[0]) for heir, bounds in args.count
+        )
+    if args.shift:
+        query.setdefault("shift", {}).update((heir, bounds[0]) for heir, bounds in args.shift)
+    for field, value in (("deceased_gender", args.gender), ("madhab", args.madhab),
+                         ("max_count", args.max_count), ("limit", args.limit)):
+        if value is not None:
+            query[field] = value
+
+    try:
+        matches, summary = solve(query)
+    except ValueError as e:
+        parser.error(str(e))
+    for match in matches:
+        if not args.summary:
+            print(json.dumps(match, ensure_ascii=False))
+    print(json.dumps(summary(), ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
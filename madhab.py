@@ -1,8 +1,43 @@
-CURRENT_MADHAB = "شافعي"
+"""
+Madhab (school) profiles.
 
-def select_madhab(name):
-    global CURRENT_MADHAB
-    CURRENT_MADHAB = name
+A Madhab is an immutable description of where the schools differ in the
+rules this calculator implements. It is chosen per request (the "madhab"
+field of a case) and passed into the calculation; nothing here is mutable
+module state, so concurrent requests for different schools cannot affect
+each other. inheritance_logic builds and caches one rule pipeline per
+profile.
+"""
+from collections import namedtuple
 
-def get_madhab():
-    return CURRENT_MADHAB
+# grandfather_with_siblings:
+#   "shares" - muqasama: the grandfather shares with full siblings as a brother
+#              unless a third (or a sixth) is better for him (Malik, al-Shafi'i, Ahmad)
+#   "blocks" - the grandfather excludes the siblings like the father (Abu Hanifa)
+# All four schools follow Umar in the Umariyyatan (spouse, mother and father):
+# the mother takes a third of what the spouse leaves, so that is not an option.
+Madhab = namedtuple("Madhab", ("name", "grandfather_with_siblings"))
+
+MADHABS = {madhab.name: madhab for madhab in (
+    Madhab("شافعي", "shares"),
+    Madhab("مالكي", "shares"),
+    Madhab("حنبلي", "shares"),
+    Madhab("حنفي", "blocks"),
+)}
+
+DEFAULT = MADHABS["شافعي"]
+
+
+def get_madhab(name=None):
+    """
+    Profile for a madhab name (the default profile when name is None).
+
+    Raises:
+        ValueError: for an unknown madhab
+    """
+    if name is None:
+        return DEFAULT
+    try:
+        return MADHABS[name]
+    except (KeyError, TypeError):
+        raise ValueError("المذهب غير مدعوم") from None
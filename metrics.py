@@ -0,0 +1,203 @@
+"""
+Timing spans, counters and the Prometheus text exposition for /metrics.
+
+Hot-path functions are wrapped with @timed("name") and blocks with
+``with span("name"):``. Every span feeds a per-name latency histogram; when
+a request opted into Server-Timing (see app.py) its spans are also
+collected for the response header. METRICS=0 turns the whole module into
+no-ops at import time: timed() returns the function unchanged and span()
+a shared null context.
+
+Metrics are per process; with several gunicorn workers each one reports
+its own.
+"""
+from bisect import bisect_left
+from contextlib import nullcontext
+from contextvars import ContextVar
+from functools import wraps
+import os
+import threading
+from time import perf_counter
+
+ENABLED = os.environ.get("METRICS", "1").lower() not in ("0", "false", "no")
+
+PREFIX = "inheritance"
+
+# seconds; spans range from microseconds (cached shares) to seconds (PDFs)
+BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+# spans of the current request when it asked for Server-Timing, else None
+_request_spans = ContextVar("request_spans", default=None)
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram keyed by one label value"""
+
+    def __init__(self, name, label, help_text, buckets=BUCKETS):
+        self.name = name
+        self.label = label
+        self.help = help_text
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, key, seconds):
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            i = bisect_left(self.buckets, seconds)
+            if i < len(self.buckets):
+                series[0][i] += 1
+            series[1] += seconds
+            series[2] += 1
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {key: (list(c), s, n) for key, (c, s, n) in self._series.items()}
+        for key, (counts, total, count) in sorted(series.items()):
+            label = f'{self.label}="{key}"'
+            cumulative = 0
+            for bound, bucket in zip(self.buckets, counts):
+                cumulative += bucket
+                lines.append(f'{self.name}_bucket{{{label},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{label},le="+Inf"}} {count}')
+            lines.append(f"{self.name}_sum{{{label}}} {total}")
+            lines.append(f"{self.name}_count{{{label}}} {count}")
+        return lines
+
+
+class Counter:
+    """Monotonic counter keyed by a tuple of label values"""
+
+    def __init__(self, name, labels, help_text):
+        self.name = name
+        self.labels = labels
+        self.help = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *key, amount=1):
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            lines.append(f"{self.name}{{{_labels(zip(self.labels, key))}}} {value}")
+        return lines
+
+
+SPANS = Histogram(f"{PREFIX}_span_seconds", "span", "Time spent in instrumented code paths")
+REQUESTS = Histogram(f"{PREFIX}_request_seconds", "route", "Request latency by route")
+RESPONSES = Counter(f"{PREFIX}_responses_total", ("route", "status"), "Responses by route and status")
+ERRORS = Counter(f"{PREFIX}_errors_total", ("type",), "Errors by exception type")
+
+
+def _labels(pairs):
+    return ",".join(f'{name}="{value}"' for name, value in pairs)
+
+
+def _record(name, seconds):
+    SPANS.observe(name, seconds)
+    spans = _request_spans.get()
+    if spans is not None:
+        spans.append((name, seconds))
+
+
+class _Span:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = perf_counter()
+
+    def __exit__(self, *exc):
+        _record(self.name, perf_counter() - self.start)
+
+
+_null = nullcontext()
+
+
+def span(name):
+    """Context manager timing a block under name"""
+    return _Span(name) if ENABLED else _null
+
+
+def timed(name):
+    """Decorator timing every call of a function under name"""
+    def decorator(func):
+        if not ENABLED:
+            return func
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _record(name, perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def record_error(error):
+    ERRORS.inc(type(error).__name__)
+
+
+def collect_request_spans():
+    """Start collecting this request's spans; returns a token for stop_request_spans"""
+    return _request_spans.set([])
+
+
+def stop_request_spans(token):
+    """Stop collecting and return the (name, seconds) spans of the request"""
+    spans = _request_spans.get() or []
+    _request_spans.reset(token)
+    return spans
+
+
+def server_timing(spans):
+    """Server-Timing header value; repeated spans are summed"""
+    totals = {}
+    for name, seconds in spans:
+        totals[name] = totals.get(name, 0.0) + seconds
+    return ", ".join(f"{name};dur={seconds * 1000:.3f}" for name, seconds in totals.items())
+
+
+def exposition(caches=None, executors=None):
+    """Prometheus text format for every metric plus cache and executor stats"""
+    lines = []
+    for metric in (SPANS, REQUESTS, RESPONSES, ERRORS):
+        lines.extend(metric.expose())
+
+    if caches:
+        for field, kind, help_text in (
+            ("hits", "counter", "Cache hits"),
+            ("misses", "counter", "Cache misses"),
+            ("evictions", "counter", "Cache evictions"),
+            ("entries", "gauge", "Cached entries"),
+            ("hit_rate", "gauge", "Cache hit rate since start"),
+        ):
+            name = f"{PREFIX}_cache_{field}" + ("_total" if kind == "counter" else "")
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            lines += [f'{name}{{cache="{cache}"}} {stats[field]}' for cache, stats in sorted(caches.items())]
+
+    if executors:
+        for field, kind, help_text in (
+            ("in_flight", "gauge", "Jobs running or queued"),
+            ("submitted", "counter", "Jobs accepted"),
+            ("rejected", "counter", "Jobs rejected with 503"),
+        ):
+            name = f"{PREFIX}_executor_{field}" + ("_total" if kind == "counter" else "")
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            lines += [
+                f'{name}{{executor="{executor}"}} {stats[field]}'
+                for executor, stats in sorted(executors.items())
+            ]
+    return "\n".join(lines) + "\n"
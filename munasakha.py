@@ -0,0 +1,195 @@
+"""
+Munasakha (مناسخة): heirs dying before the estate is divided.
+
+A chain is the estate of the first deceased plus an ordered list of deaths:
+
+    {"id": "A", "case": {...}, "names": {"sons": ["B", "C"]}}
+
+case describes the deceased's heirs with the same fields as /calculate
+(without the estate); names optionally names the individuals of a heir
+class, otherwise they are called "<id>/<class>/<n>". The first death is
+the original deceased; every later one must be a living heir of an earlier
+death, and what they hold passes on to their own heirs.
+
+Shares are tracked exactly per individual. The combined base number
+(الجامعة) is built the classical way: each stage's base is folded into the
+running جامعة with the smallest multiplier that makes the deceased's
+holding divisible by it (تصحيح), so every final share is a whole number of
+units.
+
+Recomputation is incremental. How one deceased's holding splits among
+their heirs depends only on the heir composition and madhab and is cached
+per composition; the state after each stage is cached under a hash of the
+chain up to that stage, so editing stage k reuses everything before it and
+only re-runs the stages from k on.
+"""
+from collections import namedtuple
+from fractions import Fraction
+from math import gcd
+
+from exact import allocate, base_units, currency_places, from_minor_units, to_minor_units
+from inheritance_logic import LABELS, PROFILES, case_digest, composition_key, normalize_case
+from madhab import get_madhab
+from share_cache import ShareCache
+
+_SPLITS = ShareCache("munasakha_split")
+_STAGES = ShareCache("munasakha_stage")
+
+# State after a stage: holdings maps individual -> Fraction of the estate
+Snapshot = namedtuple(
+    "Snapshot", ("key", "holdings", "labels", "dead", "unassigned", "base", "stages")
+)
+
+_START = Snapshot("", {}, {}, frozenset(), Fraction(0), 1, ())
+
+
+def _split(madhab, key):
+    """(heir class, rule, Fraction) for one deceased's heirs, cached per composition"""
+    return _SPLITS.get((madhab.name, key), lambda _: PROFILES[madhab.name].shares(key))
+
+
+def _stage(death, madhab):
+    """Validate one death; returns (deceased id, normalized case, names per class)"""
+    if not isinstance(death, dict) or not isinstance(death.get("case"), dict):
+        raise ValueError("صيغة الوفاة غير صحيحة")
+    deceased = death.get("id")
+    if not isinstance(deceased, str) or not deceased:
+        raise ValueError("معرّف المتوفى مطلوب")
+
+    # the estate does not affect the split; any positive value normalizes
+    data = normalize_case({**death["case"], "estate": 1, "madhab": madhab.name})
+    data = {name: value for name, value in data.items() if name != "estate"}
+
+    names = death.get("names") or {}
+    if not isinstance(names, dict):
+        raise ValueError("صيغة أسماء الورثة غير صحيحة")
+    return deceased, data, names
+
+
+def _label(heir):
+    """Heir class label for one individual (without the count)"""
+    return LABELS[heir].replace(" ({n})", "")
+
+
+def _members(deceased, heir, count, names):
+    members = names.get(heir)
+    if members is None:
+        return [f"{deceased}/{heir}/{n}" for n in range(1, count + 1)]
+    if not isinstance(members, list) or len(members) != count:
+        raise ValueError(f"عدد الأسماء لا يطابق عدد {LABELS[heir].format(n=count)}")
+    return [str(member) for member in members]
+
+
+def _apply(snapshot, death, madhab):
+    """State after one more death"""
+    deceased, data, names = _stage(death, madhab)
+    key = case_digest({"previous": snapshot.key, "id": deceased, "case": data, "names": names})
+
+    def compute(_):
+        holdings = dict(snapshot.holdings)
+        labels = dict(snapshot.labels)
+        if not snapshot.stages:
+            holding = Fraction(1)
+        elif deceased in holdings:
+            holding = holdings.pop(deceased)
+        else:
+            raise ValueError(f"المتوفى {deceased} ليس من الورثة الأحياء")
+        dead = snapshot.dead | {deceased}
+
+        composition = composition_key(data)
+        heirs = []
+        for heir, rule, fraction in _split(madhab, composition):
+            members = _members(deceased, heir, getattr(composition, heir), names)
+            for member in members:
+                if member in dead:
+                    raise ValueError(f"المتوفى {member} لا يرث")
+                heirs.append((member, heir, rule, fraction / len(members)))
+        if len({member for member, *_ in heirs}) != len(heirs):
+            raise ValueError("الوارث مذكور أكثر من مرة")
+
+        distributed = Fraction(0)
+        for member, heir, _, fraction in heirs:
+            holdings[member] = holdings.get(member, Fraction(0)) + holding * fraction
+            labels.setdefault(member, _label(heir))
+            distributed += fraction
+
+        # تصحيح: fold this stage's base into the جامعة
+        stage_base, _ = base_units([fraction for *_, fraction in heirs])
+        sahm = int(holding * snapshot.base)
+        multiplier = stage_base // gcd(sahm, stage_base) if sahm else 1
+        report = {
+            "deceased": deceased,
+            "holding": str(holding),
+            "sahm": sahm,
+            "base": stage_base,
+            "multiplier": multiplier,
+            "jamia": snapshot.base * multiplier,
+            "heirs": [
+                {
+                    "id": member,
+                    "label": _label(heir),
+                    "rule": rule,
+                    "fraction": str(fraction),
+                }
+                for member, heir, rule, fraction in heirs
+            ],
+        }
+        return Snapshot(
+            key, holdings, labels, dead,
+            snapshot.unassigned + holding * (1 - distributed),
+            snapshot.base * multiplier,
+            snapshot.stages + (report,),
+        )
+
+    return _STAGES.get(key, compute)
+
+
+def solve(estate, deaths, madhab=None, currency=None):
+    """
+    Combined distribution of a munasakha chain.
+
+    Args:
+        estate: the first deceased's estate
+        deaths: ordered list of deaths (see the module docstring)
+        madhab: Madhab profile applied to every stage (default profile when None)
+        currency: ISO 4217 code; amounts are allocated in its minor unit
+            (exact.CURRENCY_PLACES, 2 places when None)
+
+    Returns:
+        {"base", "heirs", "unassigned", "stages"}: the جامعة, every living
+        heir's units of it, fraction and amount, the share no heir takes,
+        and the per-stage تصحيح report
+
+    Raises:
+        ValueError: with an Arabic message suitable for the API response
+    """
+    if not isinstance(deaths, list) or not deaths:
+        raise ValueError("قائمة الوفيات مطلوبة")
+    madhab = madhab or get_madhab()
+    places = currency_places(currency)
+
+    snapshot = _START
+    for death in deaths:
+        snapshot = _apply(snapshot, death, madhab)
+
+    heirs = [(member, fraction) for member, fraction in snapshot.holdings.items() if fraction]
+    fractions = [fraction for _, fraction in heirs] + [snapshot.unassigned]
+    units = allocate(to_minor_units(estate, places), fractions)
+    return {
+        "base": snapshot.base,
+        "heirs": [
+            {
+                "id": member,
+                "label": snapshot.labels[member],
+                "units": int(fraction * snapshot.base),
+                "fraction": str(fraction),
+                "amount": float(from_minor_units(amount, places)),
+            }
+            for (member, fraction), amount in zip(heirs, units)
+        ],
+        "unassigned": {
+            "fraction": str(snapshot.unassigned),
+            "amount": float(from_minor_units(units[-1], places)),
+        },
+        "stages": list(snapshot.stages),
+    }
@@ -0,0 +1,132 @@
+"""
+Bounded executors for the slow renderers.
+
+/calculate runs inline on the request thread. PDF and chart rendering
+(reportlab, matplotlib, Arabic shaping) are CPU heavy, so they run in
+process pools. That keeps them from holding the GIL that cheap requests
+need. Each pool admits at most workers + queue_depth jobs. Anything
+beyond that is rejected with Busy, which the app turns into a 503 with
+Retry-After, so callers back off instead of piling up behind slow renders.
+
+Sizes come from <NAME>_WORKERS and <NAME>_QUEUE (e.g. PDF_WORKERS,
+CHART_QUEUE). Process workers are spawned, so they inherit nothing the
+parent loaded; the initializer (prefork.init_worker for the renderers)
+warms each one as it starts. OFFLOAD=0 renders inline on the request thread without
+limits, which is the behaviour before the pools existed (used by
+benchmarks/load_test.py for comparison).
+"""
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor, ThreadPoolExecutor
+import atexit
+import multiprocessing
+import os
+import threading
+
+OFFLOAD = os.environ.get("OFFLOAD", "1").lower() not in ("0", "false", "no")
+
+_registry = {}
+
+
+class Busy(Exception):
+    """Raised when an executor already holds as many jobs as it admits"""
+
+    def __init__(self, name, retry_after=1):
+        super().__init__(f"{name} executor is busy")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class BoundedExecutor:
+    """
+    Lazily started thread or process pool with a limit on queued jobs.
+
+    kind is "process" or "thread"; initializer runs once in every process
+    worker as it starts.
+    """
+
+    def __init__(self, name, kind="process", workers=2, queue_depth=8, initializer=None):
+        prefix = name.upper()
+        self.name = name
+        self.kind = kind
+        self.workers = int(os.environ.get(f"{prefix}_WORKERS", workers))
+        self.queue_depth = int(os.environ.get(f"{prefix}_QUEUE", queue_depth))
+        self.initializer = initializer
+        self.submitted = 0
+        self.rejected = 0
+        self._in_flight = 0
+        self._pool = None
+        self._lock = threading.Lock()
+        _registry[name] = self
+
+    def _executor(self):
+        # called with self._lock held
+        if self._pool is None:
+            if self.kind == "process":
+                # forking a threaded server can copy locks held by other
+                # request threads into the child and deadlock it; spawn
+                # starts workers from a clean interpreter instead
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"),
+                    initializer=self.initializer,
+                )
+            else:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers)
+            atexit.register(self._pool.shutdown)
+        return self._pool
+
+    def submit(self, fn, *args):
+        """Queue fn(*args) and return its Future; raises Busy when full"""
+        with self._lock:
+            if self._in_flight >= self.workers + self.queue_depth:
+                self.rejected += 1
+                raise Busy(self.name)
+            self._in_flight += 1
+            self.submitted += 1
+            pool = self._executor()
+        try:
+            future = pool.submit(fn, *args)
+        except BaseException as e:
+            self._done(None)
+            if isinstance(e, BrokenExecutor):
+                self._discard(pool)
+            raise
+        future.add_done_callback(self._done)
+        return future
+
+    def run(self, fn, *args, timeout=30):
+        """fn(*args) through the pool (inline when OFFLOAD is off)"""
+        if not OFFLOAD:
+            return fn(*args)
+        future = self.submit(fn, *args)
+        try:
+            return future.result(timeout=timeout)
+        except BrokenExecutor:
+            self._discard(self._pool)
+            raise
+
+    def stats(self):
+        with self._lock:
+            return {
+                "kind": self.kind,
+                "workers": self.workers,
+                "queue_depth": self.queue_depth,
+                "in_flight": self._in_flight,
+                "submitted": self.submitted,
+                "rejected": self.rejected,
+            }
+
+    def _discard(self, pool):
+        """Drop a pool whose worker died so the next job starts a fresh one"""
+        with self._lock:
+            if pool is not None and self._pool is pool:
+                self._pool = None
+        if pool is not None:
+            pool.shutdown(wait=False)
+
+    def _done(self, _):
+        with self._lock:
+            self._in_flight -= 1
+
+
+def executor_stats():
+    """Counters for every bounded executor, keyed by name"""
+    return {name: executor.stats() for name, executor in _registry.items()}
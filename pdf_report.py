@@ -1,24 +1,36 @@
-from reportlab.platypus import SimpleDocTemplate, Paragraph
-from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.platypus import Frame, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
 from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfgen.canvas import Canvas
 from reportlab.pdfbase.ttfonts import TTFont
-import arabic_reshaper
-from bidi.algorithm import get_display
+from functools import lru_cache, partial
+from io import BytesIO
 import os
 
+from arabic_text import ar
+from metrics import span
+from offload import BoundedExecutor
+from prefork import init_worker
+from share_cache import ShareCache
 
-def _reshape_ar(text):
-    try:
-        return get_display(arabic_reshaper.reshape(text))
-    except Exception:
-        return text
+# Finished reports keyed on the normalized case digest, bounded by total bytes
+PDF_CACHE = ShareCache(
+    "pdf", maxsize=int(os.environ.get("PDF_CACHE_BYTES", 32 * 1024 * 1024)), weigh=len
+)
 
+# Reports are built in worker processes (PDF_WORKERS / PDF_QUEUE), each
+# starting with the font registered and the shaping cache warm
+PDF_EXECUTOR = BoundedExecutor(
+    "pdf", "process", workers=2, queue_depth=4,
+    initializer=partial(init_worker, "shaping", "pdf"),
+)
 
-def generate_pdf(filename, estate, explanation):
-    styles = getSampleStyleSheet()
 
-    # Try to register a common Arabic-capable TTF (DejaVu Sans as fallback if available)
-    font_name = None
+@lru_cache(maxsize=None)
+def _arabic_font():
+    """Register a common Arabic-capable TTF once per process; returns its name or None"""
     possible_paths = [
         "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
         "/usr/share/fonts/truetype/ttf-dejavu/DejaVuSans.ttf",
@@ -28,22 +40,167 @@ def generate_pdf(filename, estate, explanation):
         if os.path.exists(p):
             try:
                 pdfmetrics.registerFont(TTFont('DejaVuSans', p))
-                font_name = 'DejaVuSans'
-                break
+                return 'DejaVuSans'
             except Exception:
-                font_name = None
+                continue
+    return None
 
-    if font_name:
-        styles["Normal"].fontName = font_name
 
-    doc = SimpleDocTemplate(filename)
-    story = []
+@lru_cache(maxsize=None)
+def _styles():
+    """Paragraph and table styles, created once per process"""
+    font_name = _arabic_font() or "Helvetica"
+    normal = ParagraphStyle("report", getSampleStyleSheet()["Normal"], fontName=font_name)
+    table = TableStyle([
+        ("FONTNAME", (0, 0), (-1, -1), font_name),
+        ("FONTSIZE", (0, 0), (-1, -1), 10),
+        ("ALIGN", (0, 0), (-1, -1), "RIGHT"),
+        # title and estate rows span the table
+        ("SPAN", (0, 0), (-1, 0)),
+        ("SPAN", (0, 1), (-1, 1)),
+        ("FONTSIZE", (0, 0), (-1, 0), 12),
+        ("BACKGROUND", (0, 2), (-1, 2), colors.lightgrey),
+        ("GRID", (0, 2), (-1, -1), 0.5, colors.grey),
+    ])
+    return normal, table
 
-    story.append(Paragraph(_reshape_ar(f"قيمة التركة: {estate}"), styles["Normal"]))
-    story.append(Paragraph("<br/>", styles["Normal"]))
 
+def warm_up():
+    """Register the font and styles ahead of the first report (used by prefork.preload)"""
+    _styles()
+    return _arabic_font()
+
+
+def generate_pdf(output, estate, explanation):
+    """Write the report to output, a filename or a binary file-like object"""
+    normal, _ = _styles()
+
+    doc = SimpleDocTemplate(output)
+    story = [Paragraph(ar(f"قيمة التركة: {estate}"), normal), Spacer(1, normal.leading)]
     for line in explanation:
-        story.append(Paragraph(_reshape_ar(line), styles["Normal"]))
-        story.append(Paragraph("<br/>", styles["Normal"]))
+        story.append(Paragraph(ar(line), normal))
+        story.append(Spacer(1, normal.leading))
 
     doc.build(story)
+
+
+# ==================== Multi-case reports ====================
+# Consolidated reports over many estates are drawn case by case straight
+# onto the canvas: each case is one table that is laid out, drawn and
+# dropped, so memory does not grow with the number of cases (the canvas
+# only keeps the compressed page streams).
+
+MARGIN = 40
+# header cells, in visual (left-to-right) order for the right-to-left table
+CASE_HEADER = ("النسبة", "المبلغ", "الوارث")
+
+
+def _case_table(title, estate, rows):
+    """
+    One case as a table: title, estate, then a row per heir. rows is a list
+    of (heir, amount) pairs, or an error message for a rejected case.
+    """
+    _, style = _styles()
+    data = [[ar(title), "", ""]]
+    if isinstance(rows, str):
+        data.append([ar(rows), "", ""])
+    else:
+        data.append([ar(f"قيمة التركة: {estate:,.2f}"), "", ""])
+        data.append([ar(cell) for cell in CASE_HEADER])
+        for heir, amount in rows:
+            percentage = amount / estate * 100 if estate else 0
+            data.append([f"{percentage:.1f}%", f"{amount:,.2f}", ar(heir)])
+    return Table(data, colWidths=("25%", "30%", "45%"), style=style, repeatRows=3)
+
+
+class _Pages:
+    """Places flowables into one frame per page of a canvas"""
+
+    def __init__(self, canvas, pagesize):
+        self.canvas = canvas
+        self.width, self.height = pagesize
+        self.page = 0
+        self._new_frame()
+
+    def _new_frame(self):
+        self.page += 1
+        self.frame = Frame(MARGIN, MARGIN, self.width - 2 * MARGIN, self.height - 2 * MARGIN)
+        self.empty = True
+
+    def next_page(self):
+        self.canvas.setFont(_styles()[0].fontName, 8)
+        self.canvas.drawCentredString(self.width / 2, MARGIN / 2, str(self.page))
+        self.canvas.showPage()
+        self._new_frame()
+
+    def add(self, flowable):
+        """Draw flowable, splitting it or moving to a new page when it does not fit"""
+        pending = [flowable]
+        while pending:
+            head = pending.pop(0)
+            if self.frame.add(head, self.canvas):
+                self.empty = False
+                continue
+            parts = self.frame.split(head, self.canvas)
+            if len(parts) > 1:
+                pending[0:0] = parts
+            elif self.empty:
+                raise ValueError("content does not fit on a page")
+            else:
+                self.next_page()
+                pending.insert(0, head)
+
+
+def generate_cases_pdf(output, cases, pagesize=A4):
+    """
+    Write a consolidated report for many cases to output (a filename or a
+    binary file-like object). cases is an iterable of (title, estate, rows)
+    as taken by _case_table; it is consumed lazily.
+    """
+    canvas = Canvas(output, pagesize=pagesize, pageCompression=1)
+    pages = _Pages(canvas, pagesize)
+    for title, estate, rows in cases:
+        pages.add(_case_table(title, estate, rows))
+        if not pages.frame.add(Spacer(1, 18), canvas):
+            pages.next_page()
+    pages.next_page()
+    canvas.save()
+
+
+def write_cases_pdf(path, cases):
+    """generate_cases_pdf into a file path (picklable target for PDF_EXECUTOR)"""
+    with open(path, "wb") as f:
+        generate_cases_pdf(f, cases)
+
+
+def render_pdf(estate, explanation):
+    """Build the report in memory and return the PDF bytes"""
+    buffer = BytesIO()
+    generate_pdf(buffer, estate, explanation)
+    return buffer.getvalue()
+
+
+def cached_pdf(key, estate, explanation, timeout=60, store=None):
+    """
+    Return the PDF bytes for a case, rendering only on a cache miss.
+
+    explanation may be a callable producing the explanation list so the
+    calculation is skipped entirely when the report is already cached.
+    store (a store.ResultStore holding the case under key) is consulted
+    before rendering and receives a freshly rendered report. The report
+    itself is built in PDF_EXECUTOR; raises offload.Busy when its queue is
+    full.
+    """
+    def build(_):
+        if store is not None:
+            report = store.pdf(key)
+            if report is not None:
+                return report
+        lines = explanation() if callable(explanation) else explanation
+        with span("pdf_build"):
+            report = PDF_EXECUTOR.run(render_pdf, estate, lines, timeout=timeout)
+        if store is not None:
+            store.attach_pdf(key, report)
+        return report
+
+    return PDF_CACHE.get(key, build)
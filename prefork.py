@@ -0,0 +1,58 @@
+"""
+Pre-fork warm-up for multi-worker deployments.
+
+Importing app loads no renderer: reportlab is loaded by the first /pdf
+request, matplotlib only inside the chart workers, and the Arabic shaping
+stack on the first shaped string. That keeps the import cheap for scripts
+and benchmarks. Serving pays that cost once up front instead of on the
+first requests: gunicorn.conf.py calls preload(charts=False) in the master
+before forking, and `python app.py` before it starts, so every server
+worker inherits reportlab, the registered font and a warm shaping cache.
+matplotlib is left out there: no server worker draws a chart.
+
+The PDF and chart render pools (offload.py) spawn their workers from a
+fresh interpreter instead, so those inherit none of it: init_worker is
+their pool initializer and warms each one, charts included, as it starts.
+PRELOAD_RENDERERS=0 turns both warm-ups off.
+"""
+import logging
+import os
+import time
+
+ENABLED = os.environ.get("PRELOAD_RENDERERS", "1").lower() not in ("0", "false", "no")
+
+
+def preload(shaping=True, pdf=True, charts=True):
+    """Import and warm the heavy renderers; returns seconds spent per part"""
+    timings = {}
+
+    if shaping:
+        start = time.perf_counter()
+        import arabic_text
+        arabic_text.warm_up()
+        timings["shaping"] = time.perf_counter() - start
+
+    if pdf:
+        start = time.perf_counter()
+        import pdf_report
+        pdf_report.warm_up()
+        timings["pdf"] = time.perf_counter() - start
+
+    if charts:
+        start = time.perf_counter()
+        import matplotlib.figure  # noqa: F401
+        import matplotlib.backends.backend_agg  # noqa: F401
+        import matplotlib.backends.backend_svg  # noqa: F401
+        timings["charts"] = time.perf_counter() - start
+
+    logging.info("Preloaded renderers: %s", timings)
+    return timings
+
+
+def init_worker(*parts):
+    """
+    Pool initializer warming a spawned render worker; parts name the
+    preload() parts it needs ("shaping", "pdf", "charts").
+    """
+    if ENABLED:
+        preload(**{part: part in parts for part in ("shaping", "pdf", "charts")})
@@ -1,14 +1,5 @@
+from schema import FIELDS
+
+
 def get_required_inputs():
-    return {
-        "estate": "قيمة التركة",
-        "husband": "هل يوجد زوج؟",
-        "wives": "عدد الزوجات",
-        "father": "هل الأب موجود؟",
-        "mother": "هل الأم موجودة؟",
-        "sons": "عدد الأبناء",
-        "daughters": "عدد البنات",
-        "brothers": "عدد الإخوة الأشقاء",
-        "sisters": "عدد الأخوات الشقيقات",
-        "brothers_mother": "عدد الإخوة لأم",
-        "sisters_mother": "عدد الأخوات لأم"
-    }
+    return {field.name: field.question for field in FIELDS if field.question}
@@ -0,0 +1,117 @@
+"""
+Signed result tokens: a calculation the client can hand back.
+
+/calculate returns a token holding the case id, the explanation locale
+and the calculation Trace (estate, madhab, heir composition, each heir's
+rule, fraction and amounts, and the awl or radd applied). /pdf and /chart accept the token in
+place of the case and render from it directly: nothing is recomputed,
+and the report shows exactly the shares the user was shown.
+
+A token is base64url(JSON) "." base64url(HMAC-SHA256), so it holds no
+server state. It is not compressed: at a few hundred bytes zlib would
+halve it but cost more than the rest of the encoding.
+
+The key comes from RESULT_TOKEN_SECRET, which every deployment should
+set (see gunicorn.conf.py). Without it a random key is drawn at import
+and a warning is logged: the key then lives only as long as the process.
+Tokens stop verifying on every restart and on other hosts, and they are
+only shared between workers when the server preloads the app.
+"""
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from decimal import Decimal
+from fractions import Fraction
+import hashlib
+import hmac
+import json
+import logging
+import os
+
+from inheritance_logic import Adjustment, Step, Trace
+from rule_engine import Composition
+
+VERSION = 3
+
+_SECRET = os.environ.get("RESULT_TOKEN_SECRET", "").encode("utf-8")
+if not _SECRET:
+    logging.warning(
+        "RESULT_TOKEN_SECRET is not set: result tokens use a random per-process key "
+        "and stop verifying after a restart or on another host"
+    )
+    _SECRET = os.urandom(32)
+
+_INVALID = "رمز النتيجة غير صالح"
+
+
+def _b64encode(raw):
+    return urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(text):
+    return urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _signature(payload):
+    return hmac.new(_SECRET, payload, hashlib.sha256).digest()
+
+
+def encode(case_id, trace, locale):
+    """Token for a calculated case (exact amounts are kept as Decimal strings)"""
+    def number(value):
+        if value is None:
+            return None
+        return str(value) if trace.exact else float(value)
+
+    body = [
+        VERSION, case_id, locale, trace.madhab, trace.exact, number(trace.estate),
+        list(trace.key),
+        [[step.rule, str(step.fraction), step.heir, number(step.amount),
+          number(step.assigned), number(step.base)] for step in trace.steps],
+        trace.currency,
+        [[adjustment.rule, str(adjustment.fraction), number(adjustment.amount),
+          adjustment.base, adjustment.raised] for adjustment in trace.adjustments],
+    ]
+    payload = _b64encode(
+        json.dumps(body, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    ).encode("ascii")
+    return f"{payload.decode('ascii')}.{_b64encode(_signature(payload))}"
+
+
+def decode(token):
+    """
+    (case_id, Trace, locale) of a token issued by encode.
+
+    Raises:
+        ValueError: when the token is malformed or its signature does not match
+    """
+    if not isinstance(token, str) or token.count(".") != 1:
+        raise ValueError(_INVALID)
+    payload, signature = token.encode("ascii", "replace").split(b".")
+    try:
+        valid = hmac.compare_digest(_b64decode(signature.decode("ascii")), _signature(payload))
+    except ValueError:
+        valid = False
+    if not valid:
+        raise ValueError(_INVALID)
+
+    try:
+        body = json.loads(_b64decode(payload.decode("ascii")))
+    except ValueError:
+        raise ValueError(_INVALID)
+    if not isinstance(body, list) or not body or body[0] != VERSION:
+        raise ValueError(_INVALID)
+    _, case_id, locale, madhab, exact, estate, key, steps, currency, adjustments = body
+
+    def number(value):
+        if value is None:
+            return None
+        return Decimal(value) if exact else float(value)
+
+    trace = Trace(
+        number(estate), madhab, Composition(*key), exact,
+        tuple(Step(rule, Fraction(fraction), heir, number(amount), number(assigned), number(base))
+              for rule, fraction, heir, amount, assigned, base in steps),
+        currency,
+        tuple(Adjustment(rule, Fraction(fraction), number(amount), base, raised)
+              for rule, fraction, amount, base, raised in adjustments),
+    )
+    return case_id, trace, locale
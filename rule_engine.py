@@ -0,0 +1,367 @@
+"""
+Unified inheritance rule engine.
+
+A calculation is a pipeline of rule passes run over a State that holds the
+exact share (Fraction of the estate) of every heir class:
+
+    fixed shares -> blocking -> awl -> asaba -> radd
+
+Each pass is a (name, function) pair, so a calculator is just a Profile: the
+pipeline it runs plus the labels it reports heirs under. inheritance_logic
+(one profile per madhab, see madhab.py), engine and calculator each define
+their profiles from the passes below; their historical differences (which
+relatives block whom, whether awl and radd apply, how the mother's third is
+taken) are expressed by choosing and ordering passes rather than by
+separate implementations.
+"""
+from collections import namedtuple
+from fractions import Fraction
+from time import perf_counter
+
+from heirs import FARAID
+
+HEIR_CLASSES = (
+    "husband", "wives", "father", "mother", "grandfather", "grandmother",
+    "sons", "daughters", "son_sons", "son_daughters",
+    "brothers", "sisters", "maternal_siblings",
+)
+
+Composition = namedtuple("Composition", HEIR_CLASSES, defaults=(0,) * len(HEIR_CLASSES))
+
+
+def composition(**counts):
+    """Composition with every given count coerced to int (booleans become 0/1)"""
+    return Composition(**{heir: int(count) for heir, count in counts.items()})
+
+
+class State:
+    """
+    Shares assigned so far for one composition, with what the explanation
+    needs besides them: the part of the estate a share was taken from
+    (bases, e.g. the mother's third of the remainder), the shares as their
+    rules gave them before awl or radd changed them (assigned) and those
+    adjustments as (rule, Fraction) pairs: ("awl", fixed shares' total) or
+    ("radd" / "radd_spouse", surplus returned).
+    """
+
+    __slots__ = ("case", "shares", "rules", "blocked", "bases", "assigned", "adjustments", "_total")
+
+    def __init__(self, case):
+        self.case = case
+        self.shares = {}
+        self.rules = {}
+        self.blocked = set()
+        self.bases = {}
+        self.assigned = {}
+        self.adjustments = []
+        self._total = Fraction(0)
+
+    def count(self, heir):
+        return getattr(self.case, heir)
+
+    @property
+    def descendants(self):
+        case = self.case
+        return bool(case.sons or case.daughters or case.son_sons or case.son_daughters)
+
+    @property
+    def siblings(self):
+        return self.case.brothers + self.case.sisters
+
+    def present(self, heir):
+        """Whether a heir class (or "descendants") exists in the composition"""
+        if heir == "descendants":
+            return self.descendants
+        return self.count(heir) > 0
+
+    @property
+    def total(self):
+        """Sum of the shares, added up again only after they change"""
+        if self._total is None:
+            self._total = sum(self.shares.values(), Fraction(0))
+        return self._total
+
+    def remaining(self):
+        return 1 - self.total
+
+    def assign(self, heir, rule, fraction):
+        self.shares[heir] = fraction
+        self.rules[heir] = rule
+        self._total = None
+
+    def block(self, heir):
+        if self.shares.pop(heir, None) is not None:
+            self._total = None
+        self.rules.pop(heir, None)
+        self.blocked.add(heir)
+
+    def scale(self, heir, factor):
+        """Multiply one share, keeping the share its rule gave in assigned"""
+        self.assigned.setdefault(heir, self.shares[heir])
+        self.shares[heir] *= factor
+
+    def scale_to_whole(self):
+        """Scale every share by 1/total so they add up to the estate (awl, radd)"""
+        factor = 1 / self.total
+        for heir in self.shares:
+            self.scale(heir, factor)
+        self._total = Fraction(1)
+
+
+# ==================== Fixed-share (فرض) rules ====================
+# Each rule maps a State to (rule id, fraction) or None when it does not apply
+
+def husband(state):
+    if not state.case.husband:
+        return None
+    if state.descendants:
+        return "husband_quarter", FARAID["husband"]["quarter"]
+    return "husband_half", FARAID["husband"]["half"]
+
+
+def wives(state):
+    if not state.case.wives:
+        return None
+    if state.descendants:
+        return "wives_eighth", FARAID["wife"]["eighth"]
+    return "wives_quarter", FARAID["wife"]["quarter"]
+
+
+def mother(min_siblings=2, third_of="remainder"):
+    """
+    Mother's rule: 1/6 with descendants or min_siblings siblings, otherwise
+    1/3 of the estate (third_of="estate") or no fixed share here, leaving the
+    third of the remainder to mother_third_of_remainder (third_of="remainder").
+    """
+    def rule(state):
+        if not state.case.mother:
+            return None
+        if state.descendants:
+            return "mother_sixth_children", FARAID["mother"]["sixth"]
+        if state.siblings >= min_siblings:
+            return "mother_sixth_siblings", FARAID["mother"]["sixth"]
+        if third_of == "estate":
+            return "mother_third", FARAID["mother"]["third"]
+        return None
+    return rule
+
+
+def father(state):
+    if state.case.father and state.descendants:
+        return "father_sixth", FARAID["father"]["sixth"]
+    return None
+
+
+def grandmother(state):
+    if state.case.grandmother:
+        return "grandmother_sixth", FARAID["grandmother"]["sixth"]
+    return None
+
+
+def maternal_siblings(state):
+    if state.case.maternal_siblings == 1:
+        return "maternal_siblings_sixth", FARAID["brother_mother"]["sixth"]
+    if state.case.maternal_siblings > 1:
+        return "maternal_siblings_third", FARAID["brother_mother"]["third"]
+    return None
+
+
+# ==================== Passes ====================
+
+def fixed_shares(*rules, name="fixed"):
+    """Pass assigning fixed shares from (heir, rule) pairs, skipping blocked heirs"""
+    def fixed(state):
+        for heir, rule in rules:
+            if heir in state.blocked:
+                continue
+            result = rule(state)
+            if result is not None:
+                state.assign(heir, *result)
+    return name, fixed
+
+
+def blocking(table):
+    """
+    Pass excluding heirs (hajb): table maps a heir class to the heir classes
+    (or "descendants") whose presence blocks it.
+    """
+    table = tuple(table.items())
+
+    def block(state):
+        for heir, blockers in table:
+            for blocker in blockers:
+                if state.present(blocker):
+                    state.block(heir)
+                    break
+    return "blocking", block
+
+
+def _awl(state):
+    if state.total > 1:
+        state.adjustments.append(("awl", state.total))
+        state.scale_to_whole()
+
+
+awl = ("awl", _awl)
+
+
+def _mother_third_of_remainder(state):
+    if state.case.mother and "mother" not in state.shares and "mother" not in state.blocked:
+        remaining = state.remaining()
+        state.assign("mother", "mother_third_remainder", remaining / 3)
+        state.bases["mother"] = remaining
+
+
+mother_third_of_remainder = ("mother_third", _mother_third_of_remainder)
+
+
+def _grandfather_with_siblings(state):
+    """
+    Muqasama: the grandfather shares the remainder with the full siblings
+    as one more brother, unless a third of the estate (nobody else has a
+    fixed share) or the better of a third of the remainder and a sixth of
+    the estate (someone does) gives him more.
+    """
+    case = state.case
+    if not case.grandfather or "grandfather" in state.blocked or "grandfather" in state.shares:
+        return
+    members = [
+        (heir, weight * state.count(heir)) for heir, weight in (("brothers", 2), ("sisters", 1))
+        if state.count(heir) and heir not in state.blocked and heir not in state.shares
+    ]
+    remaining = state.remaining()
+    if not members or remaining <= 0:
+        return
+
+    units = sum(weight for _, weight in members)
+    options = [("grandfather_muqasama", remaining * 2 / (units + 2))]
+    if state.shares:
+        options += [("grandfather_third_remainder", remaining / 3),
+                    ("grandfather_sixth", FARAID["grandfather"]["sixth"])]
+    else:
+        options.append(("grandfather_third", FARAID["grandfather"]["third"]))
+    # max keeps the first of equal options, so muqasama wins ties
+    rule, share = max(options, key=lambda option: option[1])
+    share = min(share, remaining)
+    state.assign("grandfather", rule, share)
+
+    rest = remaining - share
+    if rest > 0:
+        for heir, weight in members:
+            state.assign(heir, f"{heir}_with_grandfather", rest * weight / units)
+
+
+grandfather_with_siblings = ("grandfather_siblings", _grandfather_with_siblings)
+
+
+def asaba(*groups):
+    """
+    Residuary pass. groups are (rule suffix, ((heir, weight), ...),
+    needs_remainder) in priority order; the first group with an eligible
+    member (present, not blocked, no fixed share) takes the whole remainder,
+    split by weight times count (2:1 for males). A group with
+    needs_remainder is skipped when nothing is left.
+    """
+    def residue(state):
+        remaining = state.remaining()
+        for suffix, members, needs_remainder in groups:
+            eligible = [
+                (heir, weight * state.count(heir)) for heir, weight in members
+                if state.count(heir) and heir not in state.blocked and heir not in state.shares
+            ]
+            if not eligible or (needs_remainder and remaining <= 0):
+                continue
+            units = sum(weight for _, weight in eligible)
+            for heir, weight in eligible:
+                # remaining * weight / units, normalized once
+                state.assign(heir, f"{heir}_{suffix}", Fraction(
+                    remaining.numerator * weight, remaining.denominator * units
+                ))
+            # the group took exactly the remainder: no need to add up again
+            state._total = Fraction(1)
+            return
+    return "asaba", residue
+
+
+# heirs by marriage: radd passes them over while a blood heir is present
+SPOUSES = ("husband", "wives")
+
+
+def _radd(state):
+    total = state.total
+    if not 0 < total < 1:
+        return
+    spouse = sum((state.shares[heir] for heir in SPOUSES if heir in state.shares), Fraction(0))
+    if spouse == total:
+        # the spouse is the only heir and takes the remainder too
+        state.adjustments.append(("radd_spouse", 1 - total))
+        state.scale_to_whole()
+        return
+    # the other heirs' shares grow pro rata to fill what the spouse leaves
+    state.adjustments.append(("radd", 1 - total))
+    factor = (1 - spouse) / (total - spouse)
+    for heir in state.shares:
+        if heir not in SPOUSES:
+            state.scale(heir, factor)
+    state._total = Fraction(1)
+
+
+radd = ("radd", _radd)
+
+
+# ==================== Running ====================
+
+def run(pipeline, case, timings=None):
+    """
+    Run the passes over a composition and return the final State.
+
+    timings, when given, is a dict accumulating seconds per pass name.
+    """
+    state = State(case)
+    if timings is None:
+        for _, apply in pipeline:
+            apply(state)
+    else:
+        for name, apply in pipeline:
+            start = perf_counter()
+            apply(state)
+            timings[name] = timings.get(name, 0.0) + perf_counter() - start
+    return state
+
+
+# Profile.distribution: the (label, rule id, Fraction) shares, plus the
+# State's bases and assigned keyed by label and its adjustments
+Distribution = namedtuple("Distribution", ("shares", "bases", "assigned", "adjustments"))
+
+
+class Profile:
+    """A named pipeline plus the label format ("{n}" is the count) per heir class"""
+
+    def __init__(self, name, pipeline, labels):
+        self.name = name
+        self.pipeline = tuple(pipeline)
+        self.labels = dict(labels)
+
+    def shares(self, case, timings=None):
+        """Tuple of (heir class, rule id, Fraction) in assignment order"""
+        state = run(self.pipeline, case, timings)
+        return tuple((heir, state.rules[heir], fraction) for heir, fraction in state.shares.items())
+
+    def distribute(self, case, timings=None):
+        """Tuple of (label, rule id, Fraction) in assignment order"""
+        return tuple(
+            (self.labels[heir].format(n=getattr(case, heir)), rule, fraction)
+            for heir, rule, fraction in self.shares(case, timings)
+        )
+
+    def distribution(self, case, timings=None):
+        """Distribution of a composition: its shares and how awl and radd changed them"""
+        state = run(self.pipeline, case, timings)
+        labels = {heir: self.labels[heir].format(n=getattr(case, heir)) for heir in state.shares}
+        return Distribution(
+            tuple((labels[heir], state.rules[heir], fraction)
+                  for heir, fraction in state.shares.items()),
+            {labels[heir]: base for heir, base in state.bases.items()},
+            {labels[heir]: fraction for heir, fraction in state.assigned.items()},
+            tuple(state.adjustments),
+        )
@@ -0,0 +1,217 @@
+"""
+Compiled rule table for engine.calculate.
+
+Which heirs take a fixed share, how large it is and who is blocked depend
+only on which heir classes are present and a few count thresholds. The
+engine's fixed-share and blocking passes are evaluated ahead of time for
+every combination of those into a flat array indexed by a presence bitmask,
+so at run time they collapse into one lookup (RuleTable.as_pass). The
+table is written to rule_table.txt (one line per mask, easy to diff when
+rules change) and loaded from there at import.
+
+The file records a digest of the rules it was compiled from (rules_digest:
+the source of every rule function and the values they use). A file whose
+digest does not match the current rules is stale and is not loaded; the
+table is then compiled in memory. Run ``python rule_table.py`` to
+regenerate the file after changing the rules.
+"""
+from array import array
+from fractions import Fraction
+import hashlib
+import inspect
+import os
+
+from rule_engine import HEIR_CLASSES, State, composition, run
+
+VERSION = 3
+
+# Presence / threshold bits
+HUSBAND = 1 << 0
+WIVES = 1 << 1
+MOTHER = 1 << 2
+GRANDMOTHER = 1 << 3
+FATHER = 1 << 4
+DESCENDANTS = 1 << 5
+SIBLINGS = 1 << 6             # at least one full brother or sister
+SIBLINGS_PLURAL = 1 << 7      # two or more full siblings
+MATERNAL_ONE = 1 << 8         # exactly one maternal sibling
+MATERNAL_PLURAL = 1 << 9      # two or more maternal siblings
+MASK_COUNT = 1 << 10
+
+# Heir classes that can take a fixed share, in the order the engine assigns them
+SLOTS = ("husband", "wives", "mother", "grandmother", "father", "maternal_siblings")
+
+# Each row holds a rule index per slot (0 = no share) and a bitmask of blocked
+# heir classes (bit i = HEIR_CLASSES[i])
+ROW = len(SLOTS) + 1
+
+PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rule_table.txt")
+
+
+def presence_mask(case):
+    """Bitmask for a Composition; counts are reduced to the thresholds that matter"""
+    mask = 0
+    if case.husband:
+        mask |= HUSBAND
+    if case.wives:
+        mask |= WIVES
+    if case.mother:
+        mask |= MOTHER
+    if case.grandmother:
+        mask |= GRANDMOTHER
+    if case.father:
+        mask |= FATHER
+    if case.sons or case.daughters or case.son_sons or case.son_daughters:
+        mask |= DESCENDANTS
+    siblings = case.brothers + case.sisters
+    if siblings:
+        mask |= SIBLINGS
+    if siblings >= 2:
+        mask |= SIBLINGS_PLURAL
+    if case.maternal_siblings == 1:
+        mask |= MATERNAL_ONE
+    elif case.maternal_siblings > 1:
+        mask |= MATERNAL_PLURAL
+    return mask
+
+
+def representative(mask):
+    """A Composition with exactly the presence and thresholds of mask"""
+    return composition(
+        husband=bool(mask & HUSBAND),
+        wives=bool(mask & WIVES),
+        mother=bool(mask & MOTHER),
+        grandmother=bool(mask & GRANDMOTHER),
+        father=bool(mask & FATHER),
+        sons=bool(mask & DESCENDANTS),
+        brothers=2 if mask & SIBLINGS_PLURAL else int(bool(mask & SIBLINGS)),
+        maternal_siblings=2 if mask & MATERNAL_PLURAL else int(bool(mask & MATERNAL_ONE)),
+    )
+
+
+def _feed(h, value, seen):
+    """Hash the parts of a rule (functions, closures, data) that decide its result"""
+    if inspect.isfunction(value):
+        if id(value) in seen:
+            return
+        seen.add(id(value))
+        h.update(inspect.getsource(value).encode("utf-8"))
+        for cell in value.__closure__ or ():
+            _feed(h, cell.cell_contents, seen)
+        # module-level data and helper functions the rule reads (FARAID, ...)
+        for name in sorted(value.__code__.co_names):
+            if name in value.__globals__:
+                _feed(h, value.__globals__[name], seen)
+    elif isinstance(value, (tuple, list)):
+        for item in value:
+            _feed(h, item, seen)
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            h.update(repr(key).encode("utf-8"))
+            _feed(h, item, seen)
+    elif isinstance(value, (str, int, float, Fraction, frozenset, type(None))):
+        h.update(repr(value).encode("utf-8"))
+
+
+def rules_digest(passes):
+    """Digest of the fixed-share/blocking passes a table is compiled from"""
+    h = hashlib.sha256()
+    # the rules ask the State for presence, counts and descendants
+    h.update(inspect.getsource(State).encode("utf-8"))
+    _feed(h, passes, set())
+    return h.hexdigest()
+
+
+class RuleTable:
+    """Fixed shares and blocked heirs per presence mask"""
+
+    def __init__(self, rules, rows, digest):
+        self.rules = tuple(rules)   # (rule id, Fraction), referenced 1-based by rows
+        self.rows = rows            # flat array('H'), ROW entries per mask
+        self.digest = digest        # rules_digest of the passes compiled
+        self._decoded = [self._decode(mask) for mask in range(MASK_COUNT)]
+
+    def _decode(self, mask):
+        row = self.rows[mask * ROW:(mask + 1) * ROW]
+        assigned = tuple(
+            (heir, *self.rules[index - 1]) for heir, index in zip(SLOTS, row) if index
+        )
+        blocked = frozenset(heir for i, heir in enumerate(HEIR_CLASSES) if row[-1] >> i & 1)
+        return assigned, blocked
+
+    def lookup(self, mask):
+        """((heir, rule id, Fraction), ...), frozenset of blocked heirs"""
+        return self._decoded[mask]
+
+    def as_pass(self):
+        """Pass replacing the fixed-share and blocking passes it was compiled from"""
+        def compiled(state):
+            assigned, blocked = self._decoded[presence_mask(state.case)]
+            for heir, rule, fraction in assigned:
+                state.assign(heir, rule, fraction)
+            state.blocked.update(blocked)
+        return "compiled", compiled
+
+
+def compile_table(passes):
+    """Evaluate the fixed-share/blocking passes once for every mask"""
+    results = []
+    for mask in range(MASK_COUNT):
+        state = run(passes, representative(mask))
+        assigned = [
+            (state.rules[heir], state.shares[heir]) if heir in state.shares else None
+            for heir in SLOTS
+        ]
+        blocked = sum(1 << HEIR_CLASSES.index(heir) for heir in state.blocked)
+        results.append((assigned, blocked))
+
+    rules = sorted({rule for assigned, _ in results for rule in assigned if rule})
+    index = {rule: i + 1 for i, rule in enumerate(rules)}
+    rows = array("H")
+    for assigned, blocked in results:
+        rows.extend([index[rule] if rule else 0 for rule in assigned] + [blocked])
+    return RuleTable(rules, rows, rules_digest(passes))
+
+
+def save(table, path=PATH):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f"# rule_table v{VERSION}: mask {' '.join(SLOTS)} blocked\n")
+        f.write(f"# digest: {table.digest}\n")
+        f.write("# rules: " + " ".join(
+            f"{i + 1}={rule}:{fraction}" for i, (rule, fraction) in enumerate(table.rules)
+        ) + "\n")
+        for mask in range(MASK_COUNT):
+            row = table.rows[mask * ROW:(mask + 1) * ROW]
+            f.write(f"{mask:04d} " + " ".join(str(v) for v in row) + "\n")
+
+
+def load(passes, path=PATH):
+    """
+    Read a saved table; returns None when it is missing, from another
+    version or compiled from other rules than passes
+    """
+    digest = rules_digest(passes)
+    try:
+        with open(path, encoding="utf-8") as f:
+            if not f.readline().startswith(f"# rule_table v{VERSION}:"):
+                return None
+            if f.readline().split()[2:] != [digest]:
+                return None
+            rules = []
+            for item in f.readline().split()[2:]:
+                rule, fraction = item.split("=", 1)[1].split(":")
+                rules.append((rule, Fraction(fraction)))
+            rows = array("H")
+            for line in f:
+                rows.extend(int(v) for v in line.split()[1:])
+    except (OSError, ValueError):
+        return None
+    if len(rows) != MASK_COUNT * ROW:
+        return None
+    return RuleTable(rules, rows, digest)
+
+
+if __name__ == "__main__":
+    from engine import RULES
+    save(compile_table(RULES))
+    print(f"wrote {PATH}")
@@ -1,23 +1,43 @@
-def fixed_shares(data):
-    shares = {}
+import rule_engine
+from rule_engine import composition, father, husband, mother, run, wives
+
+# brothers and sisters together that reduce the mother to a sixth
+MOTHER_SIXTH_SIBLINGS = 2
 
-    # Husband
-    if data["husband"]:
-        shares["الزوج"] = 0.25 if (data["sons"] or data["daughters"]) else 0.5
+# Fixed shares: husband, wives, mother (1/6 with children or 2+ siblings;
+# otherwise her third of the remaining is taken later) and father (1/6 only
+# with children, otherwise residuary)
+FIXED = rule_engine.fixed_shares(
+    ("husband", husband),
+    ("wives", wives),
+    ("mother", mother(min_siblings=MOTHER_SIXTH_SIBLINGS, third_of="remainder")),
+    ("father", father),
+)
 
-    # Wives
-    if data["wives"] > 0:
-        shares["الزوجات"] = 0.125 if (data["sons"] or data["daughters"]) else 0.25
+LABELS = {
+    "husband": "الزوج",
+    "wives": "الزوجات",
+    "mother": "الأم",
+    "father": "الأب",
+    "sons": "الأبناء",
+    "daughters": "البنات",
+}
 
-    # Mother
-    if data["mother"]:
-        # mother takes 1/6 as a fixed share when there are children or 2+ siblings
-        if data["sons"] or data["daughters"] or (data["brothers"] + data["sisters"] >= 2):
-            shares["الأم"] = 1/6
-        # otherwise mother's one-third is handled later (one-third of remaining after fixed shares)
 
-    # Father: fixed 1/6 only if there are children (otherwise residuary)
-    if data["father"] and (data["sons"] or data["daughters"]):
-        shares["الأب"] = 1/6
+def fixed_fractions(data):
+    case = composition(
+        husband=data["husband"],
+        wives=data["wives"] > 0,
+        mother=data["mother"],
+        father=data["father"],
+        sons=data["sons"],
+        daughters=data["daughters"],
+        brothers=data["brothers"],
+        sisters=data["sisters"],
+    )
+    state = run((FIXED,), case)
+    return {LABELS[heir]: fraction for heir, fraction in state.shares.items()}
 
-    return shares
+
+def fixed_shares(data):
+    return {k: float(v) for k, v in fixed_fractions(data).items()}
@@ -0,0 +1,418 @@
+"""
+Input schema shared by every entry point.
+
+FIELDS declares each field of a case once: its kind (amount, count, flag
+or choice), the label used in error messages, the question asked for it
+(questions.py) and its default. From it the module builds:
+
+- Case: a __slots__ record with one attribute per field. It reads like a
+  mapping (case["sons"], case.get("sons"), dict(case)), so the calculators
+  take it where they took the normalized dictionary.
+- normalize(received): one raw payload -> Case, raising ValueError with
+  an Arabic message on the first invalid field.
+- normalize_rows(rows) / validate_columns(columns, count): a batch of
+  payloads, or of columns (e.g. read from a CSV), validated without
+  raising: each coercer returns the value or an Invalid marker, so a bad
+  row costs no exception and only the valid rows become Case objects.
+
+Every coercer tests first for its field's common well-formed value (a
+non-negative int for a count, a bool for a flag) and returns it as it is.
+
+The estate can also be given exactly, as estate_minor (an integer number
+of minor units) with a currency code (see exact.CURRENCY_PLACES). The
+validators then derive estate from it, and a case with a currency always
+carries estate_minor, so the calculation can allocate in integers.
+
+The API, the batch endpoints, munasakha stages and the command line all
+go through normalize or normalize_rows.
+"""
+from collections import namedtuple
+from collections.abc import Mapping
+from math import isfinite
+import re
+
+from exact import CURRENCY_PLACES, DEFAULT_PLACES, from_minor_units, to_minor_units
+from family import FEMALE, MALE, case_from_family
+from madhab import DEFAULT, MADHABS
+
+Field = namedtuple(
+    "Field", ("name", "kind", "label", "question", "default", "choices"),
+    defaults=(None, None),
+)
+
+FIELDS = (
+    # validated ahead of estate, which is derived from them when given
+    Field("estate_minor", "minor", "قيمة التركة بالوحدات الصغرى", None),
+    Field("currency", "choice", "رمز العملة", None, None, tuple(CURRENCY_PLACES)),
+    Field("estate", "amount", "قيمة التركة", "قيمة التركة"),
+    Field("deceased_gender", "choice", "جنس المتوفى", "جنس المتوفى", MALE, (MALE, FEMALE)),
+    Field("husband", "flag", "الزوج", "هل يوجد زوج؟", False),
+    Field("wives", "count", "عدد الزوجات", "عدد الزوجات", 0),
+    Field("father", "flag", "الأب", "هل الأب موجود؟", False),
+    Field("mother", "flag", "الأم", "هل الأم موجودة؟", False),
+    Field("grandfather", "flag", "الجد", "هل الجد موجود؟", False),
+    Field("grandmother", "flag", "الجدة", "هل الجدة موجودة؟", False),
+    Field("sons", "count", "عدد الأبناء", "عدد الأبناء", 0),
+    Field("daughters", "count", "عدد البنات", "عدد البنات", 0),
+    Field("son_sons", "count", "عدد أبناء الابن", "عدد أبناء الابن", 0),
+    Field("son_daughters", "count", "عدد بنات الابن", "عدد بنات الابن", 0),
+    Field("brothers", "count", "عدد الإخوة الأشقاء", "عدد الإخوة الأشقاء", 0),
+    Field("sisters", "count", "عدد الأخوات الشقيقات", "عدد الأخوات الشقيقات", 0),
+    Field("halfbrothers_father", "count", "عدد الإخوة لأب", "عدد الإخوة لأب", 0),
+    Field("halfsisters_father", "count", "عدد الأخوات لأب", "عدد الأخوات لأب", 0),
+    Field("brothers_mother", "count", "عدد الإخوة لأم", "عدد الإخوة لأم", 0),
+    Field("sisters_mother", "count", "عدد الأخوات لأم", "عدد الأخوات لأم", 0),
+    Field("madhab", "choice", "المذهب", None, DEFAULT.name, tuple(MADHABS)),
+)
+
+FIELD_NAMES = tuple(field.name for field in FIELDS)
+_FIELD_SET = frozenset(FIELD_NAMES)
+
+
+class Invalid:
+    """Returned by a coercer instead of a value; message is the API error"""
+
+    __slots__ = ("message",)
+
+    def __init__(self, message):
+        self.message = message
+
+
+class Case(Mapping):
+    """
+    A validated case: one slot per schema field and read-only mapping
+    access. _case() settles the spouse fields and estate_minor as it builds
+    one; after that a Case is not modified (replace() returns a new one).
+    """
+
+    __slots__ = FIELD_NAMES
+
+    # one argument per field in FIELDS order, assigned directly so a Case
+    # costs one call rather than a loop of setattr
+    def __init__(self, estate_minor, currency, estate, deceased_gender, husband, wives,
+                 father, mother, grandfather, grandmother, sons, daughters, son_sons,
+                 son_daughters, brothers, sisters, halfbrothers_father, halfsisters_father,
+                 brothers_mother, sisters_mother, madhab):
+        self.estate_minor = estate_minor
+        self.currency = currency
+        self.estate = estate
+        self.deceased_gender = deceased_gender
+        self.husband = husband
+        self.wives = wives
+        self.father = father
+        self.mother = mother
+        self.grandfather = grandfather
+        self.grandmother = grandmother
+        self.sons = sons
+        self.daughters = daughters
+        self.son_sons = son_sons
+        self.son_daughters = son_daughters
+        self.brothers = brothers
+        self.sisters = sisters
+        self.halfbrothers_father = halfbrothers_father
+        self.halfsisters_father = halfsisters_father
+        self.brothers_mother = brothers_mother
+        self.sisters_mother = sisters_mother
+        self.madhab = madhab
+
+    def __getitem__(self, name):
+        if name not in _FIELD_SET:
+            raise KeyError(name)
+        return getattr(self, name)
+
+    def get(self, name, default=None):
+        return getattr(self, name) if name in _FIELD_SET else default
+
+    def __iter__(self):
+        return iter(FIELD_NAMES)
+
+    def __len__(self):
+        return len(FIELD_NAMES)
+
+    def __contains__(self, name):
+        return name in _FIELD_SET
+
+    def __repr__(self):
+        return f"Case({', '.join(f'{name}={getattr(self, name)!r}' for name in FIELD_NAMES)})"
+
+    def __reduce__(self):
+        return Case, tuple(getattr(self, name) for name in FIELD_NAMES)
+
+    def replace(self, **changes):
+        return Case(*(changes.get(name, getattr(self, name)) for name in FIELD_NAMES))
+
+
+# ==================== Coercers ====================
+# Each maps one raw value to the field value or an Invalid, without raising;
+# the well-formed value of its kind is tested first and returned as it is
+
+_INF = float("inf")
+
+_NUMBER = re.compile(r"\s*\+?(\d+(\.\d*)?|\.\d+)([eE][-+]?\d+)?\s*")
+
+_FALSE_STRINGS = frozenset(("", "0", "false", "no", "off"))
+
+
+def _amount(field):
+    missing = Invalid(f"{field.label} مطلوبة")
+    invalid = Invalid(f"{field.label} غير صحيحة")
+    not_positive = Invalid(f"{field.label} يجب أن تكون أكبر من صفر")
+
+    def coerce(value):
+        kind = type(value)
+        if kind is float and 0.0 < value < _INF:
+            return value
+        if kind is str:
+            if not _NUMBER.fullmatch(value):
+                return invalid if value.strip() else missing
+            value = float(value)
+        elif kind is int or kind is float:
+            value = float(value)
+        elif value is None:
+            return missing
+        else:
+            return invalid
+        if not isfinite(value):
+            return invalid
+        return value if value > 0 else not_positive
+    return coerce
+
+
+def _minor(field):
+    invalid = Invalid(f"{field.label} غير صحيحة")
+    not_positive = Invalid(f"{field.label} يجب أن تكون أكبر من صفر")
+
+    def coerce(value):
+        kind = type(value)
+        if kind is int and value > 0:
+            return value
+        if value is None or value == "":
+            return None
+        if kind is str:
+            value = value.strip()
+            if not value.isdecimal():
+                return invalid
+            value = int(value)
+        elif kind is float and value.is_integer():
+            value = int(value)
+        elif kind is not int:
+            return invalid
+        return value if value > 0 else not_positive
+    return coerce
+
+
+def _count(field):
+    invalid = Invalid(f"{field.label} غير صحيح")
+
+    def coerce(value):
+        kind = type(value)
+        if kind is int:
+            return value if value >= 0 else invalid
+        if value is None or value == "":
+            return 0
+        if kind is bool:
+            return int(value)
+        if kind is float:
+            return int(value) if value >= 0 and value.is_integer() else invalid
+        if kind is str:
+            value = value.strip()
+            # isdecimal also takes Arabic-Indic digits, which int() reads
+            return int(value) if value.isdecimal() else invalid
+        return invalid
+    return coerce
+
+
+def _flag(field):
+    def coerce(value):
+        if value.__class__ is bool:
+            return value
+        if type(value) is str:
+            return value.strip().lower() not in _FALSE_STRINGS
+        return bool(value)
+    return coerce
+
+
+def _choice(field):
+    invalid = Invalid(f"{field.label} غير مدعوم")
+    choices = frozenset(field.choices)
+
+    def coerce(value):
+        if value.__class__ is str:
+            if value in choices:
+                return value
+            return field.default if value == "" else invalid
+        # a list or dict is not hashable: test the type before membership
+        return field.default if value is None else invalid
+    return coerce
+
+
+_COERCERS = {
+    "amount": _amount, "minor": _minor, "count": _count, "flag": _flag, "choice": _choice,
+}
+
+
+def _estate_of(units, currency):
+    """Estate amount of a validated estate_minor (an invalid currency is reported on its own)"""
+    return float(from_minor_units(units, CURRENCY_PLACES.get(currency, DEFAULT_PLACES)))
+
+
+# (name, default, coercer) per field in FIELDS order
+_VALIDATORS = tuple(
+    (field.name, field.default, _COERCERS[field.kind](field)) for field in FIELDS
+)
+# field name -> (position, coercer); the defaults are valid values as they are
+_BY_NAME = {name: (i, coerce) for i, (name, _, coerce) in enumerate(_VALIDATORS)}
+_DEFAULTS = tuple(default for _, default, _ in _VALIDATORS)
+_MINOR = FIELD_NAMES.index("estate_minor")
+_CURRENCY = FIELD_NAMES.index("currency")
+_ESTATE = FIELD_NAMES.index("estate")
+_COERCE_ESTATE = _VALIDATORS[_ESTATE][2]
+
+
+def _validate(received):
+    """
+    Values list of one raw payload in FIELDS order, or its first Invalid in
+    that order. Only the fields the payload sets are coerced.
+    """
+    values = list(_DEFAULTS)
+    first = len(values)
+    for name, value in received.items():
+        entry = _BY_NAME.get(name)
+        if entry is not None:
+            i, coerce = entry
+            value = values[i] = coerce(value)
+            if value.__class__ is Invalid and i < first:
+                first = i
+    minor = values[_MINOR]
+    if minor.__class__ is int:
+        # estate_minor gives the estate (its currency, if invalid, is reported first)
+        values[_ESTATE] = _estate_of(minor, values[_CURRENCY])
+        if first == _ESTATE:
+            # a bad estate given next to estate_minor no longer counts
+            first = len(values)
+            for i, value in enumerate(values):
+                if value.__class__ is Invalid:
+                    first = i
+                    break
+    elif "estate" not in received:
+        values[_ESTATE] = _COERCE_ESTATE(None)
+        first = min(first, _ESTATE)
+    return values if first == len(values) else values[first]
+
+
+def _column(values, coerce, errors):
+    """Coerced list of one column; errors gets row -> first message"""
+    out = []
+    append = out.append
+    for index, value in enumerate(values):
+        value = coerce(value)
+        if value.__class__ is Invalid and index not in errors:
+            errors[index] = value.message
+        append(value)
+    return out
+
+
+def _case(values):
+    """
+    Case from validated values, with only one spouse type by the deceased's
+    gender and the estate in minor units whenever a currency is given
+    """
+    case = Case(*values)
+    if case.deceased_gender == MALE:
+        case.husband = False
+    else:
+        case.wives = 0
+    if case.currency is not None and case.estate_minor is None:
+        case.estate_minor = to_minor_units(case.estate, CURRENCY_PLACES[case.currency])
+    return case
+
+
+def _estates(values, minor, currency, count):
+    """Raw estate column with the rows given in minor units replaced by their estate"""
+    return [
+        _estate_of(minor[i], currency[i])
+        if minor[i].__class__ is int else (values[i] if values is not None else None)
+        for i in range(count)
+    ]
+
+
+# ==================== Entry points ====================
+
+def normalize(received):
+    """
+    Validate one raw payload (flat counts, or a "family" graph, see
+    family.py) into a Case.
+
+    Raises:
+        ValueError: with an Arabic message suitable for the API response
+    """
+    if not isinstance(received, dict) or not received or (
+        "estate" not in received and "estate_minor" not in received
+    ):
+        raise ValueError("قيمة التركة مطلوبة")
+    if received.get("family") is not None:
+        received = case_from_family(received)
+
+    values = _validate(received)
+    if values.__class__ is Invalid:
+        raise ValueError(values.message)
+    return _case(values)
+
+
+def validate_columns(columns, count):
+    """
+    Validate a batch held as columns (field name -> sequence of count raw
+    values; missing columns take the field default).
+
+    Returns:
+        (cases, errors): a list of count entries, each a Case or None,
+        and {row index: Arabic message} for the rejected rows (the first
+        invalid field of each, in schema order)
+    """
+    errors = {}
+    coerced = []
+    for name, default, coerce in _VALIDATORS:
+        values = columns.get(name)
+        if name == "estate" and (values is None or columns.get("estate_minor") is not None):
+            # a missing estate column is an error per row unless estate_minor gives it
+            values = _estates(values, coerced[_MINOR], coerced[_CURRENCY], count)
+        coerced.append((default,) * count if values is None else _column(values, coerce, errors))
+
+    return [
+        None if index in errors else _case(values)
+        for index, values in enumerate(zip(*coerced))
+    ], errors
+
+
+def normalize_rows(rows):
+    """
+    Validate a list of raw payloads in bulk with the same validator as
+    normalize, which returns an Invalid rather than raising for a bad row
+    (columnar input goes through validate_columns).
+
+    Returns:
+        (cases, errors) as validate_columns
+    """
+    cases = []
+    errors = {}
+    for index, row in enumerate(rows):
+        if not isinstance(row, dict):
+            errors[index] = "صيغة الحالة غير صحيحة"
+        elif not row or ("estate" not in row and "estate_minor" not in row):
+            errors[index] = "قيمة التركة مطلوبة"
+        else:
+            if row.get("family") is not None:
+                try:
+                    row = case_from_family(row)
+                except ValueError as e:
+                    errors[index] = str(e)
+                    cases.append(None)
+                    continue
+            values = _validate(row)
+            if values.__class__ is Invalid:
+                errors[index] = values.message
+            else:
+                cases.append(_case(values))
+                continue
+        cases.append(None)
+    return cases, errors
@@ -0,0 +1,117 @@
+"""
+Bounded LRU cache for share fractions.
+
+Share ratios depend only on the heir composition (spouse, parents, children
+and sibling counts); the estate value only scales them. Each calculator keeps
+its pure "composition -> fractions" step behind one of these caches so a
+repeated family shape costs a dictionary lookup plus a multiply.
+"""
+from collections import OrderedDict
+from functools import wraps
+import os
+import threading
+
+# entries per cache; override with SHARE_CACHE_SIZE or ShareCache.resize()
+DEFAULT_MAXSIZE = int(os.environ.get("SHARE_CACHE_SIZE", 512))
+
+_registry = {}
+
+
+class ShareCache:
+    """
+    Thread-safe LRU mapping with hit/miss/eviction counters.
+
+    maxsize bounds the number of entries, or the total weight when a weigh
+    function is given (e.g. weigh=len to bound cached bytes).
+    """
+
+    def __init__(self, name, maxsize=DEFAULT_MAXSIZE, weigh=None):
+        self.name = name
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._weigh = weigh
+        self._size = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        _registry[name] = self
+
+    def get(self, key, compute):
+        """Return the cached value for key, computing and storing it on a miss"""
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+            else:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return value
+
+        # compute outside the lock; a racing miss keeps the first stored value
+        value = compute(key)
+
+        with self._lock:
+            if key in self._data:
+                return self._data[key]
+            self._data[key] = value
+            self._size += self._weight(value)
+            self._evict()
+        return value
+
+    def resize(self, maxsize):
+        with self._lock:
+            self.maxsize = maxsize
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._size = 0
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "size": self._size,
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            }
+
+    def _weight(self, value):
+        return self._weigh(value) if self._weigh else 1
+
+    def _evict(self):
+        while self._size > self.maxsize and self._data:
+            _, value = self._data.popitem(last=False)
+            self._size -= self._weight(value)
+            self.evictions += 1
+
+
+def composition_cache(name, maxsize=DEFAULT_MAXSIZE):
+    """Memoize a pure function of one hashable composition key"""
+    def decorator(func):
+        cache = ShareCache(name, maxsize)
+
+        @wraps(func)
+        def wrapper(key):
+            return cache.get(key, func)
+
+        wrapper.cache = cache
+        return wrapper
+    return decorator
+
+
+def get_cache(name):
+    return _registry[name]
+
+
+def cache_stats():
+    """Counters for every registered cache, keyed by cache name"""
+    return {name: cache.stats() for name, cache in _registry.items()}
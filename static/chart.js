@@ -1,5 +1,7 @@
 let chartInstance = null;
 let lastData = null;
+// signed result from /calculate: the report is rendered from it, not recomputed
+let lastToken = null;
 
 function toggleSpouseFields(){
     const gender = document.getElementById("deceased_gender").value;
@@ -15,6 +17,8 @@ function collectFormData() {
     return {
         estate: parseFloat(document.getElementById("estate").value),
         deceased_gender: gender,
+        madhab: document.getElementById("madhab").value,
+        locale: document.getElementById("locale").value,
         husband: gender === "أنثى" && document.getElementById("husband").checked,
         wives: gender === "ذكر" ? parseInt(document.getElementById("wives").value) : 0,
         father: document.getElementById("father").checked,
@@ -32,14 +36,16 @@ function collectFormData() {
 
 function calculate(){
     lastData = collectFormData();
+    lastToken = null;
 
     fetch("/calculate", {
         method: "POST",
         headers: {"Content-Type": "application/json"},
-        body: JSON.stringify(lastData)
+        body: JSON.stringify({...lastData, explain: true})
     })
     .then(res => res.json())
     .then(data => {
+        lastToken = data.token || null;
         displayResults(data);
     })
     .catch(err => {
@@ -57,6 +63,7 @@ function displayResults(data) {
     
     // Display explanation with Ayah
     const exp = document.getElementById("explanation");
+    exp.dir = lastData.locale === "ar" ? "rtl" : "ltr";
     exp.innerHTML = "<h3>📖 تفاصيل الحساب والآيات القرآنية:</h3>";
     
     if (data.explanation && data.explanation.length > 0) {
@@ -190,7 +197,7 @@ function downloadPDF(){
     fetch("/pdf", {
         method: "POST",
         headers: {"Content-Type": "application/json"},
-        body: JSON.stringify(lastData)
+        body: JSON.stringify(lastToken ? {token: lastToken} : lastData)
     })
     .then(res => res.blob())
     .then(blob => {
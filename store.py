@@ -0,0 +1,324 @@
+"""
+Persistent result store keyed on the case digest.
+
+Every normalized case has a content address (inheritance_logic.case_digest),
+so the same input always maps to the same row: re-opening a case, or
+regenerating its report, is a primary-key lookup instead of a
+recomputation. A row holds the normalized input, the shares, and when they
+have been produced the explanation and the PDF bytes.
+
+Writes never block a request. save() and attach_pdf() queue the row for a
+writer thread that commits up to BATCH rows per transaction; rows still in
+the queue are answered from memory by get(). The database runs in WAL
+mode with a busy timeout, so several gunicorn workers (one writer thread
+each) and any number of readers can share one file.
+
+RESULT_DB sets the SQLite path and turns the store on. Without it RESULTS
+is None: importing app (tests, benchmarks, bulk runs) never creates or
+writes a database in the current directory.
+
+Bulk export for reporting, one row per heir:
+
+    python store.py export results.csv
+    python store.py export results.parquet --format parquet   # needs pyarrow
+"""
+import argparse
+import atexit
+import csv
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+from exact import currency_places
+
+BATCH = 256
+
+# rows fetched per round trip when exporting
+EXPORT_BATCH = 5000
+
+EXPORT_COLUMNS = ("case_id", "created", "madhab", "deceased_gender", "estate", "heir", "amount")
+
+SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS results (
+        case_id TEXT PRIMARY KEY,
+        created REAL NOT NULL,
+        input TEXT NOT NULL,
+        shares TEXT NOT NULL,
+        explanation TEXT,
+        pdf BLOB
+    )""",
+    "CREATE INDEX IF NOT EXISTS results_created ON results (created)",
+)
+
+# a repeated case only fills in what the stored row is missing
+_UPSERT = """
+INSERT INTO results (case_id, created, input, shares, explanation, pdf)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (case_id) DO UPDATE SET
+    explanation = coalesce(results.explanation, excluded.explanation),
+    pdf = coalesce(results.pdf, excluded.pdf)
+WHERE (results.explanation IS NULL AND excluded.explanation IS NOT NULL)
+   OR (results.pdf IS NULL AND excluded.pdf IS NOT NULL)
+"""
+
+_ATTACH_PDF = "UPDATE results SET pdf = ? WHERE case_id = ? AND pdf IS NULL"
+
+_STOP = object()
+
+
+def _dumps(value):
+    # default=dict serializes schema.Case inputs
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=dict)
+
+
+class ResultStore:
+    """SQLite-backed results with a batching background writer"""
+
+    def __init__(self, path, batch=BATCH):
+        self.path = path
+        self.batch = batch
+        self._pending = {}  # case_id -> row not yet committed
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._queue = queue.Queue()
+        self._writer = None
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        for statement in SCHEMA:
+            connection.execute(statement)
+        return connection
+
+    def _reader(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._local.connection = self._connect()
+        return connection
+
+    # ---------- writing ----------
+
+    def _enqueue(self, statement, params, case_id, row):
+        """Queue one write; row is what _pending holds for case_id until it commits"""
+        with self._lock:
+            if row is not None:
+                self._pending[case_id] = row
+            if self._writer is None:
+                self._writer = threading.Thread(
+                    target=self._write_loop, name="result-store", daemon=True
+                )
+                self._writer.start()
+                atexit.register(self.close)
+        self._queue.put((statement, params, case_id, row))
+
+    def save(self, case_id, data, shares, explanation=None, pdf=None):
+        """Queue a case with its shares ({label: amount}) and optional explanation / PDF"""
+        places = currency_places(data.get("currency"))
+        row = (
+            case_id, time.time(), _dumps(data),
+            _dumps({
+                "labels": list(shares),
+                "values": [float(round(v, places)) for v in shares.values()],
+            }),
+            _dumps(explanation) if explanation is not None else None,
+            pdf,
+        )
+        with self._lock:
+            pending = self._pending.get(case_id)
+        if pending is not None:
+            row = row[:4] + (pending[4] or row[4], pending[5] or row[5])
+        self._enqueue(_UPSERT, row, case_id, row)
+
+    def attach_pdf(self, case_id, pdf):
+        """Queue the report of an already saved case"""
+        with self._lock:
+            pending = self._pending.get(case_id)
+        if pending is not None:
+            pending = pending[:5] + (pending[5] or pdf,)
+        self._enqueue(_ATTACH_PDF, (pdf, case_id), case_id, pending)
+
+    def _write_loop(self):
+        connection = self._connect()
+        while True:
+            items = [self._queue.get()]
+            while len(items) < self.batch:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            writes = [item for item in items if item is not _STOP]
+            try:
+                with connection:
+                    for statement, params, _, _ in writes:
+                        connection.execute(statement, params)
+            except sqlite3.Error as e:
+                logging.error("Result store write failed: %s", e)
+            with self._lock:
+                for _, _, case_id, row in writes:
+                    # a later write for the same case keeps its own pending row
+                    if row is not None and self._pending.get(case_id) is row:
+                        del self._pending[case_id]
+            for _ in items:
+                self._queue.task_done()
+            if len(writes) < len(items):
+                connection.close()
+                return
+
+    def flush(self):
+        """Block until every queued write is committed"""
+        if self._writer is not None:
+            self._queue.join()
+
+    def close(self):
+        with self._lock:
+            writer, self._writer = self._writer, None
+        if writer is not None and writer.is_alive():
+            self._queue.put(_STOP)
+            writer.join(timeout=30)
+
+    # ---------- reading ----------
+
+    def _row(self, case_id, columns):
+        with self._lock:
+            pending = self._pending.get(case_id)
+        if pending is not None:
+            return pending
+        return self._reader().execute(
+            f"SELECT {columns} FROM results WHERE case_id = ?", (case_id,)
+        ).fetchone()
+
+    def get(self, case_id):
+        """Stored case as {"case_id", "created", "input", "labels", "values",
+        "explanation", "has_pdf"}, or None"""
+        row = self._row(case_id, "case_id, created, input, shares, explanation, pdf IS NOT NULL")
+        if row is None:
+            return None
+        _, created, data, shares, explanation, pdf = row
+        return {
+            "case_id": case_id,
+            "created": created,
+            "input": json.loads(data),
+            **json.loads(shares),
+            "explanation": json.loads(explanation) if explanation is not None else None,
+            "has_pdf": bool(pdf),
+        }
+
+    def pdf(self, case_id):
+        """Stored report bytes, or None"""
+        row = self._row(case_id, "case_id, NULL, NULL, NULL, NULL, pdf")
+        return row[5] if row is not None else None
+
+    def count(self):
+        self.flush()
+        return self._reader().execute("SELECT count(*) FROM results").fetchone()[0]
+
+    # ---------- export ----------
+
+    def export_rows(self, since=None):
+        """Yield EXPORT_COLUMNS tuples, one per heir, reading EXPORT_BATCH rows at a time"""
+        self.flush()
+        # a separate connection keeps the read snapshot off the shared one
+        connection = self._connect()
+        try:
+            cursor = connection.execute(
+                "SELECT case_id, created, input, shares FROM results"
+                " WHERE created >= ? ORDER BY created",
+                (since or 0,),
+            )
+            while True:
+                rows = cursor.fetchmany(EXPORT_BATCH)
+                if not rows:
+                    return
+                for case_id, created, data, shares in rows:
+                    data, shares = json.loads(data), json.loads(shares)
+                    for heir, amount in zip(shares["labels"], shares["values"]):
+                        yield (
+                            case_id, created, data.get("madhab"), data.get("deceased_gender"),
+                            data.get("estate"), heir, amount,
+                        )
+        finally:
+            connection.close()
+
+    def export_csv(self, path, since=None):
+        """Write the long-format export as UTF-8 CSV; returns the number of rows"""
+        count = 0
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(EXPORT_COLUMNS)
+            for row in self.export_rows(since):
+                writer.writerow(row)
+                count += 1
+        return count
+
+    def export_parquet(self, path, since=None):
+        """Write the export as Parquet, one row group per EXPORT_BATCH heirs; needs pyarrow"""
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow)")
+
+        schema = pa.schema([
+            ("case_id", pa.string()), ("created", pa.float64()), ("madhab", pa.string()),
+            ("deceased_gender", pa.string()), ("estate", pa.float64()),
+            ("heir", pa.string()), ("amount", pa.float64()),
+        ])
+
+        def write(rows):
+            columns = list(zip(*rows))
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+                schema=schema,
+            ))
+
+        count = 0
+        rows = []
+        with pq.ParquetWriter(path, schema) as writer:
+            for row in self.export_rows(since):
+                rows.append(row)
+                if len(rows) == EXPORT_BATCH:
+                    write(rows)
+                    count += len(rows)
+                    rows = []
+            if rows:
+                write(rows)
+                count += len(rows)
+        return count
+
+
+def open_store(path=None):
+    """ResultStore at path (default RESULT_DB), or None when neither is set"""
+    path = os.environ.get("RESULT_DB", "") if path is None else path
+    return ResultStore(path) if path else None
+
+
+RESULTS = open_store()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Result store maintenance")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export = commands.add_parser("export", help="export one row per heir")
+    export.add_argument("output")
+    export.add_argument("--format", choices=("csv", "parquet"), default="csv")
+    export.add_argument("--since", type=float, help="only cases stored at or after this Unix time")
+    export.add_argument("--db", help="database path (default RESULT_DB)")
+    args = parser.parse_args(argv)
+
+    store = open_store(args.db)
+    if store is None:
+        parser.error("no result store: set RESULT_DB or pass --db")
+    if args.format == "parquet":
+        count = store.export_parquet(args.output, args.since)
+    else:
+        count = store.export_csv(args.output, args.since)
+    print(f"{count} rows -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
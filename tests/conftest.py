@@ -0,0 +1,21 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# the modules live at the repository root, the invariant checks in benchmarks/
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """A result store in tmp_path, installed as app.RESULTS for the test"""
+    import app
+    from store import ResultStore
+
+    results = ResultStore(str(tmp_path / "results.db"))
+    monkeypatch.setattr(app, "RESULTS", results)
+    yield results
+    results.close()
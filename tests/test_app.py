@@ -0,0 +1,47 @@
+import json
+
+import pytest
+
+import app as app_module
+
+
+@pytest.fixture
+def client():
+    return app_module.app.test_client()
+
+
+def test_calculate(client):
+    response = client.post("/calculate", json={"estate": 100, "deceased_gender": "ذكر", "sons": 1})
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize("options", [
+    {"data": "hello", "content_type": "text/plain"},
+    {"json": [1]},
+])
+def test_calculate_without_a_json_object(client, options):
+    response = client.post("/calculate", **options)
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+
+
+def test_server_errors_do_not_reach_the_client(client, monkeypatch):
+    def fail(_):
+        raise RuntimeError("secret internals")
+
+    monkeypatch.setattr(app_module, "normalize_case", fail)
+    response = client.post("/calculate", json={"estate": 100})
+    assert response.status_code == 500
+    assert "secret" not in response.get_data(as_text=True)
+
+
+@pytest.mark.parametrize("query", ["", "?compact=1"])
+def test_minor_units_beyond_64_bits(client, query):
+    # orjson rejects these integers; the provider falls back to the stdlib encoder
+    body = json.dumps({"estate_minor": 10 ** 21, "currency": "KWD", "sons": 1, "wives": 1})
+    response = client.post("/calculate" + query, data=body, content_type="application/json")
+    assert response.status_code == 200
+    result = json.loads(response.get_data(as_text=True))
+    units = result["minor_units"] if not query else list(result["shares"].values())
+    assert sum(units) == 10 ** 21
+
@@ -0,0 +1,65 @@
+from itertools import count, islice
+import json
+
+import pytest
+
+import app as app_module
+import inheritance_logic
+from inheritance_logic import calculate_inheritance_many
+
+GOOD = {"estate": 100, "deceased_gender": "ذكر", "sons": 1}
+
+
+@pytest.fixture
+def client():
+    return app_module.app.test_client()
+
+
+def _lines(response):
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def test_json_array_with_per_case_errors(client):
+    response = client.post("/calculate/batch", json=[GOOD, {"estate": -1}, "x", {}, GOOD])
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    lines = _lines(response)
+    assert [line["index"] for line in lines] == [0, 1, 2, 3, 4]
+    assert ["error" in line for line in lines] == [False, True, True, True, False]
+    assert lines[0]["values"] == [100.0]
+
+
+def test_ndjson_body_with_a_malformed_line(client):
+    body = "\n".join([
+        json.dumps(GOOD), "{not json", "", json.dumps({"estate": "abc"}), json.dumps(GOOD),
+    ])
+    response = client.post(
+        "/calculate/batch?explain=1", data=body, content_type="application/x-ndjson"
+    )
+    assert response.status_code == 200
+    lines = _lines(response)
+    # the blank line is not a case
+    assert [line["index"] for line in lines] == [0, 1, 2, 3]
+    assert ["error" in line for line in lines] == [False, True, True, False]
+    assert lines[3]["explanation"]
+
+
+@pytest.mark.parametrize("body", [{"estate": 100}, "x"])
+def test_a_body_that_is_not_an_array_is_a_400(client, body):
+    response = client.post("/calculate/batch", json=body)
+    assert response.status_code == 400
+
+
+def test_indices_continue_across_chunks(monkeypatch):
+    monkeypatch.setattr(inheritance_logic, "BATCH_CHUNK", 2)
+    cases = [GOOD, {"estate": 0}, GOOD, GOOD, {"estate": 0}]
+    results = list(calculate_inheritance_many(cases))
+    assert [result["index"] for result in results] == [0, 1, 2, 3, 4]
+    assert [index for index, result in enumerate(results) if "error" in result] == [1, 4]
+
+
+def test_results_stream_before_the_input_ends(monkeypatch):
+    monkeypatch.setattr(inheritance_logic, "BATCH_CHUNK", 3)
+    # an endless input: only the first chunks are read
+    results = calculate_inheritance_many(dict(GOOD, estate=n + 1) for n in count())
+    assert [result["values"] for result in islice(results, 4)] == [[1.0], [2.0], [3.0], [4.0]]
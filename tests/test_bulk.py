@@ -0,0 +1,68 @@
+import json
+import os
+
+import pytest
+
+import bulk
+
+
+def _input(tmp_path, count=10):
+    path = tmp_path / "cases.ndjson"
+    cases = [{"estate": 100 + n, "deceased_gender": "ذكر", "sons": 1, "mother": True}
+             for n in range(count)]
+    cases[3] = {"estate": -1}
+    path.write_text("\n".join(json.dumps(case) for case in cases) + "\n", encoding="utf-8")
+    return str(path)
+
+
+def _interrupt_after(monkeypatch, chunks):
+    process = bulk.process_chunk
+    calls = []
+
+    def interrupted(*args):
+        if len(calls) == chunks:
+            raise KeyboardInterrupt
+        calls.append(args)
+        return process(*args)
+
+    monkeypatch.setattr(bulk, "process_chunk", interrupted)
+
+
+@pytest.mark.parametrize("extension", ["csv", "ndjson"])
+def test_resume_after_an_interruption(tmp_path, monkeypatch, extension):
+    source = _input(tmp_path)
+    expected = str(tmp_path / f"expected.{extension}")
+    assert bulk.run(source, expected, workers=0, chunk=3, quiet=True) == (10, 1)
+
+    output = str(tmp_path / f"results.{extension}")
+    with monkeypatch.context() as patch:
+        _interrupt_after(patch, 2)
+        with pytest.raises(KeyboardInterrupt):
+            bulk.run(source, output, workers=0, chunk=3, quiet=True)
+    checkpoint = json.loads(open(f"{output}.checkpoint", encoding="utf-8").read())
+    assert checkpoint["cases"] == 6 and checkpoint["errors"] == 1
+    # bytes written after the checkpoint are dropped on resume
+    with open(output, "ab") as f:
+        f.write(b"partial")
+
+    assert bulk.run(source, output, workers=0, chunk=3, resume=True, quiet=True) == (10, 1)
+    assert open(output, "rb").read() == open(expected, "rb").read()
+    assert not os.path.exists(f"{output}.checkpoint")
+
+
+def test_resume_without_a_checkpoint_starts_over(tmp_path):
+    source = _input(tmp_path)
+    output = str(tmp_path / "results.ndjson")
+    assert bulk.run(source, output, workers=0, chunk=4, resume=True, quiet=True) == (10, 1)
+    assert len(open(output, encoding="utf-8").read().splitlines()) == 10
+
+
+def test_resume_refuses_a_checkpoint_with_other_settings(tmp_path, monkeypatch):
+    source = _input(tmp_path)
+    output = str(tmp_path / "results.ndjson")
+    with monkeypatch.context() as patch:
+        _interrupt_after(patch, 1)
+        with pytest.raises(KeyboardInterrupt):
+            bulk.run(source, output, workers=0, chunk=3, quiet=True)
+    with pytest.raises(SystemExit):
+        bulk.run(source, output, workers=0, chunk=3, explain=True, resume=True, quiet=True)
@@ -0,0 +1,46 @@
+from decimal import Decimal
+from fractions import Fraction
+import random
+
+import pytest
+
+import exact
+
+
+def test_allocate_sums_to_the_total():
+    rng = random.Random(0)
+    for _ in range(2000):
+        parts = [rng.randint(1, 50) for _ in range(rng.randint(1, 8))]
+        fractions = [Fraction(part, sum(parts)) for part in parts]
+        total = rng.randint(0, 10 ** rng.randint(1, 15))
+        amounts = exact.allocate(total, fractions)
+        assert sum(amounts) == total
+        assert all(amount >= 0 for amount in amounts)
+
+
+def test_allocate_gives_leftover_units_to_the_largest_remainders():
+    assert exact.allocate(100, [Fraction(1, 3)] * 3) == [34, 33, 33]
+    assert exact.allocate(10, [Fraction(1, 6), Fraction(5, 6)]) == [2, 8]
+
+
+@pytest.mark.parametrize("fractions", [
+    [Fraction(1, 2)],
+    [Fraction(1, 2), Fraction(2, 3)],
+])
+def test_allocate_refuses_fractions_that_are_not_the_whole_estate(fractions):
+    with pytest.raises(ValueError):
+        exact.allocate(100, fractions)
+
+
+def test_exact_amounts_in_the_currency_minor_unit():
+    amounts = exact.exact_amounts(1, [("a", Fraction(1, 3)), ("b", Fraction(2, 3))], places=3)
+    assert amounts == {"a": Decimal("0.333"), "b": Decimal("0.667")}
+
+
+def test_currency_places():
+    assert exact.currency_places() == exact.DEFAULT_PLACES
+    assert exact.currency_places("KWD") == 3
+    assert exact.currency_places("JPY") == 0
+    for currency in ("XXX", ["KWD"]):
+        with pytest.raises(ValueError):
+            exact.currency_places(currency)
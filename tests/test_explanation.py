@@ -0,0 +1,58 @@
+from fractions import Fraction
+
+import pytest
+
+import app as app_module
+from inheritance_logic import Adjustment, Step, Trace, calculate_trace, explain_trace, normalize_case
+from rule_engine import composition
+
+HUSBAND_MOTHER = {"estate": 1200, "deceased_gender": "أنثى", "husband": True, "mother": True}
+
+
+def test_rule_lines_show_the_rule_share_and_radd_its_own_line():
+    lines = explain_trace(calculate_trace(normalize_case(HUSBAND_MOTHER)))
+    assert "👨 الزوج: النصف (1/2) = 600.00" in lines
+    # the third of the real remainder (1200 - 600), before radd
+    assert "👩 الأم: الثلث من الباقي (1/3 من 600.00) = 200.00" in lines
+    assert any(line.startswith("↩️ الرد: بقي 400.00 (1/3)") for line in lines)
+    assert "الأم: 600.00 (50.0%)" in lines
+
+
+def test_radd_to_a_spouse_alone():
+    trace = calculate_trace(normalize_case({"estate": 100, "deceased_gender": "ذكر", "wives": 2}))
+    assert [adjustment.rule for adjustment in trace.adjustments] == ["radd_spouse"]
+    assert trace.steps[0].assigned == 25
+    lines = explain_trace(trace, "en")
+    assert any(line.startswith("↩️ Radd: 75.00 (3/4)") for line in lines)
+
+
+def test_awl_line():
+    # husband 1/2 and two sisters 2/3 over a base of 6 that rises to 7
+    trace = Trace(
+        700.0, "شافعي", composition(husband=1, sisters=2), False,
+        (Step("husband_half", Fraction(3, 7), "الزوج", 300.0, 350.0),
+         Step("sisters_kalala", Fraction(4, 7), "الأخوات (2)", 400.0, 466.67)),
+        None,
+        (Adjustment("awl", Fraction(7, 6), 816.67, 6, 7),),
+    )
+    lines = explain_trace(trace)
+    assert "👨 الزوج: النصف (1/2) = 350.00" in lines
+    assert any(line.startswith("⚖️ العول") and "من 6 إلى 7" in line for line in lines)
+
+
+@pytest.mark.parametrize("locale", [[], {}, ["ar"], "xx"])
+def test_unsupported_locale(locale):
+    response = app_module.app.test_client().post(
+        "/calculate", json={**HUSBAND_MOTHER, "explain": True, "locale": locale}
+    )
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "اللغة غير مدعومة"}
+
+
+def test_trace_response_lists_the_adjustments():
+    response = app_module.app.test_client().post(
+        "/calculate", json={**HUSBAND_MOTHER, "trace": True}
+    )
+    assert response.get_json()["adjustments"] == [
+        {"rule": "radd", "fraction": "1/3", "amount": 400.0},
+    ]
@@ -0,0 +1,57 @@
+import json
+
+import pytest
+
+import family
+
+MALE, FEMALE = family.MALE, family.FEMALE
+
+
+def graph(parents, dead=()):
+    ids = sorted({person for edge in parents for person in edge} | {"p1"})
+    return {
+        "deceased": "p1",
+        "persons": [{"id": i, "gender": MALE, "alive": i not in dead} for i in ids],
+        "parents": parents,
+    }
+
+
+@pytest.mark.parametrize("parents", [
+    [["p2", "p2"]],
+    [["p1", "p2"], ["p2", "p3"], ["p3", "p2"]],
+    [["p1", "p2"], ["p2", "p4"], ["p4", "p1"]],
+])
+def test_someone_who_is_their_own_ancestor_is_rejected(parents):
+    with pytest.raises(ValueError):
+        family.resolve(graph(parents, dead=("p2", "p3")))
+
+
+def test_a_shared_ancestor_is_not_a_cycle():
+    # the parents are cousins: g is reached along two paths
+    resolved = family.resolve({
+        "deceased": "c",
+        "persons": [{"id": "c", "gender": MALE}, {"id": "f", "gender": MALE},
+                    {"id": "m", "gender": FEMALE}, {"id": "g", "gender": MALE}],
+        "parents": [["c", "f"], ["c", "m"], ["f", "g"], ["m", "g"]],
+    })
+    assert resolved.counts["father"]
+
+
+@pytest.mark.parametrize("field, value", [
+    ("persons", 5), ("persons", "p1"), ("parents", 5), ("spouses", {"p1": "p2"}),
+])
+def test_fields_that_are_not_lists_are_rejected(field, value):
+    with pytest.raises(ValueError):
+        family.resolve({**graph([]), field: value})
+
+
+def test_a_bad_graph_is_a_per_case_error_in_a_batch():
+    import app as app_module
+
+    cases = [{"estate": 100, "family": {"deceased": "p1", "persons": 5}},
+             {"estate": 100, "deceased_gender": MALE, "sons": 1}]
+    response = app_module.app.test_client().post("/calculate/batch", json=cases)
+    results = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [sorted(result) for result in results] == [
+        ["error", "index"], ["index", "labels", "values"],
+    ]
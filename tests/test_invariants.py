@@ -0,0 +1,81 @@
+import random
+
+import numpy as np
+import pytest
+
+import calculator
+import engine
+import inheritance_logic
+import suite
+import vectorized
+from inheritance_logic import calculate_minor_units, normalize_case
+from madhab import MADHABS
+
+CASES = suite.generate(100, seed=1)
+
+
+@pytest.mark.parametrize("name", list(suite.ENGINES))
+def test_generated_cases_keep_every_invariant(name):
+    shares = suite.ENGINES[name]
+    broken = []
+    for kind, case in CASES:
+        for invariant in suite.violations(name, kind, *shares(case)):
+            broken.append((invariant, kind, case))
+    assert broken == []
+
+
+def test_minor_units_add_up_to_the_estate():
+    rng = random.Random(2)
+    for _ in range(2000):
+        data = normalize_case({
+            "estate_minor": rng.randint(1, 10 ** rng.randint(1, 22)),
+            "currency": rng.choice(["KWD", "USD", "JPY"]),
+            "deceased_gender": rng.choice([suite.MALE, suite.FEMALE]),
+            "husband": rng.random() < 0.5, "wives": rng.randint(0, 4),
+            "father": rng.random() < 0.4, "mother": rng.random() < 0.5,
+            "grandfather": rng.random() < 0.4, "grandmother": rng.random() < 0.3,
+            "sons": rng.randint(0, 3), "daughters": rng.randint(0, 3),
+            "brothers": rng.randint(0, 2), "sisters": rng.randint(0, 2),
+            "madhab": rng.choice(list(MADHABS)),
+        })
+        units = calculate_minor_units(data)
+        if units:
+            assert sum(units.values()) == data["estate_minor"], data
+
+
+def test_grandmother_with_siblings_and_a_wife():
+    data = normalize_case({"estate_minor": 1000, "currency": "KWD", "deceased_gender": suite.MALE,
+                           "wives": 1, "brothers": 2, "sisters": 2, "grandmother": True})
+    assert sum(calculate_minor_units(data).values()) == 1000
+
+
+def test_wives_alone_take_the_whole_estate():
+    data = normalize_case({"estate_minor": 1001, "deceased_gender": suite.MALE, "wives": 3})
+    assert sum(calculate_minor_units(data).values()) == 1001
+
+
+@pytest.mark.parametrize("case, expected", [
+    # the husband keeps his half, the mother takes the rest by radd
+    ({"deceased_gender": suite.FEMALE, "husband": True, "mother": True}, [600, 600]),
+    # the wife keeps her eighth, the daughter takes the rest
+    ({"deceased_gender": suite.MALE, "wives": 1, "daughters": 1}, [150, 1050]),
+    # the wife keeps her quarter, the mother takes the rest by radd
+    ({"deceased_gender": suite.MALE, "wives": 1, "mother": True}, [300, 900]),
+])
+@pytest.mark.parametrize("calculate", [
+    lambda data: inheritance_logic.calculate_inheritance(data, explain=False)[0],
+    engine.calculate,
+    calculator.calculate,
+])
+def test_radd_leaves_the_spouse_at_the_fixed_share(calculate, case, expected):
+    shares = calculate(normalize_case({"estate": 1200, **case}))
+    assert list(shares.values()) == expected
+
+
+def test_vectorized_radd_matches_calculator():
+    columns = vectorized.grid(np.array([1200.0]), wives=[0, 1], mother=[0, 1], daughters=[0, 1, 2])
+    rows = vectorized.calculate(columns)
+    for i, row in enumerate(rows):
+        data = normalize_case({name: column[i].item() for name, column in columns.items()})
+        expected = {heir: amount for heir, amount in calculator.calculate(data).items() if amount}
+        assert {vectorized.HEIRS[j]: row[j] for j in range(len(row)) if row[j]} == expected
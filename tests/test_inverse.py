@@ -0,0 +1,59 @@
+import json
+
+import pytest
+
+import app as app_module
+import inverse
+from inverse import parse_query
+
+
+@pytest.fixture
+def client():
+    return app_module.app.test_client()
+
+
+@pytest.mark.parametrize("query", [
+    {"constraints": 5},
+    {"constraints": "sons"},
+    {"constraints": {"heir": "sons", "min": "1/2"}},
+    {"constraints": [{"heir": "sons", "min": []}]},
+    {"constraints": [{"heir": "sons", "max": {"value": 1}}]},
+    {"estate": [100]},
+    {"counts": 5},
+    {"shift": [1]},
+    {"shift": []},
+    {"counts": ""},
+    {"madhab": {}},
+    {"deceased_gender": []},
+    {"max_count": "3"},
+    {"limit": None},
+])
+def test_parse_query_rejects_bad_field_types(query):
+    with pytest.raises(ValueError):
+        parse_query(query)
+
+
+def test_inverse_route_bad_constraints_is_a_400(client):
+    response = client.post("/inverse", json={"constraints": 5})
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+
+
+def test_inverse_route_streams_a_summary(client):
+    response = client.post("/inverse", json={
+        "deceased_gender": "ذكر", "max_count": 1, "limit": 3,
+        "constraints": [{"heir": "sons", "min": "1/2"}],
+    })
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert lines
+
+
+def test_inverse_route_server_error(client, monkeypatch):
+    def fail(_):
+        raise RuntimeError("secret internals")
+
+    monkeypatch.setattr(inverse, "solve", fail)
+    response = client.post("/inverse", json={})
+    assert response.status_code == 500
+    assert "secret" not in response.get_data(as_text=True)
@@ -0,0 +1,35 @@
+from fractions import Fraction
+
+import pytest
+
+import engine
+from explanations import get_explanation
+from inheritance_logic import composition_key, normalize_case, share_fractions
+from madhab import DEFAULT, MADHABS, get_madhab
+
+MALE, FEMALE = "ذكر", "أنثى"
+
+
+@pytest.mark.parametrize("madhab", list(MADHABS))
+@pytest.mark.parametrize("spouse, expected", [
+    ({"deceased_gender": FEMALE, "husband": True}, Fraction(1, 6)),
+    ({"deceased_gender": MALE, "wives": 1}, Fraction(1, 4)),
+])
+def test_umariyyatan_mother_takes_a_third_of_the_remainder(madhab, spouse, expected):
+    data = normalize_case({"estate": 1, "father": True, "mother": True, "madhab": madhab, **spouse})
+    shares = {rule: fraction for _, rule, fraction in
+              share_fractions(composition_key(data), get_madhab(madhab))}
+    assert shares["mother_third_remainder"] == expected
+    assert sum(shares.values()) == 1
+
+
+def test_engine_keeps_the_third_of_the_estate():
+    data = normalize_case({"estate": 1200, "deceased_gender": FEMALE, "husband": True,
+                           "father": True, "mother": True})
+    assert engine.calculate(data)["الأم"] == 400
+
+
+def test_get_explanation_takes_a_profile_or_a_name():
+    assert DEFAULT.name in get_explanation("الجد")
+    assert "حنفي" in get_explanation("الجد", MADHABS["حنفي"])
+    assert "حنفي" in get_explanation("الجد", "حنفي")
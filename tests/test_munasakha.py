@@ -0,0 +1,24 @@
+from decimal import Decimal
+
+import pytest
+
+import munasakha
+
+DEATHS = [
+    {"id": "A", "case": {"wives": 1, "sons": 2, "daughters": 1}, "names": {"sons": ["B", "C"]}},
+    {"id": "B", "case": {"mother": True, "daughters": 2}},
+]
+
+
+@pytest.mark.parametrize("currency, places", [(None, 2), ("KWD", 3), ("JPY", 0)])
+def test_amounts_use_the_currency_minor_unit(currency, places):
+    result = munasakha.solve(1000.777, DEATHS, currency=currency)
+    amounts = [Decimal(str(heir["amount"])) for heir in result["heirs"]]
+    amounts.append(Decimal(str(result["unassigned"]["amount"])))
+    assert all(amount == amount.quantize(Decimal(1).scaleb(-places)) for amount in amounts)
+    assert sum(amounts) == Decimal("1000.777").quantize(Decimal(1).scaleb(-places))
+
+
+def test_unknown_currency():
+    with pytest.raises(ValueError):
+        munasakha.solve(1000, DEATHS, currency="XXX")
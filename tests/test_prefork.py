@@ -0,0 +1,21 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MASTER = """
+import runpy, sys
+config = runpy.run_path("gunicorn.conf.py")
+config["on_starting"](None)
+print(sorted(name for name in ("reportlab", "matplotlib") if name in sys.modules))
+"""
+
+
+def test_master_preloads_without_matplotlib():
+    # a fresh interpreter: the test session may have imported either already
+    env = {**os.environ, "PRELOAD_RENDERERS": "1"}
+    output = subprocess.run(
+        [sys.executable, "-c", MASTER], cwd=ROOT, env=env,
+        capture_output=True, text=True, check=True,
+    ).stdout
+    assert output.split()[-1] == "['reportlab']"
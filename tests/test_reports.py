@@ -0,0 +1,46 @@
+import pytest
+
+import app as app_module
+from charts import CHART_CACHE, chart_bytes, chart_key
+from pdf_report import PDF_CACHE
+
+CASE = {"estate": 1200, "deceased_gender": "ذكر", "wives": 1, "sons": 1, "daughters": 2}
+
+
+@pytest.fixture
+def client():
+    return app_module.app.test_client()
+
+
+@pytest.mark.parametrize("chart", [[], {}, 5, "gif"])
+def test_calculate_rejects_an_unsupported_chart(client, chart):
+    response = client.post("/calculate", json={**CASE, "chart": chart})
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+
+
+def test_calculate_embeds_a_chart(client):
+    response = client.post("/calculate", json={**CASE, "chart": "svg"})
+    assert response.status_code == 200
+    assert response.get_json()["chart_mimetype"] == "image/svg+xml"
+
+
+def test_charts_are_cached_by_family_shape():
+    CHART_CACHE.clear()
+    first = chart_bytes({"الزوجة": 150.0, "الابن": 1050.0}, "svg")
+    # another estate with the same proportions is the same image
+    again = chart_bytes({"الزوجة": 300.0, "الابن": 2100.0}, "svg")
+    assert again == first
+    assert CHART_CACHE.stats()["misses"] == 1
+    assert CHART_CACHE.stats()["hits"] == 1
+    assert chart_key({"a": 1.0}, "png") != chart_key({"a": 1.0}, "svg")
+
+
+def test_reports_are_cached_by_case(client):
+    PDF_CACHE.clear()
+    first = client.post("/pdf", json=CASE)
+    again = client.post("/pdf", json=CASE)
+    assert first.status_code == again.status_code == 200
+    assert first.data == again.data
+    assert PDF_CACHE.stats()["hits"] == 1
+    assert PDF_CACHE.stats()["entries"] == 1
@@ -0,0 +1,72 @@
+import json
+
+import pytest
+
+import app as app_module
+import result_token
+from inheritance_logic import calculate_trace, normalize_case
+from result_token import decode, encode
+
+CASES = [
+    {"estate": 1200, "deceased_gender": "أنثى", "husband": True, "mother": True},
+    {"estate": 100, "deceased_gender": "ذكر", "wives": 2},
+    {"estate_minor": 123456, "currency": "KWD", "sons": 1, "daughters": 2, "mother": True},
+]
+
+
+@pytest.fixture
+def client():
+    return app_module.app.test_client()
+
+
+@pytest.mark.parametrize("case", CASES)
+@pytest.mark.parametrize("exact", [False, True])
+def test_round_trip(case, exact):
+    trace = calculate_trace(normalize_case(case), exact=exact)
+    assert decode(encode("abc", trace, "en")) == ("abc", trace, "en")
+
+
+def _token():
+    return encode("abc", calculate_trace(normalize_case(CASES[0])), "ar")
+
+
+def _flip(text, index):
+    return text[:index] + ("A" if text[index] != "A" else "B") + text[index + 1:]
+
+
+@pytest.mark.parametrize("tamper", [
+    lambda token: _flip(token, 5),
+    lambda token: _flip(token, len(token) - 3),
+    lambda token: token.split(".")[0],
+    lambda token: token + ".x",
+    lambda token: "." + token.split(".")[1],
+    lambda token: token.replace(".", "é"),
+    lambda token: None,
+    lambda token: ["token"],
+])
+def test_tampered_token_is_rejected(tamper):
+    with pytest.raises(ValueError):
+        decode(tamper(_token()))
+
+
+def test_token_signed_with_another_key_is_rejected(monkeypatch):
+    token = _token()
+    monkeypatch.setattr(result_token, "_SECRET", b"another key")
+    with pytest.raises(ValueError):
+        decode(token)
+
+
+def test_other_version_is_rejected():
+    payload = result_token._b64encode(json.dumps([result_token.VERSION - 1, "abc"]).encode())
+    signature = result_token._b64encode(result_token._signature(payload.encode("ascii")))
+    with pytest.raises(ValueError):
+        decode(f"{payload}.{signature}")
+
+
+def test_calculate_token_renders_the_chart(client):
+    response = client.post("/calculate", json=CASES[0])
+    token = response.get_json()["token"]
+    assert client.get("/chart", query_string={"token": token, "format": "svg"}).status_code == 200
+    response = client.get("/chart", query_string={"token": _flip(token, 5), "format": "svg"})
+    assert response.status_code == 400
+    assert "error" in response.get_json()
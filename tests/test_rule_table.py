@@ -0,0 +1,33 @@
+import engine
+import rule_table
+
+
+def test_saved_table_matches_the_rules():
+    assert engine.TABLE.digest == rule_table.rules_digest(engine.RULES)
+    assert rule_table.load(engine.RULES) is not None
+
+
+def test_round_trip(tmp_path):
+    path = tmp_path / "rule_table.txt"
+    table = rule_table.compile_table(engine.RULES)
+    rule_table.save(table, path)
+    loaded = rule_table.load(engine.RULES, path)
+    assert loaded.rules == table.rules
+    assert loaded.rows == table.rows
+
+
+def test_changed_rules_are_not_loaded(tmp_path):
+    path = tmp_path / "rule_table.txt"
+    rule_table.save(rule_table.compile_table(engine.RULES), path)
+    fixed, (name, blocking) = engine.RULES
+
+    def changed(state):
+        return blocking(state)
+
+    changed_rules = (fixed, (name, changed))
+    assert rule_table.rules_digest(changed_rules) != rule_table.rules_digest(engine.RULES)
+    assert rule_table.load(changed_rules, path) is None
+
+
+def test_missing_table(tmp_path):
+    assert rule_table.load(engine.RULES, tmp_path / "missing.txt") is None
@@ -0,0 +1,92 @@
+import inspect
+import json
+
+import pytest
+
+import app as app_module
+import schema
+from schema import FIELD_NAMES, Case, normalize, normalize_rows, validate_columns
+
+
+@pytest.fixture
+def client():
+    return app_module.app.test_client()
+
+
+def test_case_arguments_follow_the_fields():
+    parameters = list(inspect.signature(Case.__init__).parameters)[1:]
+    assert parameters == list(FIELD_NAMES)
+    assert Case.__slots__ == FIELD_NAMES
+
+
+@pytest.mark.parametrize("field", ["madhab", "currency", "deceased_gender"])
+@pytest.mark.parametrize("value", [[], {}, ["حنفي"], 3, True])
+def test_choice_rejects_values_that_are_not_strings(field, value):
+    with pytest.raises(ValueError):
+        normalize({"estate": 100, field: value})
+
+
+@pytest.mark.parametrize("payload", [
+    {"estate": 100, "sons": -1},
+    {"estate": 100, "sons": "two"},
+    {"estate": 100, "sons": 1.5},
+    {"estate": 100, "sons": []},
+    {"estate": "abc"},
+    {"estate": 0},
+    {"estate": float("inf")},
+    {"estate": [100]},
+    {"estate_minor": -5},
+])
+def test_invalid_fields(payload):
+    with pytest.raises(ValueError):
+        normalize(payload)
+
+
+def test_first_invalid_field_in_schema_order():
+    with pytest.raises(ValueError, match="عدد البنات"):
+        normalize({"estate": 100, "madhab": "x", "daughters": -1})
+
+
+def test_estate_minor_takes_the_place_of_a_bad_estate():
+    case = normalize({"estate": "abc", "estate_minor": 12345, "currency": "KWD"})
+    assert case.estate == 12.345
+
+
+@pytest.mark.parametrize("field", ["madhab", "currency"])
+def test_calculate_rejects_a_list_choice(client, field):
+    response = client.post("/calculate", json={"estate": 100, "sons": 1, field: []})
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+
+
+def test_batch_reports_a_bad_field_type_per_row(client):
+    response = client.post("/calculate/batch", json=[
+        {"estate": 100, "sons": 1},
+        {"estate": 100, "madhab": {}},
+        {"estate": 100, "daughters": 1},
+    ])
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [line["index"] for line in lines] == [0, 1, 2]
+    assert "error" in lines[1] and "error" not in lines[0] and "error" not in lines[2]
+
+
+def test_rows_and_columns_agree():
+    rows = [
+        {"estate": 100, "sons": 1},
+        {"estate": 100, "madhab": []},
+        {"estate_minor": 1000, "currency": "KWD", "wives": 2},
+        {"estate": 100, "sons": -1, "currency": "XXX"},
+    ]
+    # a field a row leaves out takes its default, as in normalize_rows
+    columns = {
+        name: [row.get(name, field.default) for row in rows]
+        for name, field in zip(FIELD_NAMES, schema.FIELDS)
+    }
+    by_rows = normalize_rows(rows)
+    by_columns = validate_columns(columns, len(rows))
+    assert by_rows[1] == by_columns[1]
+    assert set(by_rows[1]) == {1, 3}
+    assert [dict(case) if case else None for case in by_rows[0]] == [
+        dict(case) if case else None for case in by_columns[0]
+    ]
@@ -0,0 +1,45 @@
+import os
+import subprocess
+import sys
+
+import app as app_module
+from store import ResultStore, open_store
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CASE = {"estate": 1200, "deceased_gender": "ذكر", "wives": 1, "sons": 1}
+
+
+def test_importing_app_writes_no_database(tmp_path):
+    env = {key: value for key, value in os.environ.items() if key != "RESULT_DB"}
+    env["PYTHONPATH"] = ROOT
+    subprocess.run(
+        [sys.executable, "-c", "import app, store; assert store.RESULTS is None"],
+        cwd=tmp_path, env=env, check=True,
+    )
+    assert os.listdir(tmp_path) == []
+
+
+def test_open_store_needs_a_path(monkeypatch, tmp_path):
+    monkeypatch.delenv("RESULT_DB", raising=False)
+    assert open_store() is None
+    monkeypatch.setenv("RESULT_DB", str(tmp_path / "results.db"))
+    store = open_store()
+    assert isinstance(store, ResultStore)
+    store.close()
+
+
+def test_calculated_cases_are_stored(store):
+    client = app_module.app.test_client()
+    case_id = client.post("/calculate", json=CASE).get_json()["case_id"]
+    store.flush()
+    # read back from SQLite, not from the writer's pending rows
+    assert ResultStore(store.path).get(case_id)["values"] == [150, 1050]
+    response = client.get(f"/cases/{case_id}")
+    assert response.status_code == 200
+    assert response.get_json()["input"]["wives"] == 1
+
+
+def test_without_a_store_cases_are_not_found(monkeypatch):
+    monkeypatch.setattr(app_module, "RESULTS", None)
+    response = app_module.app.test_client().get("/cases/unknown")
+    assert response.status_code == 404
@@ -0,0 +1,121 @@
+"""
+Vectorized version of calculator.calculate for scenario sweeps.
+
+Every row is one case; shares are tracked as exact integer numerators over a
+per-row integer denominator (starting from 24, the base that holds 1/2, 1/4,
+1/8 and 1/6), so the final float ratio is the same correctly rounded value the
+scalar path gets from float(Fraction) and the amounts match it exactly.
+"""
+import numpy as np
+
+HEIRS = ["الزوج", "الزوجات", "الأم", "الأب", "الأبناء", "البنات"]
+HUSBAND, WIVES, MOTHER, FATHER, SONS, DAUGHTERS = range(len(HEIRS))
+
+FIELDS = ("husband", "wives", "mother", "father", "sons", "daughters", "brothers", "sisters")
+
+
+def _column(columns, name, n):
+    if name not in columns:
+        return np.zeros(n, dtype=np.int64)
+    return np.asarray(columns[name]).astype(np.int64)
+
+
+def share_ratios(columns):
+    """
+    Exact share ratios for every row as (numerators, denominators).
+
+    Args:
+        columns: mapping of heir field name (see FIELDS) to a 1-D array;
+            missing fields are treated as zero
+
+    Returns:
+        Tuple (num, den): int64 arrays of shape (rows, len(HEIRS)) and (rows,)
+    """
+    n = len(next(iter(columns.values())))
+    husband, wives, mother, father, sons, daughters, brothers, sisters = (
+        _column(columns, name, n) for name in FIELDS
+    )
+    husband = husband > 0
+    wives = wives > 0
+    mother = mother > 0
+    father = father > 0
+    children = (sons > 0) | (daughters > 0)
+
+    # Fixed shares (rules.fixed_shares) in 24ths
+    num = np.zeros((n, len(HEIRS)), dtype=np.int64)
+    num[:, HUSBAND] = np.where(husband, np.where(children, 6, 12), 0)
+    num[:, WIVES] = np.where(wives, np.where(children, 3, 6), 0)
+    mother_fixed = mother & (children | (brothers + sisters >= 2))
+    num[:, MOTHER] = np.where(mother_fixed, 4, 0)
+    num[:, FATHER] = np.where(father & children, 4, 0)
+
+    # Awl: shares over the sum of fixed shares when it exceeds the estate
+    used = num.sum(axis=1)
+    den = np.maximum(used, 24)
+    remaining = den - used
+
+    # Mother's third of the remaining; scale by 3 so it stays integral
+    num *= 3
+    den = den * 3
+    remaining = remaining * 3
+    mother_third = mother & ~mother_fixed
+    num[:, MOTHER] += np.where(mother_third, remaining // 3, 0)
+    remaining = np.where(mother_third, remaining - remaining // 3, remaining)
+
+    # Asaba: 2:1 split of the remaining between sons and daughters
+    units = sons * 2 + daughters
+    asaba = units > 0
+    scale = np.where(asaba, units, 1)
+    num *= scale[:, None]
+    den = den * scale
+    num[:, SONS] = np.where(asaba, remaining * sons * 2, 0)
+    num[:, DAUGHTERS] = np.where(asaba, remaining * daughters, 0)
+    remaining = np.where(asaba, 0, remaining * scale)
+
+    # Father takes the residue when there are no children
+    father_residue = (remaining > 0) & father
+    num[:, FATHER] += np.where(father_residue, remaining, 0)
+
+    # Radd: the surplus goes to the heirs other than the spouse, scaled by
+    # (den - spouse) / others; a spouse alone re-normalises over the total
+    total = num.sum(axis=1)
+    radd = (remaining > 0) & ~father & (total > 0)
+    spouse = num[:, HUSBAND] + num[:, WIVES]
+    others = total - spouse
+    blood = radd & (others > 0)
+    is_spouse = np.zeros(len(HEIRS), dtype=bool)
+    is_spouse[[HUSBAND, WIVES]] = True
+    factor = np.where(is_spouse, others[:, None], (den - spouse)[:, None])
+    num = np.where(blood[:, None], num * factor, num)
+    den = np.where(blood, den * others, np.where(radd, total, den))
+
+    return num, den
+
+
+def calculate(columns):
+    """
+    Share matrix for many cases at once, matching calculator.calculate.
+
+    Args:
+        columns: heir field arrays (see share_ratios) plus an "estate" array
+
+    Returns:
+        float64 array of shape (rows, len(HEIRS)); column j is HEIRS[j] and
+        heirs absent from a case get 0
+    """
+    num, den = share_ratios(columns)
+    estate = np.asarray(columns["estate"], dtype=np.float64)
+    return estate[:, None] * (num / den[:, None])
+
+
+def grid(estate, **fields):
+    """
+    Columns for the cartesian product of estate values and heir field ranges,
+    e.g. grid(np.linspace(1e4, 1e6, 1000), sons=range(5), wives=[1, 2]).
+    """
+    names = ["estate", *fields]
+    axes = np.meshgrid(
+        np.asarray(estate), *(np.asarray(values) for values in fields.values()),
+        indexing="ij",
+    )
+    return {name: axis.ravel() for name, axis in zip(names, axes)}